@@ -19,9 +19,12 @@ login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 
 
-def create_app():
+def create_app(test_config=None):
     """
     创建Flask应用实例
+
+    Args:
+        test_config: 可选的配置字典，覆盖下面的默认配置（测试时指向临时数据库等）
     """
     app = Flask(__name__)
     
@@ -29,7 +32,90 @@ def create_app():
     app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../data.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+
+    # 搜索并发配置：单个搜索源的默认截止时间（秒）、按来源覆盖的截止时间、线程池大小
+    app.config['SEARCH_SOURCE_TIMEOUT'] = 20
+    app.config['SEARCH_SOURCE_TIMEOUTS'] = {'百度': 20, 'Bilibili': 20}
+    app.config['SEARCH_MAX_WORKERS'] = 8
+
+    # 爬虫限速配置：每个主机每秒补充的令牌数、突发容量、等待抖动、按主机覆盖的(rate, burst)，
+    # 以及可选的SQLite文件路径（多个工作进程共享同一份请求预算）
+    app.config['SPIDER_RATE'] = 1 / 3
+    app.config['SPIDER_BURST'] = 2
+    app.config['SPIDER_RATE_JITTER'] = 0.5
+    app.config['SPIDER_HOST_LIMITS'] = {}
+    app.config['SPIDER_RATE_LIMIT_DB'] = None
+
+    # 搜索结果缓存配置：有效期（秒）、内存缓存条目上限、可选的SQLite二级缓存文件及其条目上限
+    app.config['SEARCH_CACHE_TTL'] = 600
+    app.config['SEARCH_CACHE_MAX_ENTRIES'] = 256
+    app.config['SEARCH_CACHE_DB'] = None
+    app.config['SEARCH_CACHE_DB_MAX_ENTRIES'] = 10000
+
+    # 异步搜索任务配置：同时执行的任务数、未完成任务数上限、完成的任务及其结果保留时间（秒）
+    app.config['SEARCH_JOB_WORKERS'] = 4
+    app.config['SEARCH_JOB_MAX_PENDING'] = 32
+    app.config['SEARCH_JOB_TTL'] = 600
+
+    # 搜索源策略配置：临时性错误最大重试次数、退避基础/上限时间（秒）、
+    # 连续失败多少次熔断、熔断后多少秒进入半开探测
+    app.config['SOURCE_MAX_RETRIES'] = 2
+    app.config['SOURCE_BACKOFF_BASE'] = 1.0
+    app.config['SOURCE_BACKOFF_MAX'] = 30.0
+    app.config['SOURCE_FAILURE_THRESHOLD'] = 3
+    app.config['SOURCE_RECOVERY_TIMEOUT'] = 300
+
+    # 原始页面归档目录（项目根目录下的archive），设为None时关闭归档
+    app.config['PAGE_ARCHIVE_DIR'] = os.path.join(os.path.dirname(app.root_path), 'archive')
+
+    # 调试页面采集：保存目录（项目根目录下的debug_pages，设为None时关闭；生产环境
+    # APP_ENV=production 下默认关闭）、正常页面的抽样比例（验证码、零结果和出错的页面总是保存）、
+    # 目录中保留的文件数上限
+    app.config['DEBUG_CAPTURE_DIR'] = (None if os.environ.get('APP_ENV', '').lower() == 'production'
+                                       else os.path.join(os.path.dirname(app.root_path), 'debug_pages'))
+    app.config['DEBUG_CAPTURE_SAMPLE_RATE'] = 0.05
+    app.config['DEBUG_CAPTURE_MAX_FILES'] = 200
+
+    # HTML解析引擎：默认引擎和按来源覆盖的引擎（html.parser / lxml / selectolax），
+    # 所需的库未安装时自动回退到html.parser
+    app.config['SPIDER_PARSE_ENGINE'] = 'lxml'
+    app.config['SPIDER_PARSE_ENGINES'] = {}
+
+    # 后台批量抓取配置：工作线程数、队列轮询间隔（秒）、子任务最多尝试次数（来源熔断、请求失败或写入失败时重试）、
+    # 子任务执行超时（秒，超时视为工作进程已退出并重新入队）、单个任务允许的最大页数和关键词数
+    app.config['CRAWL_WORKERS'] = 2
+    app.config['CRAWL_POLL_INTERVAL'] = 2.0
+    app.config['CRAWL_MAX_ATTEMPTS'] = 3
+    app.config['CRAWL_TASK_TIMEOUT'] = 900
+    app.config['CRAWL_MAX_PAGES'] = 10
+    app.config['CRAWL_MAX_KEYWORDS'] = 1000
+
+    # 关键词监控配置：是否在Web进程内运行调度线程（也可以通过 flask monitor-run 单独运行）、
+    # 检查到期监控的间隔（秒）、新登记监控的默认执行间隔（分钟）、每次最多翻页数
+    app.config['MONITOR_SCHEDULER_ENABLED'] = False
+    app.config['MONITOR_POLL_INTERVAL'] = 60
+    app.config['MONITOR_DEFAULT_INTERVAL'] = 1440
+    app.config['MONITOR_MAX_PAGES'] = 5
+
+    # 近似重复检测配置：写入时对标题、摘要近似的数据的处理方式（keep 不检测，留给 flask cluster-near-duplicates /
+    # mark 写入并标记 / skip 不写入）、判定为近似重复的最低Jaccard相似度（由MinHash签名估计）
+    app.config['NEAR_DUPLICATE_MODE'] = 'mark'
+    app.config['NEAR_DUPLICATE_THRESHOLD'] = 0.7
+
+    # 批量导入配置：默认每块行数（每块提交一次）、每块行数上限、汇总中保留的错误条数
+    app.config['IMPORT_CHUNK_SIZE'] = 1000
+    app.config['IMPORT_MAX_CHUNK_SIZE'] = 10000
+    app.config['IMPORT_MAX_ERRORS'] = 100
+
+    # 数据导出配置：每次从数据库读取的行数（Parquet导出时也是每个行组的行数）
+    app.config['EXPORT_BATCH_SIZE'] = 2000
+
+    # 启动时是否为旧记录回填URL指纹：大表回填耗时较长，默认关闭，通过 flask backfill-url-fingerprints 离线执行
+    app.config['URL_FINGERPRINT_BACKFILL_ON_STARTUP'] = False
+
+    if test_config:
+        app.config.update(test_config)
+
     # 初始化扩展
     db.init_app(app)
     login_manager.init_app(app)
@@ -37,10 +123,103 @@ def create_app():
     # 注册蓝图
     from app.routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
+
+    # 配置爬虫共享的限速器（爬虫所在的项目根目录已由routes模块加入导入路径）
+    import rate_limiter
+    rate_limiter.configure(
+        rate=app.config['SPIDER_RATE'],
+        burst=app.config['SPIDER_BURST'],
+        jitter=app.config['SPIDER_RATE_JITTER'],
+        host_limits=app.config['SPIDER_HOST_LIMITS'],
+        db_path=app.config['SPIDER_RATE_LIMIT_DB']
+    )
+
+    # 配置搜索结果缓存
+    from app import search_cache
+    search_cache.configure(
+        ttl=app.config['SEARCH_CACHE_TTL'],
+        max_entries=app.config['SEARCH_CACHE_MAX_ENTRIES'],
+        db_path=app.config['SEARCH_CACHE_DB'],
+        db_max_entries=app.config['SEARCH_CACHE_DB_MAX_ENTRIES']
+    )
+
+    # 配置异步搜索任务
+    from app import search_jobs
+    search_jobs.configure(
+        max_workers=app.config['SEARCH_JOB_WORKERS'],
+        max_pending=app.config['SEARCH_JOB_MAX_PENDING'],
+        ttl=app.config['SEARCH_JOB_TTL']
+    )
+
+    # 配置搜索源重试和熔断策略
+    import spider_policy
+    spider_policy.configure(
+        max_retries=app.config['SOURCE_MAX_RETRIES'],
+        base_delay=app.config['SOURCE_BACKOFF_BASE'],
+        max_delay=app.config['SOURCE_BACKOFF_MAX'],
+        failure_threshold=app.config['SOURCE_FAILURE_THRESHOLD'],
+        recovery_timeout=app.config['SOURCE_RECOVERY_TIMEOUT']
+    )
+
+    # 配置原始页面归档
+    import page_archive
+    page_archive.configure(app.config['PAGE_ARCHIVE_DIR'])
+
+    # 配置调试页面采集
+    import debug_capture
+    debug_capture.configure(
+        root=app.config['DEBUG_CAPTURE_DIR'],
+        sample_rate=app.config['DEBUG_CAPTURE_SAMPLE_RATE'],
+        max_files=app.config['DEBUG_CAPTURE_MAX_FILES']
+    )
+
+    # 配置爬虫的HTML解析引擎
+    import parse_engine
+    parse_engine.configure(
+        default=app.config['SPIDER_PARSE_ENGINE'],
+        sources=app.config['SPIDER_PARSE_ENGINES']
+    )
+
+    # 配置后台批量抓取工作线程池（提交任务时才启动线程）
+    from app import crawl_jobs
+    crawl_jobs.configure(
+        app,
+        workers=app.config['CRAWL_WORKERS'],
+        poll_interval=app.config['CRAWL_POLL_INTERVAL'],
+        max_attempts=app.config['CRAWL_MAX_ATTEMPTS'],
+        task_timeout=app.config['CRAWL_TASK_TIMEOUT']
+    )
+
+    # 配置近似重复检测
+    from app import near_duplicates
+    near_duplicates.configure(
+        mode=app.config['NEAR_DUPLICATE_MODE'],
+        threshold=app.config['NEAR_DUPLICATE_THRESHOLD']
+    )
+
+    # 配置关键词监控调度器
+    from app import monitoring
+    scheduler = monitoring.configure(app, poll_interval=app.config['MONITOR_POLL_INTERVAL'])
+
+    # 注册命令行工具
+    from app.cli import register_commands
+    register_commands(app)
     
     # 创建数据库表
     with app.app_context():
         db.create_all()
+        # create_all只创建缺失的表，已有的表需要补充后来新增的列和索引
+        from app import ingest
+        ingest.migrate_schema()
+        # 监控已见过的URL需在指纹唯一索引创建前补全指纹
+        monitoring.migrate_schema()
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # 旧记录的URL指纹默认通过 flask backfill-url-fingerprints 回填，启动时只做轻量的结构迁移
+        if app.config['URL_FINGERPRINT_BACKFILL_ON_STARTUP']:
+            ingest.backfill_url_fingerprints()
+        # 已有记录的近似重复聚类需通过 flask cluster-near-duplicates 执行
         # 创建默认管理员用户
         from app.models import User
         admin = User.query.filter_by(username='admin').first()
@@ -49,6 +228,10 @@ def create_app():
             db.session.add(admin)
             db.session.commit()
     
+    # 数据表创建完成后再启动进程内的关键词监控调度线程
+    if app.config['MONITOR_SCHEDULER_ENABLED']:
+        scheduler.start()
+    
     return app
 
 
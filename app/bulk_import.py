@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+批量导入模块：逐行读取NDJSON（每行一个JSON对象）或CSV数据，校验、规范化后按块
+经由批量写入路径（ingest.save_results）写入RawData，每块提交一次；
+任何时刻内存中只保留当前块，与文件大小无关
+"""
+
+import io
+import csv
+import json
+
+from app import db
+from app import ingest
+
+# 支持的数据格式
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+# 单行数据的最大字节数，超出的行视为无效并跳过
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def detect_format(name=None, content_type=None):
+    """
+    根据文件名或Content-Type判断数据格式，无法判断时为NDJSON
+
+    Returns:
+        ndjson 或 csv
+    """
+    if content_type and 'csv' in content_type.lower():
+        return CSV
+    if name and name.lower().endswith('.csv'):
+        return CSV
+    return NDJSON
+
+
+def iter_ndjson(stream):
+    """
+    逐行读取NDJSON：每次只读一行，过长的行读到行尾后丢弃
+
+    Args:
+        stream: 二进制流（请求体、文件）
+
+    Yields:
+        (行号, 解析出的对象或None, 错误说明或None)，空行跳过
+    """
+    line_no = 0
+    while True:
+        line = stream.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            break
+        line_no += 1
+        if len(line) > MAX_LINE_BYTES and not line.endswith(b'\n'):
+            # 丢弃该行的剩余部分
+            while True:
+                rest = stream.readline(MAX_LINE_BYTES)
+                if not rest or rest.endswith(b'\n'):
+                    break
+            yield line_no, None, f'行长度超过 {MAX_LINE_BYTES} 字节'
+            continue
+        if line_no == 1 and line.startswith(b'\xef\xbb\xbf'):
+            line = line[3:]
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f'JSON格式错误: {e}'
+
+
+def iter_csv(stream):
+    """
+    逐行读取带表头的CSV，列名与结果字段（title、url、summary、source等）及keyword对应，空值视为缺失
+
+    Args:
+        stream: 二进制流（请求体、文件）
+
+    Yields:
+        (行号, 行字典或None, 错误说明或None)
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    reader = csv.DictReader(text)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            yield reader.line_num, None, f'CSV格式错误: {e}'
+            continue
+        if None in row:
+            yield reader.line_num, None, '列数多于表头'
+            continue
+        yield reader.line_num, {key: value for key, value in row.items() if value not in (None, '')}, None
+
+
+def normalize_record(record, default_keyword=None):
+    """
+    校验并规范化一条导入数据
+
+    Args:
+        record: 解析出的对象
+        default_keyword: 数据中没有keyword时使用的关键词
+
+    Returns:
+        (关键词, 结果字典)
+
+    Raises:
+        ValueError: 数据无效
+    """
+    if not isinstance(record, dict):
+        raise ValueError('数据项不是对象')
+    record = dict(record)
+    keyword = record.pop('keyword', None) or default_keyword
+    if not isinstance(keyword, str) or not keyword.strip():
+        raise ValueError('缺少关键词')
+    for name in ('title', 'url', 'summary', 'content', 'source'):
+        value = record.get(name)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{name} 必须为字符串')
+    if not (record.get('title') or '').strip() and not (record.get('url') or '').strip():
+        raise ValueError('title 和 url 不能都为空')
+    return ' '.join(keyword.split()), record
+
+
+class ImportRun:
+    """
+    一次批量导入：逐块写入并累计各类写入结果，只保留前 max_errors 条错误
+    """
+
+    def __init__(self, chunk_size=1000, near_duplicate_mode=None, max_errors=100):
+        """
+        Args:
+            chunk_size: 每块的行数，每块提交一次
+            near_duplicate_mode: 近似重复的处理方式（keep / mark / skip），为None时使用配置的处理方式
+            max_errors: 汇总中保留的错误条数上限
+        """
+        self.chunk_size = chunk_size
+        self.near_duplicate_mode = near_duplicate_mode
+        self.max_errors = max_errors
+        self.lines = 0
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.counts = {outcome: 0 for outcome in ingest.OUTCOMES}
+        self.errors = []
+        self.error_count = 0
+
+    def _error(self, error):
+        """
+        记录一条错误，超出上限时只计数
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    def run(self, records, default_keyword=None):
+        """
+        逐块导入
+
+        Args:
+            records: (行号, 对象, 错误说明) 的迭代器，见 iter_ndjson / iter_csv
+            default_keyword: 数据中没有keyword时使用的关键词
+
+        Yields:
+            每块完成后的进度字典
+        """
+        chunk = []
+        for line_no, record, error in records:
+            self.lines = line_no
+            if error is None:
+                try:
+                    keyword, record = normalize_record(record, default_keyword)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                self.counts[ingest.INVALID] += 1
+                self._error({'line': line_no, 'message': error})
+                continue
+            chunk.append((line_no, keyword, record))
+            if len(chunk) >= self.chunk_size:
+                yield self._write(chunk)
+                chunk = []
+        if chunk:
+            yield self._write(chunk)
+
+    def _write(self, chunk):
+        """
+        写入一块数据并提交；整块失败时回滚，记录错误后继续下一块
+
+        Returns:
+            进度字典
+        """
+        self.chunks += 1
+        chunk_counts = {outcome: 0 for outcome in ingest.OUTCOMES}
+        # 同一块中的数据按关键词分组写入
+        groups = {}
+        for line_no, keyword, record in chunk:
+            groups.setdefault(keyword, []).append((line_no, record))
+
+        first_line, last_line = chunk[0][0], chunk[-1][0]
+        error = None
+        try:
+            with ingest.write_lock:
+                for keyword, items in groups.items():
+                    outcomes, _ = ingest.save_results(keyword, [record for _, record in items],
+                                                      self.near_duplicate_mode)
+                    for (line_no, _), outcome in zip(items, outcomes):
+                        chunk_counts[outcome['outcome']] += 1
+                        if outcome['outcome'] == ingest.INVALID:
+                            self._error({'line': line_no, 'message': outcome.get('message')})
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f'导入第 {self.chunks} 块（第 {first_line}-{last_line} 行）出错: {e}')
+            self.failed_chunks += 1
+            error = str(e)
+            chunk_counts = {outcome: 0 for outcome in ingest.OUTCOMES}
+            chunk_counts[ingest.INVALID] = len(chunk)
+            self._error({'lines': [first_line, last_line], 'message': f'整块写入失败: {e}'})
+
+        for outcome, count in chunk_counts.items():
+            self.counts[outcome] += count
+        progress = {
+            'chunk': self.chunks,
+            'lines': [first_line, last_line],
+            'counts': chunk_counts,
+            'total_counts': dict(self.counts)
+        }
+        if error is not None:
+            progress['error'] = error
+        print(f"导入进度: 第 {self.chunks} 块（第 {first_line}-{last_line} 行），新增 {chunk_counts[ingest.INSERTED]} 条，"
+              f"累计新增 {self.counts[ingest.INSERTED]} 条")
+        return progress
+
+    def summary(self):
+        """
+        导入汇总
+        """
+        return {
+            'lines': self.lines,
+            'chunks': self.chunks,
+            'failed_chunks': self.failed_chunks,
+            'counts': dict(self.counts),
+            'errors': list(self.errors),
+            'error_count': self.error_count
+        }
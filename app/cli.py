@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+命令行工具模块（通过 flask --app app:create_app <命令> 调用）
+"""
+
+import time
+import click
+from flask.cli import with_appcontext
+from app import db
+from app.models import RawData
+
+
+def _upsert_parsed_results(keyword, source, results):
+    """
+    将重新解析得到的结果写入RawData（不提交事务，调用方需持有write_lock）：已存在的记录更新摘要，
+    不存在的记录经 ingest.bulk_insert_results 按URL指纹去重并检测近似重复后批量新增
+
+    Returns:
+        (新增数量, 更新数量)
+    """
+    from search_result import ResultBatch
+    from app import ingest
+
+    batch = ResultBatch(keyword, results, source)
+    if not batch:
+        return 0, 0
+
+    # 一次查询取出本页所有URL指纹已有的记录
+    existing = {
+        item.url_fingerprint: item
+        for item in RawData.query.filter(RawData.url_fingerprint.in_(batch.fingerprints))
+    }
+
+    updated = 0
+    for row in batch.rows():
+        item = existing.get(row['url_fingerprint'])
+        if item is not None and row['summary'] and item.summary != row['summary']:
+            item.summary = row['summary']
+            item.content = item.content or row['summary']
+            updated += 1
+    return ingest.bulk_insert_results(keyword, source, results), updated
+
+
+@click.command('reparse-archive')
+@click.option('--source', default=None, help='只重新解析该来源（百度 / Bilibili）的页面')
+@click.option('--keyword', default=None, help='只重新解析该关键词的页面')
+@click.option('--workers', default=None, type=int, help='解析进程数，默认为CPU核数')
+@click.option('--commit-every', default=50, type=int, help='每处理多少个页面提交一次')
+@with_appcontext
+def reparse_archive_command(source, keyword, workers, commit_every):
+    """
+    用当前的解析规则重新解析归档页面，并写入RawData
+    """
+    from page_archive import get_page_archive, reparse
+    from app.ingest import write_lock
+
+    archive = get_page_archive()
+    if archive is None:
+        click.echo('页面归档未启用，请配置 PAGE_ARCHIVE_DIR')
+        return
+
+    started_at = time.monotonic()
+    pages = truncated = inserted = updated = 0
+    for entry, results in reparse(archive.iter_entries(source, keyword), workers=workers):
+        with write_lock:
+            page_inserted, page_updated = _upsert_parsed_results(entry['keyword'] or '未知', entry['source'],
+                                                                 results)
+        pages += 1
+        # 提前停止下载的页面只归档了前一部分（已包含足够的结果），单独计数便于判断解析结果是否完整
+        truncated += bool(entry['truncated'])
+        inserted += page_inserted
+        updated += page_updated
+        if pages % commit_every == 0:
+            with write_lock:
+                db.session.commit()
+            click.echo(f'已处理 {pages} 个页面，新增 {inserted} 条，更新 {updated} 条')
+    with write_lock:
+        db.session.commit()
+    click.echo(f'重新解析完成：{pages} 个页面（其中 {truncated} 个为提前停止下载的截断页面），'
+               f'新增 {inserted} 条，更新 {updated} 条，'
+               f'耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+@click.command('crawl')
+@click.option('--keyword', 'keywords', multiple=True, help='搜索关键词，可重复指定')
+@click.option('--keywords-file', type=click.File('r', encoding='utf-8'), default=None,
+              help='关键词文件，每行一个关键词')
+@click.option('--source', 'sources', multiple=True, help='来源（百度 / Bilibili），可重复指定，默认全部来源')
+@click.option('--pages', default=1, type=int, help='每个关键词抓取的页数')
+@click.option('--workers', default=None, type=int, help='工作线程数，默认为CRAWL_WORKERS')
+@click.option('--progress-every', default=30, type=int, help='每隔多少秒输出一次进度')
+@with_appcontext
+def crawl_command(keywords, keywords_file, sources, pages, workers, progress_every):
+    """
+    创建后台批量抓取任务并在前台执行到完成
+    """
+    from flask import current_app
+    from app import crawl_jobs
+    from app.models import CrawlJob
+
+    keywords = list(keywords)
+    if keywords_file is not None:
+        keywords.extend(keywords_file.read().splitlines())
+    keywords = crawl_jobs.parse_keywords(keywords)
+    sources = list(sources) or crawl_jobs.available_sources()
+    unknown = [source for source in sources if source not in crawl_jobs.available_sources()]
+    if not keywords:
+        raise click.UsageError('请通过 --keyword 或 --keywords-file 指定关键词')
+    if unknown:
+        raise click.UsageError(f"不支持的来源: {', '.join(unknown)}")
+    if pages < 1:
+        raise click.UsageError('--pages 必须大于0')
+
+    job = crawl_jobs.create_job(keywords, sources, pages)
+    pool = crawl_jobs.CrawlWorkerPool(current_app._get_current_object(),
+                                      workers=workers or current_app.config['CRAWL_WORKERS'],
+                                      poll_interval=current_app.config['CRAWL_POLL_INTERVAL'],
+                                      max_attempts=current_app.config['CRAWL_MAX_ATTEMPTS'],
+                                      task_timeout=current_app.config['CRAWL_TASK_TIMEOUT'])
+    started_at = time.monotonic()
+    pool.start()
+    try:
+        while True:
+            pool.join(timeout=progress_every)
+            db.session.expire_all()
+            progress = crawl_jobs.job_progress(db.session.get(CrawlJob, job.id))
+            click.echo(f"任务 {job.id}: {progress['percent']}%，抓取 {progress['results']} 条，"
+                       f"新增 {progress['inserted']} 条，子任务 {progress['tasks']}")
+            if progress['status'] in crawl_jobs.FINISHED_STATUSES:
+                break
+    except KeyboardInterrupt:
+        click.echo('正在等待执行中的子任务完成，未开始的子任务保留在队列中')
+    finally:
+        pool.stop()
+    click.echo(f'任务 {job.id} 结束，耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+@click.command('crawl-worker')
+@click.option('--workers', default=None, type=int, help='工作线程数，默认为CRAWL_WORKERS')
+@click.option('--forever', is_flag=True, help='队列为空后继续等待新任务，而不是退出')
+@with_appcontext
+def crawl_worker_command(workers, forever):
+    """
+    执行队列中所有待处理的抓取子任务（例如通过接口提交或上次中断的任务）
+    """
+    from flask import current_app
+    from app import crawl_jobs
+
+    pool = crawl_jobs.CrawlWorkerPool(current_app._get_current_object(),
+                                      workers=workers or current_app.config['CRAWL_WORKERS'],
+                                      poll_interval=current_app.config['CRAWL_POLL_INTERVAL'],
+                                      max_attempts=current_app.config['CRAWL_MAX_ATTEMPTS'],
+                                      task_timeout=current_app.config['CRAWL_TASK_TIMEOUT'])
+    pool.start(exit_when_idle=not forever)
+    try:
+        while pool.is_running():
+            pool.join(timeout=1)
+    except KeyboardInterrupt:
+        click.echo('正在等待执行中的子任务完成')
+        pool.stop()
+    click.echo('抓取队列已处理完毕')
+
+
+@click.command('monitor-add')
+@click.option('--keyword', 'keywords', multiple=True, help='监控的关键词，可重复指定')
+@click.option('--keywords-file', type=click.File('r', encoding='utf-8'), default=None,
+              help='关键词文件，每行一个关键词')
+@click.option('--source', 'sources', multiple=True, help='来源（百度 / Bilibili），可重复指定，默认全部来源')
+@click.option('--interval', default=None, type=int, help='执行间隔（分钟），默认为MONITOR_DEFAULT_INTERVAL')
+@click.option('--pages', default=None, type=int, help='每次最多翻页数，默认为MONITOR_MAX_PAGES')
+@with_appcontext
+def monitor_add_command(keywords, keywords_file, sources, interval, pages):
+    """
+    登记（或更新）关键词监控
+    """
+    from flask import current_app
+    from app import crawl_jobs, monitoring
+
+    keywords = list(keywords)
+    if keywords_file is not None:
+        keywords.extend(keywords_file.read().splitlines())
+    keywords = crawl_jobs.parse_keywords(keywords)
+    sources = list(sources) or crawl_jobs.available_sources()
+    unknown = [source for source in sources if source not in crawl_jobs.available_sources()]
+    interval = interval or current_app.config['MONITOR_DEFAULT_INTERVAL']
+    pages = pages or current_app.config['MONITOR_MAX_PAGES']
+    if not keywords:
+        raise click.UsageError('请通过 --keyword 或 --keywords-file 指定关键词')
+    if unknown:
+        raise click.UsageError(f"不支持的来源: {', '.join(unknown)}")
+    if interval < 1 or pages < 1:
+        raise click.UsageError('--interval 和 --pages 必须大于0')
+
+    for keyword in keywords:
+        monitor = monitoring.create_monitor(keyword, sources, interval, pages)
+        click.echo(f'已登记关键词监控 {monitor.id}: {keyword}，每 {interval} 分钟，最多 {pages} 页')
+
+
+@click.command('monitor-list')
+@with_appcontext
+def monitor_list_command():
+    """
+    列出已登记的关键词监控
+    """
+    from app import monitoring
+    from app.models import KeywordMonitor
+
+    for monitor in KeywordMonitor.query.order_by(KeywordMonitor.id):
+        info = monitoring.monitor_info(monitor)
+        click.echo(f"{info['id']:>4} {info['keyword']}  来源 {'、'.join(info['sources'])}  "
+                   f"每 {info['interval_minutes']} 分钟  最多 {info['max_pages']} 页  "
+                   f"{'启用' if info['enabled'] else '停用'}  下次 {info['next_run_at']}  "
+                   f"上次 {info['last_run_at'] or '-'} {info['last_status'] or ''} 新增 {info['last_inserted']} 条  "
+                   f"已见URL {info['seen_urls']} 条")
+
+
+@click.command('monitor-remove')
+@click.argument('keyword')
+@with_appcontext
+def monitor_remove_command(keyword):
+    """
+    删除关键词监控（已写入的数据保留）
+    """
+    from app import monitoring
+    from app.models import KeywordMonitor
+
+    monitor = KeywordMonitor.query.filter_by(keyword=' '.join(keyword.split())).first()
+    if monitor is None:
+        raise click.UsageError(f'关键词监控不存在: {keyword}')
+    monitoring.delete_monitor(monitor)
+    click.echo(f'已删除关键词监控: {monitor.keyword}')
+
+
+@click.command('monitor-run')
+@click.option('--once', is_flag=True, help='只执行当前到期的监控，然后退出')
+@with_appcontext
+def monitor_run_command(once):
+    """
+    运行关键词监控调度器（默认常驻，按间隔执行到期的监控）
+    """
+    from flask import current_app
+    from app import monitoring
+
+    scheduler = monitoring.MonitorScheduler(current_app._get_current_object(),
+                                            poll_interval=current_app.config['MONITOR_POLL_INTERVAL'])
+    scheduler.start(exit_when_idle=once)
+    try:
+        while scheduler.is_running():
+            scheduler.join(timeout=1)
+    except KeyboardInterrupt:
+        click.echo('正在等待执行中的监控完成')
+        scheduler.stop()
+    click.echo('关键词监控调度器已退出')
+
+
+@click.command('backfill-url-fingerprints')
+@click.option('--batch-size', default=1000, type=int, help='每批处理并提交的记录数')
+@with_appcontext
+def backfill_url_fingerprints_command(batch_size):
+    """
+    为尚无URL指纹的RawData记录分批计算指纹（配置URL_FINGERPRINT_BACKFILL_ON_STARTUP时启动时也会执行）
+    """
+    from app import ingest
+
+    started_at = time.monotonic()
+    filled, duplicates = ingest.backfill_url_fingerprints(batch_size)
+    click.echo(f'URL指纹回填完成：填充 {filled} 条，与已有记录重复 {duplicates} 条（保留并标记为已处理），'
+               f'耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+@click.command('cluster-near-duplicates')
+@click.option('--batch-size', default=1000, type=int, help='每批处理并提交的记录数')
+@click.option('--rebuild', is_flag=True, help='先清空已有的签名、分段索引和近似重复标记，再对全部记录重新聚类')
+@with_appcontext
+def cluster_near_duplicates_command(batch_size, rebuild):
+    """
+    为尚未计算签名的RawData记录计算MinHash签名、登记分段索引并标记近似重复
+    """
+    from app import near_duplicates
+
+    started_at = time.monotonic()
+    if rebuild:
+        near_duplicates.reset()
+        click.echo('已清空签名、分段索引和近似重复标记')
+    processed, marked = near_duplicates.cluster_existing(batch_size)
+    clusters = (db.session.query(RawData.near_duplicate_of)
+                .filter(RawData.near_duplicate_of.isnot(None)).distinct().count())
+    click.echo(f'近似重复聚类完成：处理 {processed} 条，标记近似重复 {marked} 条，'
+               f'当前共有 {clusters} 个包含近似重复的簇，耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+@click.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'data_format', type=click.Choice(['ndjson', 'csv']), default=None,
+              help='数据格式，默认按文件扩展名判断（.csv 为CSV，其余为NDJSON）')
+@click.option('--keyword', default=None, help='数据中没有keyword时使用的关键词')
+@click.option('--chunk-size', default=None, type=int, help='每块行数（每块提交一次），默认为IMPORT_CHUNK_SIZE')
+@click.option('--near-duplicates', type=click.Choice(['keep', 'mark', 'skip']), default=None,
+              help='近似重复的处理方式，默认为NEAR_DUPLICATE_MODE')
+@with_appcontext
+def import_data_command(path, data_format, keyword, chunk_size, near_duplicates):
+    """
+    从NDJSON或CSV文件（- 表示标准输入）流式导入数据到RawData
+    """
+    import sys
+    from flask import current_app
+    from app import bulk_import, ingest
+
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    if chunk_size < 1:
+        raise click.UsageError('--chunk-size 必须大于0')
+    data_format = data_format or bulk_import.detect_format(path)
+
+    started_at = time.monotonic()
+    run = bulk_import.ImportRun(chunk_size, near_duplicates, current_app.config['IMPORT_MAX_ERRORS'])
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        records = bulk_import.iter_csv(stream) if data_format == bulk_import.CSV else bulk_import.iter_ndjson(stream)
+        for progress in run.run(records, keyword):
+            if 'error' in progress:
+                click.echo(f"第 {progress['lines'][0]}-{progress['lines'][1]} 行写入失败: {progress['error']}")
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    summary = run.summary()
+    counts = summary['counts']
+    for error in summary['errors']:
+        line = error.get('line') or '-'.join(str(number) for number in error['lines'])
+        click.echo(f"第 {line} 行: {error['message']}")
+    if summary['error_count'] > len(summary['errors']):
+        click.echo(f"另有 {summary['error_count'] - len(summary['errors'])} 条错误未列出")
+    click.echo(f"导入完成：{summary['lines']} 行，{summary['chunks']} 块（失败 {summary['failed_chunks']} 块），"
+               f"新增 {counts[ingest.INSERTED]} 条，已存在 {counts[ingest.EXISTING]} 条，"
+               f"重复 {counts[ingest.DUPLICATE]} 条，近似重复 {counts[ingest.NEAR_DUPLICATE]} 条，"
+               f"无效 {counts[ingest.INVALID]} 条，耗时 {time.monotonic() - started_at:.1f} 秒")
+
+
+@click.command('export-data')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--format', 'data_format', type=click.Choice(['csv', 'ndjson', 'parquet']), default=None,
+              help='导出格式，默认按文件扩展名判断（标准输出默认为NDJSON）')
+@click.option('--keyword', default=None, help='只导出关键词、标题、摘要或内容包含该文本的数据')
+@click.option('--date', default=None, help='只导出该日期（YYYY-MM-DD）创建的数据')
+@click.option('--source', default=None, help='只导出该来源的数据')
+@click.option('--hide-near-duplicates', is_flag=True, help='只导出近似重复簇的代表记录')
+@click.option('--columns', default=None, help='逗号分隔的导出列，默认全部列')
+@click.option('--batch-size', default=None, type=int, help='每次读取的行数，默认为EXPORT_BATCH_SIZE')
+@with_appcontext
+def export_data_command(path, data_format, keyword, date, source, hide_near_duplicates, columns, batch_size):
+    """
+    将RawData流式导出为CSV、NDJSON或Parquet文件（- 表示标准输出）
+    """
+    import os
+    import sys
+    from flask import current_app
+    from app import export
+
+    if data_format is None:
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        data_format = {'csv': export.CSV, 'parquet': export.PARQUET}.get(extension, export.NDJSON)
+    if data_format == export.PARQUET and not export.parquet_available():
+        raise click.UsageError('导出Parquet需要安装pyarrow')
+    try:
+        columns = export.parse_columns(columns)
+        filters = export.build_filters(keyword, date, source, hide_near_duplicates)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    batch_size = batch_size or current_app.config['EXPORT_BATCH_SIZE']
+    if batch_size < 1:
+        raise click.UsageError('--batch-size 必须大于0')
+
+    started_at = time.monotonic()
+    output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    written = 0
+    try:
+        for chunk in export.export(data_format, filters, columns, batch_size):
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            output.write(data)
+            written += len(data)
+    finally:
+        if output is sys.stdout.buffer:
+            output.flush()
+        else:
+            output.close()
+    if path != '-':
+        click.echo(f'导出完成：{path}，{written / 1024 / 1024:.1f} MB，耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+def register_commands(app):
+    """
+    注册命令行工具
+    """
+    app.cli.add_command(reparse_archive_command)
+    app.cli.add_command(crawl_command)
+    app.cli.add_command(crawl_worker_command)
+    app.cli.add_command(monitor_add_command)
+    app.cli.add_command(monitor_list_command)
+    app.cli.add_command(monitor_remove_command)
+    app.cli.add_command(monitor_run_command)
+    app.cli.add_command(backfill_url_fingerprints_command)
+    app.cli.add_command(cluster_near_duplicates_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(export_data_command)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+后台批量抓取任务模块：任务和子任务保存在SQLite中，工作线程逐个领取子任务，
+调用爬虫抓取并将去重后的结果批量写入RawData
+"""
+
+import json
+import time
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from app import db
+from app.models import CrawlJob, CrawlTask
+from app.ingest import write_lock, bulk_insert_results
+
+# 任务/子任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+def parse_keywords(value):
+    """
+    解析关键词列表：接受列表，或以换行/逗号分隔的字符串；去掉空白项和重复项
+
+    Returns:
+        关键词列表，保持原有顺序
+    """
+    if isinstance(value, str):
+        value = value.replace('，', ',').replace(',', '\n').splitlines()
+    keywords = []
+    for keyword in value or []:
+        keyword = ' '.join(str(keyword).split())
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+    return keywords
+
+
+def available_sources():
+    """
+    可用于批量抓取的来源名称
+    """
+    from page_archive import SPIDER_CLASSES
+    return list(SPIDER_CLASSES)
+
+
+def create_job(keywords, sources, pages=1):
+    """
+    创建抓取任务，并为每个 关键词 × 页码 × 来源 生成一个待处理子任务
+
+    Returns:
+        CrawlJob实例
+    """
+    job = CrawlJob(keywords=json.dumps(keywords, ensure_ascii=False),
+                   sources=json.dumps(sources, ensure_ascii=False),
+                   pages=pages, status=PENDING)
+    db.session.add(job)
+    db.session.flush()
+    db.session.execute(CrawlTask.__table__.insert(), [
+        {'job_id': job.id, 'keyword': keyword, 'source': source, 'page': page, 'status': PENDING,
+         'attempts': 0, 'result_count': 0, 'inserted_count': 0}
+        for keyword in keywords for page in range(1, pages + 1) for source in sources
+    ])
+    db.session.commit()
+    print(f'已创建抓取任务 {job.id}: {len(keywords)} 个关键词 × {len(sources)} 个来源 × {pages} 页')
+    return job
+
+
+def cancel_job(job):
+    """
+    取消任务：尚未开始的子任务标记为已取消，正在执行的子任务会正常完成
+
+    Returns:
+        被取消的子任务数量
+    """
+    result = db.session.execute(update(CrawlTask)
+                                .where(CrawlTask.job_id == job.id, CrawlTask.status == PENDING)
+                                .values(status=CANCELLED, finished_at=datetime.utcnow()))
+    if job.status not in FINISHED_STATUSES:
+        job.status = CANCELLED
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return result.rowcount
+
+
+def claim_task(exclude_sources=()):
+    """
+    领取一个待处理子任务；通过带状态条件的UPDATE保证同一子任务只被一个工作线程（或进程）领取
+
+    Args:
+        exclude_sources: 不领取这些来源的子任务（例如处于熔断状态的来源）
+
+    Returns:
+        CrawlTask实例，没有可领取的子任务时返回None
+    """
+    for _ in range(5):
+        query = db.session.query(CrawlTask.id).filter(CrawlTask.status == PENDING)
+        if exclude_sources:
+            query = query.filter(CrawlTask.source.notin_(exclude_sources))
+        row = query.order_by(CrawlTask.id).first()
+        if row is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(update(CrawlTask)
+                                     .where(CrawlTask.id == row.id, CrawlTask.status == PENDING)
+                                     .values(status=RUNNING, attempts=CrawlTask.attempts + 1,
+                                             started_at=datetime.utcnow()))
+        db.session.commit()
+        if claimed.rowcount == 1:
+            task = db.session.get(CrawlTask, row.id)
+            db.session.execute(update(CrawlJob)
+                               .where(CrawlJob.id == task.job_id, CrawlJob.status == PENDING)
+                               .values(status=RUNNING))
+            db.session.commit()
+            return task
+        # 被其他工作线程抢先领取，重新选择
+    return None
+
+
+def requeue_stale_tasks(timeout):
+    """
+    将执行超时（通常是工作进程中途退出）的子任务放回待处理队列
+
+    Returns:
+        放回的子任务数量
+    """
+    result = db.session.execute(update(CrawlTask)
+                                .where(CrawlTask.status == RUNNING,
+                                       CrawlTask.started_at < datetime.utcnow() - timedelta(seconds=timeout))
+                                .values(status=PENDING))
+    db.session.commit()
+    if result.rowcount:
+        print(f'已将 {result.rowcount} 个超时未完成的抓取子任务放回队列')
+    return result.rowcount
+
+
+def _finish_job_if_done(job_id):
+    """
+    子任务全部结束后更新任务状态，调用方负责提交
+    """
+    remaining = db.session.query(func.count(CrawlTask.id)).filter(
+        CrawlTask.job_id == job_id, CrawlTask.status.in_((PENDING, RUNNING))).scalar()
+    if remaining:
+        return
+    failed = db.session.query(func.count(CrawlTask.id)).filter(
+        CrawlTask.job_id == job_id, CrawlTask.status == FAILED).scalar()
+    db.session.execute(update(CrawlJob)
+                       .where(CrawlJob.id == job_id, CrawlJob.status.notin_(FINISHED_STATUSES))
+                       .values(status=FAILED if failed else DONE, finished_at=datetime.utcnow()))
+
+
+def job_progress(job, include_failures=False):
+    """
+    汇总任务进度
+
+    Args:
+        job: CrawlJob实例
+        include_failures: 是否附带失败子任务的错误信息
+
+    Returns:
+        进度字典
+    """
+    counts = dict(db.session.query(CrawlTask.status, func.count(CrawlTask.id))
+                  .filter(CrawlTask.job_id == job.id).group_by(CrawlTask.status))
+    result_count, inserted_count = db.session.query(
+        func.coalesce(func.sum(CrawlTask.result_count), 0),
+        func.coalesce(func.sum(CrawlTask.inserted_count), 0)).filter(CrawlTask.job_id == job.id).one()
+    total = sum(counts.values())
+    finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+
+    progress = {
+        'id': job.id,
+        'status': job.status,
+        'keywords': json.loads(job.keywords),
+        'sources': json.loads(job.sources),
+        'pages': job.pages,
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        'finished_at': job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None,
+        'total_tasks': total,
+        'tasks': {status: counts.get(status, 0) for status in (PENDING, RUNNING) + FINISHED_STATUSES},
+        'percent': round(finished * 100 / total, 1) if total else 100.0,
+        'results': result_count,
+        'inserted': inserted_count
+    }
+    if include_failures:
+        progress['failures'] = [
+            {'keyword': task.keyword, 'source': task.source, 'page': task.page,
+             'attempts': task.attempts, 'error': task.error}
+            for task in CrawlTask.query.filter_by(job_id=job.id, status=FAILED).order_by(CrawlTask.id).limit(50)
+        ]
+    return progress
+
+
+class CrawlWorkerPool:
+    """
+    后台抓取工作线程池：每个线程在独立的应用上下文中循环领取并执行子任务
+    """
+
+    def __init__(self, app, workers=2, poll_interval=2.0, max_attempts=3, task_timeout=900):
+        """
+        Args:
+            app: Flask应用实例
+            workers: 工作线程数（同一主机的请求仍受共享限速器约束）
+            poll_interval: 队列为空或来源熔断时的轮询间隔（秒）
+            max_attempts: 子任务的最大尝试次数，来源熔断、请求失败或结果写入失败时在此之前放回队列重试
+            task_timeout: 子任务执行超过该时间（秒）视为工作进程已退出，重新入队
+        """
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.task_timeout = task_timeout
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        """
+        是否有存活的工作线程
+        """
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, exit_when_idle=False):
+        """
+        启动工作线程（已在运行时不重复启动）
+
+        Args:
+            exit_when_idle: 为True时队列中没有待处理子任务后线程自动退出
+        """
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop_event.clear()
+            with self.app.app_context():
+                requeue_stale_tasks(self.task_timeout)
+            self._threads = [
+                threading.Thread(target=self._worker_loop, args=(exit_when_idle,),
+                                 name=f'crawl-worker-{index}', daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            print(f'已启动 {self.workers} 个抓取工作线程')
+
+    def stop(self, wait=True):
+        """
+        通知工作线程在当前子任务完成后退出
+        """
+        self._stop_event.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def join(self, timeout=None):
+        """
+        等待所有工作线程退出
+        """
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _worker_loop(self, exit_when_idle):
+        from spider_policy import get_policy
+
+        with self.app.app_context():
+            # 爬虫实例按线程复用，实例内部的会话池和限速器仍为进程共享
+            spiders = {}
+            while not self._stop_event.is_set():
+                blocked = [source for source in available_sources() if get_policy(source).breaker.is_open()]
+                try:
+                    task = claim_task(exclude_sources=blocked)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f'领取抓取子任务出错: {e}')
+                    task = None
+                if task is None:
+                    if exit_when_idle and not self._has_pending_tasks():
+                        break
+                    self._stop_event.wait(self.poll_interval)
+                    continue
+                self._run_task(task, spiders)
+                db.session.remove()
+
+    def _has_pending_tasks(self):
+        """
+        队列中是否还有待处理或执行中的子任务
+        """
+        count = db.session.query(func.count(CrawlTask.id)).filter(
+            CrawlTask.status.in_((PENDING, RUNNING))).scalar()
+        db.session.rollback()
+        return count > 0
+
+    def _get_spider(self, source, spiders):
+        """
+        获取当前线程的爬虫实例
+        """
+        if source not in spiders:
+            import importlib
+            from page_archive import SPIDER_CLASSES
+
+            module_name, class_name = SPIDER_CLASSES[source]
+            spiders[source] = getattr(importlib.import_module(module_name), class_name)()
+        return spiders[source]
+
+    def _run_task(self, task, spiders):
+        """
+        执行一个子任务并记录结果
+        """
+        from spider_policy import get_policy
+
+        print(f'执行抓取子任务 {task.id}: {task.keyword} - {task.source} 第 {task.page} 页')
+        try:
+            spider = self._get_spider(task.source, spiders)
+            results = spider.search(task.keyword, task.page)
+        except Exception as e:
+            print(f'抓取子任务 {task.id} 出错: {e}')
+            print(traceback.format_exc())
+            self._complete_task(task.id, FAILED, error=str(e))
+            return
+
+        # 爬虫在请求失败、被封锁时返回空结果（被封锁时同时触发熔断），不能当作没有结果的页面，
+        # 子任务放回队列重试
+        if not results:
+            if get_policy(task.source).breaker.is_open():
+                self._retry_or_fail(task, f'{task.source} 处于熔断状态')
+                return
+            if getattr(spider, 'last_error', None):
+                self._retry_or_fail(task, spider.last_error)
+                return
+
+        if not self._complete_task(task.id, DONE, results=results, keyword=task.keyword, source=task.source):
+            self._retry_or_fail(task, '写入抓取结果失败')
+
+    def _retry_or_fail(self, task, reason):
+        """
+        子任务未完成时放回队列，已达最大尝试次数时标记为失败
+        """
+        if task.attempts < self.max_attempts:
+            print(f'抓取子任务 {task.id} 未完成（{reason}），放回队列')
+            status, error = PENDING, reason
+        else:
+            status, error = FAILED, f'{reason}，已尝试 {task.attempts} 次'
+        if not self._complete_task(task.id, status, error=error):
+            print(f'抓取子任务 {task.id} 状态无法更新，将在执行超时（{self.task_timeout} 秒）后放回队列')
+
+    def _complete_task(self, task_id, status, results=None, keyword=None, source=None, error=None):
+        """
+        在同一事务中写入结果并更新子任务和任务状态
+
+        Returns:
+            是否写入成功；多次重试后仍失败时返回False，子任务保持原状态
+        """
+        attempts = 3
+        for attempt in range(attempts):
+            try:
+                with write_lock:
+                    inserted = bulk_insert_results(keyword, source, results) if results else 0
+                    values = {'status': status, 'error': error}
+                    if status != PENDING:
+                        values.update(result_count=len(results or []), inserted_count=inserted,
+                                      finished_at=datetime.utcnow())
+                    db.session.execute(update(CrawlTask).where(CrawlTask.id == task_id).values(**values))
+                    job_id = db.session.get(CrawlTask, task_id).job_id
+                    _finish_job_if_done(job_id)
+                    db.session.commit()
+                if results:
+                    print(f'抓取子任务 {task_id} 完成：{len(results)} 条结果，新增 {inserted} 条')
+                return True
+            except Exception as e:
+                # SQLite在多个进程同时写入时可能短暂锁库，稍后重试
+                db.session.rollback()
+                print(f'写入抓取子任务 {task_id} 结果出错: {e}')
+                if attempt + 1 < attempts:
+                    time.sleep(1 + attempt)
+                else:
+                    print(f'写入抓取子任务 {task_id} 结果失败，已重试 {attempts} 次，放弃写入: {e}')
+                    print(traceback.format_exc())
+        return False
+
+
+# 进程内共享的抓取工作线程池
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def configure(app, workers=2, poll_interval=2.0, max_attempts=3, task_timeout=900):
+    """
+    配置进程内共享的抓取工作线程池（不会立即启动线程）
+
+    Returns:
+        新的CrawlWorkerPool实例
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.stop(wait=False)
+        _worker_pool = CrawlWorkerPool(app, workers, poll_interval, max_attempts, task_timeout)
+    return _worker_pool
+
+
+def get_worker_pool():
+    """
+    获取进程内共享的抓取工作线程池，未配置时返回None
+    """
+    return _worker_pool
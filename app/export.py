@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+数据导出模块：按ID分块（键集分页）读取RawData的指定列，不创建ORM对象，逐块编码为
+CSV、NDJSON或Parquet输出；任何时刻内存中只保留一块数据，导出整个数据仓库也不例外
+"""
+
+import io
+import csv
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select
+from app import db
+from app.models import RawData
+
+# 支持的导出格式
+CSV = 'csv'
+NDJSON = 'ndjson'
+PARQUET = 'parquet'
+FORMATS = (CSV, NDJSON, PARQUET)
+MIMETYPES = {
+    CSV: 'text/csv',
+    NDJSON: 'application/x-ndjson',
+    PARQUET: 'application/vnd.apache.parquet'
+}
+
+# 可导出的列，默认全部导出
+COLUMNS = ('id', 'keyword', 'title', 'url', 'summary', 'content', 'source', 'near_duplicate_of', 'created_at')
+
+
+def build_filters(keyword=None, date=None, source=None, hide_near_duplicates=False):
+    """
+    构建与 /get_raw_data 相同的筛选条件
+
+    Args:
+        keyword: 在关键词、标题、摘要、内容中查找
+        date: 创建日期，格式为 YYYY-MM-DD
+        source: 来源名称
+        hide_near_duplicates: 是否只保留近似重复簇的代表记录
+
+    Returns:
+        SQLAlchemy条件列表
+
+    Raises:
+        ValueError: 日期格式错误
+    """
+    filters = []
+    if keyword:
+        filters.append(or_(
+            RawData.keyword.contains(keyword),
+            RawData.title.contains(keyword),
+            RawData.summary.contains(keyword),
+            RawData.content.contains(keyword)
+        ))
+    if date:
+        target_date = datetime.strptime(date, '%Y-%m-%d')
+        filters.append(RawData.created_at >= target_date)
+        filters.append(RawData.created_at < target_date + timedelta(days=1))
+    if source:
+        filters.append(RawData.source == source)
+    if hide_near_duplicates:
+        filters.append(RawData.near_duplicate_of.is_(None))
+    return filters
+
+
+def parse_columns(value):
+    """
+    解析逗号分隔的列名，为空时返回全部列
+
+    Returns:
+        列名元组
+
+    Raises:
+        ValueError: 包含未知的列名
+    """
+    if not value:
+        return COLUMNS
+    columns = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}，可选的列为 {', '.join(COLUMNS)}")
+    return columns or COLUMNS
+
+
+def iter_batches(filters, columns=COLUMNS, batch_size=2000):
+    """
+    按ID升序分块读取：每块一次 WHERE id > 上一块最后的ID ... LIMIT 查询，只取所需的列
+
+    Yields:
+        行元组列表（列顺序与columns一致）
+    """
+    selected = [getattr(RawData, name) for name in columns]
+    # 键集分页需要ID，未导出ID时额外读取并在输出前去掉
+    with_id = 'id' not in columns
+    if with_id:
+        selected.append(RawData.id)
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*selected).where(RawData.id > last_id, *filters).order_by(RawData.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][-1] if with_id else rows[-1][columns.index('id')]
+        yield [tuple(row[:-1]) if with_id else tuple(row) for row in rows]
+        if len(rows) < batch_size:
+            break
+
+
+def _format_value(value):
+    """
+    转换为文本格式中的值：时间为 YYYY-MM-DD HH:MM:SS
+    """
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def iter_csv(batches, columns):
+    """
+    编码为CSV（带BOM，便于Excel识别UTF-8），每块输出一段文本
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_format_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(batches, columns):
+    """
+    编码为NDJSON，每行一条记录，每块输出一段文本
+    """
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(columns, map(_format_value, row))), ensure_ascii=False) + '\n'
+                      for row in rows)
+
+
+class _ChunkSink:
+    """
+    供ParquetWriter写入的只追加文件对象，写入的数据由生成器逐段取走
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        """
+        取走已写入的数据
+        """
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_available():
+    """
+    是否已安装Parquet导出所需的pyarrow
+    """
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(batches, columns):
+    """
+    编码为Parquet，每块写为一个行组并立即输出（需要pyarrow）
+
+    Raises:
+        ImportError: 未安装pyarrow
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'id': pa.int64(), 'near_duplicate_of': pa.int64(), 'created_at': pa.timestamp('us')}
+    schema = pa.schema([(name, types.get(name, pa.string())) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            values = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    CSV: iter_csv,
+    NDJSON: iter_ndjson,
+    PARQUET: iter_parquet
+}
+
+
+def export(data_format, filters, columns=COLUMNS, batch_size=2000):
+    """
+    流式导出
+
+    Args:
+        data_format: csv / ndjson / parquet
+        filters: build_filters 构建的筛选条件
+        columns: 导出的列
+        batch_size: 每次读取的行数
+
+    Returns:
+        逐段输出的生成器，CSV和NDJSON为文本，Parquet为字节串
+    """
+    return ENCODERS[data_format](iter_batches(filters, columns, batch_size), columns)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+RawData批量写入模块：整批规范化、按URL指纹批内去重，用一次指纹索引查询找出已存在的记录，
+再用一条 INSERT ... ON CONFLICT DO NOTHING 插入新记录；指纹列的唯一索引保证并发写入时也不会重复。
+插入前由near_duplicates模块查找标题、摘要近似的记录，按配置标记或跳过
+"""
+
+import threading
+from urllib.parse import urlparse
+from sqlalchemy import inspect, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app import near_duplicates
+from app.models import RawData
+
+# 同一进程内的写入互斥，保证"查重 + 插入"不会被并发的请求或工作线程穿插
+write_lock = threading.Lock()
+
+# 单条数据的写入结果
+INSERTED = 'inserted'
+EXISTING = 'existing'
+DUPLICATE = 'duplicate'
+NEAR_DUPLICATE = 'near_duplicate'
+INVALID = 'invalid'
+OUTCOMES = (INSERTED, EXISTING, DUPLICATE, NEAR_DUPLICATE, INVALID)
+
+# 旧版本创建的raw_data表需要补充的列
+ADDED_COLUMNS = {
+    'url_fingerprint': 'VARCHAR(32)',
+    'minhash': 'BLOB',
+    'near_duplicate_of': 'INTEGER'
+}
+
+# 回填时与更早的记录重复的旧记录的指纹前缀（后接记录ID，保持唯一），表示已处理，不会与真正的指纹冲突
+DUPLICATE_FINGERPRINT_PREFIX = 'duplicate:'
+
+# 一次IN查询最多携带的指纹数，避免超出SQLite的参数个数上限
+LOOKUP_CHUNK_SIZE = 500
+
+
+def normalize_source(source, url=None):
+    """
+    标准化来源名称；没有来源信息时尝试从URL推断
+
+    Returns:
+        来源名称，无法确定时返回空字符串
+    """
+    if source:
+        if source.find('百度') != -1:
+            return '百度'
+        if source.find('B站') != -1 or source.find('Bilibili') != -1:
+            return 'Bilibili'
+        return source
+    if url:
+        netloc = urlparse(url).netloc
+        if 'baidu' in netloc:
+            return '百度'
+        if 'bilibili' in netloc:
+            return 'Bilibili'
+        return netloc
+    return ''
+
+
+def existing_fingerprints(fingerprints):
+    """
+    一次性找出数据库中已存在的URL指纹（指纹列唯一索引上的集合查询，按块进行）
+
+    Returns:
+        已存在的指纹集合
+    """
+    fingerprints = list(fingerprints)
+    existing = set()
+    for start in range(0, len(fingerprints), LOOKUP_CHUNK_SIZE):
+        existing.update(fingerprint for (fingerprint,) in db.session.query(RawData.url_fingerprint).filter(
+            RawData.url_fingerprint.in_(fingerprints[start:start + LOOKUP_CHUNK_SIZE])))
+    return existing
+
+
+def insert_rows(rows, links=()):
+    """
+    插入新记录，指纹已存在的行（例如被并发的请求抢先写入）由数据库忽略；
+    插入后登记近似重复检测的分段索引
+
+    Args:
+        rows: 行字典列表
+        links: near_duplicates.detect 返回的批次内近似重复
+
+    Returns:
+        实际插入的数量
+    """
+    if not rows:
+        return 0
+    # 通过Core连接执行（与ORM会话同一事务），executemany的rowcount为实际插入的总行数
+    inserted = db.session.connection().execute(
+        sqlite_insert(RawData).on_conflict_do_nothing(index_elements=['url_fingerprint']), rows).rowcount
+    near_duplicates.index_rows(rows, links)
+    return inserted
+
+
+def save_results(keyword, items, near_duplicate_mode=None):
+    """
+    批量保存用户提交的结果（不提交事务，调用方需持有write_lock）：同一来源下规范化URL相同视为重复，
+    标题和摘要近似的数据按 near_duplicate_mode 处理
+
+    Args:
+        keyword: 搜索关键词
+        items: 结果字典（或SearchResult）列表
+        near_duplicate_mode: keep / mark / skip，为None时使用配置的处理方式
+
+    Returns:
+        (每条数据的写入结果列表, 新增数量)；写入结果为字典，包含 index、outcome，
+        批内重复的数据另有 duplicate_of（首次出现的序号），无效数据另有 message；
+        发现近似重复的数据另有 near_duplicate_of（已有记录的ID）或 near_duplicate_of_index
+        （批内近似数据的序号），以及 similarity（估计的Jaccard相似度）
+    """
+    from search_result import SearchResult
+
+    outcomes = [None] * len(items)
+    rows = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, (dict, SearchResult)):
+            outcomes[index] = {'index': index, 'outcome': INVALID, 'message': '数据项不是字典格式'}
+            continue
+        try:
+            result = SearchResult.from_dict(item)
+            result.title = (result.title.strip() if isinstance(result.title, str) else '') or '无标题'
+            row = result.to_raw_data_kwargs(keyword, normalize_source(result.source, result.url))
+        except (TypeError, ValueError, AttributeError) as e:
+            outcomes[index] = {'index': index, 'outcome': INVALID, 'message': str(e)}
+            continue
+        key = row['url_fingerprint']
+        if key in rows:
+            outcomes[index] = {'index': index, 'outcome': DUPLICATE, 'duplicate_of': rows[key][0]}
+            continue
+        rows[key] = (index, row)
+
+    if not rows:
+        return outcomes, 0
+
+    existing = existing_fingerprints(rows)
+    new_indexes, new_rows = [], []
+    for key, (index, row) in rows.items():
+        if key in existing:
+            outcomes[index] = {'index': index, 'outcome': EXISTING}
+        else:
+            new_indexes.append(index)
+            new_rows.append(row)
+
+    mode = near_duplicate_mode or near_duplicates.get_mode()
+    keep, matches, links = near_duplicates.detect(new_rows, mode)
+    for position, index in enumerate(new_indexes):
+        outcome = {'index': index, 'outcome': INSERTED}
+        if position in matches:
+            row_id, earlier, score = matches[position]
+            if mode == near_duplicates.SKIP:
+                outcome['outcome'] = NEAR_DUPLICATE
+            if row_id is not None:
+                outcome['near_duplicate_of'] = row_id
+            else:
+                outcome['near_duplicate_of_index'] = new_indexes[earlier]
+            outcome['similarity'] = round(score, 3)
+        outcomes[index] = outcome
+    return outcomes, insert_rows(keep, links)
+
+
+def bulk_insert_results(keyword, source, results):
+    """
+    将一页搜索结果去重后批量写入RawData（不提交事务，调用方需持有write_lock）
+
+    去重规则与 /save_data 一致：同一来源下规范化URL相同视为重复，近似重复按配置的处理方式处理
+
+    Returns:
+        实际新增的数量
+    """
+    from search_result import ResultBatch
+
+    batch = ResultBatch(keyword, results, source)
+    if not batch:
+        return 0
+
+    # 一次查询取出本页已有记录的指纹
+    keep, _, links = near_duplicates.detect(batch.rows(exclude=existing_fingerprints(batch.fingerprints)))
+    return insert_rows(keep, links)
+
+
+def migrate_schema():
+    """
+    为旧版本创建的raw_data表补充后来新增的列（其索引由create_app统一补建）
+
+    Returns:
+        新增的列名列表
+    """
+    columns = {column['name'] for column in inspect(db.engine).get_columns(RawData.__tablename__)}
+    added = [name for name in ADDED_COLUMNS if name not in columns]
+    for name in added:
+        db.session.execute(text(f'ALTER TABLE {RawData.__tablename__} ADD COLUMN {name} {ADDED_COLUMNS[name]}'))
+        print(f'已为raw_data表添加{name}列')
+    db.session.commit()
+    return added
+
+
+def backfill_url_fingerprints(batch_size=1000):
+    """
+    分批为尚无指纹的记录计算URL指纹，每批提交一次
+
+    与更早的记录指纹相同的记录是已经存在的重复数据，不删除，指纹记为 duplicate:<ID> 表示已处理，
+    因此每条记录只处理一次，回填完成后再次执行只需一次索引查询
+
+    Returns:
+        (填充的记录数, 重复的记录数)
+    """
+    from search_result import url_fingerprint
+
+    filled = duplicates = 0
+    last_id = 0
+    while True:
+        rows = (db.session.query(RawData.id, RawData.title, RawData.url, RawData.source)
+                .filter(RawData.url_fingerprint.is_(None), RawData.id > last_id)
+                .order_by(RawData.id).limit(batch_size).all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        fingerprints = {row.id: url_fingerprint(row.url, row.source, row.title) for row in rows}
+        with write_lock:
+            taken = existing_fingerprints(set(fingerprints.values()))
+            updates = []
+            for row_id, fingerprint in fingerprints.items():
+                if fingerprint in taken:
+                    duplicates += 1
+                    fingerprint = f'{DUPLICATE_FINGERPRINT_PREFIX}{row_id}'
+                else:
+                    filled += 1
+                    taken.add(fingerprint)
+                updates.append({'id': row_id, 'url_fingerprint': fingerprint})
+            if updates:
+                db.session.execute(update(RawData), updates)
+            db.session.commit()
+        print(f'URL指纹回填: 已填充 {filled} 条，重复 {duplicates} 条')
+    return filled, duplicates
@@ -28,7 +28,6 @@ class RawData(db.Model):
     原始数据模型
     """
     __tablename__ = 'raw_data'
-    
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     keyword = db.Column(db.String(200), nullable=False, index=True)
     title = db.Column(db.String(500), nullable=True)
@@ -36,6 +35,13 @@ class RawData(db.Model):
     content = db.Column(db.Text, nullable=True)
     summary = db.Column(db.Text, nullable=True)
     source = db.Column(db.String(200), nullable=True)
+    # 来源 + 规范化URL 的指纹（见 search_result.url_fingerprint），唯一索引保证同一页面只保存一次；
+    # 回填时发现的旧重复记录为 duplicate:<ID>（见 ingest.backfill_url_fingerprints）
+    url_fingerprint = db.Column(db.String(32), nullable=True, unique=True, index=True)
+    # 标题 + 摘要 的MinHash签名（见 app.near_duplicates，文本过短时为空字节串，尚未计算时为NULL）
+    minhash = db.Column(db.LargeBinary, nullable=True)
+    # 近似重复时指向所在簇中最早的记录（簇的代表记录本身为NULL）
+    near_duplicate_of = db.Column(db.Integer, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
@@ -53,4 +59,115 @@ class ReportData(db.Model):
     related_raw_data = db.Column(db.String(500), nullable=True)  # 存储关联的原始数据ID
     
     def __repr__(self):
-        return f'<ReportData {self.id}: {self.title}>'
\ No newline at end of file
+        return f'<ReportData {self.id}: {self.title}>'
+
+class CrawlJob(db.Model):
+    """
+    后台抓取任务模型：一组关键词 × 来源 × 页码
+    """
+    __tablename__ = 'crawl_job'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    keywords = db.Column(db.Text, nullable=False)  # JSON数组
+    sources = db.Column(db.String(200), nullable=False)  # JSON数组
+    pages = db.Column(db.Integer, nullable=False, default=1)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<CrawlJob {self.id}: {self.status}>'
+
+
+class CrawlTask(db.Model):
+    """
+    后台抓取子任务模型：一个关键词在一个来源上的一页
+    """
+    __tablename__ = 'crawl_task'
+    __table_args__ = (
+        db.Index('ix_crawl_task_status_id', 'status', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('crawl_job.id'), nullable=False, index=True)
+    keyword = db.Column(db.String(200), nullable=False)
+    source = db.Column(db.String(200), nullable=False)
+    page = db.Column(db.Integer, nullable=False, default=1)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+    inserted_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<CrawlTask {self.id}: {self.keyword} {self.source} p{self.page} {self.status}>'
+
+
+class KeywordMonitor(db.Model):
+    """
+    关键词监控：按固定间隔重新抓取关键词，只写入新出现的结果
+    """
+    __tablename__ = 'keyword_monitor'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    keyword = db.Column(db.String(200), nullable=False, unique=True)
+    sources = db.Column(db.String(200), nullable=False)  # JSON数组
+    interval_minutes = db.Column(db.Integer, nullable=False, default=1440)
+    max_pages = db.Column(db.Integer, nullable=False, default=5)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    last_pages = db.Column(db.Integer, nullable=False, default=0)
+    last_inserted = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<KeywordMonitor {self.id}: {self.keyword}>'
+
+
+class MonitorSeenUrl(db.Model):
+    """
+    关键词监控已见过的结果URL，用于判断一页结果是否全部为旧结果；
+    按URL指纹比较，百度每次搜索都会变化的跳转链接等指向同一页面的链接视为同一结果
+    """
+    __tablename__ = 'monitor_seen_url'
+    __table_args__ = (
+        db.UniqueConstraint('monitor_id', 'source', 'url', name='uq_monitor_seen_url'),
+        db.Index('uq_monitor_seen_url_fingerprint', 'monitor_id', 'url_fingerprint', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    monitor_id = db.Column(db.Integer, db.ForeignKey('keyword_monitor.id'), nullable=False)
+    source = db.Column(db.String(200), nullable=False)
+    url = db.Column(db.String(1000), nullable=False)
+    # 来源 + 规范化URL 的指纹（见 search_result.url_fingerprint，与RawData的指纹一致）
+    url_fingerprint = db.Column(db.String(32), nullable=True)
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<MonitorSeenUrl {self.monitor_id}: {self.url}>'
+
+
+
+class NearDuplicateBand(db.Model):
+    """
+    近似重复检测的LSH分段索引：每个近似重复簇的代表记录每个分段登记一个桶，
+    只有至少一个桶相同的记录才需要比较签名
+    """
+    __tablename__ = 'near_duplicate_band'
+    __table_args__ = (
+        # 按桶查找候选记录，同时保证同一记录的同一个桶只登记一次
+        db.UniqueConstraint('bucket', 'raw_data_id', name='uq_near_duplicate_band'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    raw_data_id = db.Column(db.Integer, db.ForeignKey('raw_data.id'), nullable=False, index=True)
+    # 分段序号和该段哈希值的63位哈希
+    bucket = db.Column(db.BigInteger, nullable=False)
+    
+    def __repr__(self):
+        return f'<NearDuplicateBand {self.raw_data_id}: {self.bucket}>'
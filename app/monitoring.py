@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+关键词监控模块：按固定间隔重新抓取登记的关键词，记住每个关键词已见过的URL指纹，
+一页结果全部是已见过的URL时停止翻页（每多翻一页都要付出数秒的礼貌延迟），
+只将新出现的结果写入RawData
+"""
+
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.ingest import write_lock, bulk_insert_results
+from app.models import KeywordMonitor, MonitorSeenUrl
+
+# 最近一次执行的状态
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def create_monitor(keyword, sources, interval_minutes=1440, max_pages=5):
+    """
+    登记关键词监控，关键词已登记时更新其来源、间隔和页数，并在下一轮调度时立即执行
+
+    Returns:
+        KeywordMonitor实例
+    """
+    monitor = KeywordMonitor.query.filter_by(keyword=keyword).first()
+    if monitor is None:
+        monitor = KeywordMonitor(keyword=keyword)
+        db.session.add(monitor)
+    monitor.sources = json.dumps(sources, ensure_ascii=False)
+    monitor.interval_minutes = interval_minutes
+    monitor.max_pages = max_pages
+    monitor.enabled = True
+    monitor.next_run_at = datetime.utcnow()
+    db.session.commit()
+    return monitor
+
+
+def delete_monitor(monitor):
+    """
+    删除关键词监控及其已见过的URL（已写入的RawData保留）
+    """
+    MonitorSeenUrl.query.filter_by(monitor_id=monitor.id).delete()
+    db.session.delete(monitor)
+    db.session.commit()
+
+
+def monitor_info(monitor):
+    """
+    关键词监控的配置和最近一次执行情况
+    """
+    def format_time(value):
+        return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+    return {
+        'id': monitor.id,
+        'keyword': monitor.keyword,
+        'sources': json.loads(monitor.sources),
+        'interval_minutes': monitor.interval_minutes,
+        'max_pages': monitor.max_pages,
+        'enabled': monitor.enabled,
+        'next_run_at': format_time(monitor.next_run_at),
+        'last_run_at': format_time(monitor.last_run_at),
+        'last_status': monitor.last_status,
+        'last_error': monitor.last_error,
+        'last_pages': monitor.last_pages,
+        'last_inserted': monitor.last_inserted,
+        'seen_urls': MonitorSeenUrl.query.filter_by(monitor_id=monitor.id).count()
+    }
+
+
+def claim_due_monitor():
+    """
+    领取一个到期的关键词监控，同时把下次执行时间推后一个间隔；
+    通过以原下次执行时间为条件的UPDATE保证同一轮只被一个线程（或进程）领取
+
+    Returns:
+        KeywordMonitor实例，没有到期的监控时返回None
+    """
+    for _ in range(5):
+        now = datetime.utcnow()
+        row = (db.session.query(KeywordMonitor.id, KeywordMonitor.next_run_at, KeywordMonitor.interval_minutes)
+               .filter(KeywordMonitor.enabled.is_(True), KeywordMonitor.next_run_at <= now)
+               .order_by(KeywordMonitor.next_run_at).first())
+        if row is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(update(KeywordMonitor)
+                                     .where(KeywordMonitor.id == row.id, KeywordMonitor.next_run_at == row.next_run_at)
+                                     .values(next_run_at=now + timedelta(minutes=row.interval_minutes),
+                                             last_run_at=now, last_status=RUNNING, last_error=None))
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(KeywordMonitor, row.id)
+        # 被其他线程抢先领取，重新选择
+    return None
+
+
+def _known_fingerprints(monitor_id, fingerprints):
+    """
+    一页结果的URL指纹中已见过的部分
+    """
+    if not fingerprints:
+        return set()
+    return {fingerprint for (fingerprint,) in db.session.query(MonitorSeenUrl.url_fingerprint).filter(
+        MonitorSeenUrl.monitor_id == monitor_id, MonitorSeenUrl.url_fingerprint.in_(fingerprints))}
+
+
+def _remember_urls(monitor_id, source, urls):
+    """
+    记录新见到的URL，并发写入同一URL时忽略重复（调用方负责提交）
+
+    Args:
+        urls: URL指纹到URL的字典
+    """
+    now = datetime.utcnow()
+    db.session.execute(sqlite_insert(MonitorSeenUrl).on_conflict_do_nothing(),
+                       [{'monitor_id': monitor_id, 'source': source, 'url': url, 'url_fingerprint': fingerprint,
+                         'first_seen_at': now}
+                        for fingerprint, url in urls.items()])
+
+
+def crawl_source(monitor, source, spider):
+    """
+    增量抓取一个来源：逐页抓取，写入新结果，某一页没有新URL时停止翻页
+
+    Returns:
+        (抓取的页数, 新URL数量, 新增的RawData数量, 错误说明)；空页是因请求失败、验证码或熔断
+        造成时错误说明为爬虫的 last_error，否则为None
+    """
+    from search_result import url_fingerprint
+
+    pages = new_count = inserted = 0
+    for page in range(1, monitor.max_pages + 1):
+        results = spider.search(monitor.keyword, page)
+        pages += 1
+        if not results:
+            # 爬虫在请求失败、遇到验证码或熔断时也返回空结果（首次失败时不一定已熔断），
+            # 只有没有错误的空页才意味着已到最后一页
+            error = getattr(spider, 'last_error', None)
+            if error:
+                print(f'关键词监控 {monitor.keyword} - {source} 第 {page} 页抓取失败: {error}')
+            return pages, new_count, inserted, error
+
+        # 按指纹比较：同一页面的不同链接（百度跳转链接、B站接口与网页中的视频链接）只算一个
+        keyed = [(url_fingerprint(result.url, source, result.title), result) for result in results
+                 if result.title and result.url]
+        fingerprints = {}
+        for fingerprint, result in keyed:
+            fingerprints.setdefault(fingerprint, result.url)
+        known = _known_fingerprints(monitor.id, list(fingerprints))
+        new_urls = {fingerprint: url for fingerprint, url in fingerprints.items() if fingerprint not in known}
+        if new_urls:
+            with write_lock:
+                inserted += bulk_insert_results(
+                    monitor.keyword, source, [result for fingerprint, result in keyed if fingerprint in new_urls])
+                _remember_urls(monitor.id, source, new_urls)
+                db.session.commit()
+            new_count += len(new_urls)
+        print(f'关键词监控 {monitor.keyword} - {source} 第 {page} 页: {len(fingerprints)} 条结果，新URL {len(new_urls)} 条')
+        if not new_urls:
+            break
+    return pages, new_count, inserted, None
+
+
+def migrate_schema(batch_size=500):
+    """
+    为旧版本创建的monitor_seen_url表补充URL指纹列，并为已有记录计算指纹（在指纹唯一索引创建前调用）；
+    指纹相同的记录只保留最早的一条；旧记录没有标题，不透明的百度跳转链接无法与之后的结果对应，
+    直接删除。每条记录只处理一次，已完成时只需一次查询
+
+    Returns:
+        (填充的记录数, 删除的重复记录数)
+    """
+    from search_result import is_opaque_redirect, url_fingerprint
+
+    columns = {column['name'] for column in inspect(db.engine).get_columns(MonitorSeenUrl.__tablename__)}
+    if 'url_fingerprint' not in columns:
+        db.session.execute(text(f'ALTER TABLE {MonitorSeenUrl.__tablename__} ADD COLUMN url_fingerprint VARCHAR(32)'))
+        db.session.commit()
+        print('已为monitor_seen_url表添加url_fingerprint列')
+
+    filled = removed = 0
+    while True:
+        rows = (db.session.query(MonitorSeenUrl.id, MonitorSeenUrl.monitor_id, MonitorSeenUrl.source,
+                                 MonitorSeenUrl.url)
+                .filter(MonitorSeenUrl.url_fingerprint.is_(None))
+                .order_by(MonitorSeenUrl.id).limit(batch_size).all())
+        if not rows:
+            break
+        duplicates = [row.id for row in rows if is_opaque_redirect(row.url)]
+        fingerprints = {row.id: (row.monitor_id, url_fingerprint(row.url, row.source)) for row in rows
+                        if not is_opaque_redirect(row.url)}
+        taken = {(monitor_id, fingerprint) for monitor_id, fingerprint in db.session.query(
+            MonitorSeenUrl.monitor_id, MonitorSeenUrl.url_fingerprint).filter(
+            MonitorSeenUrl.url_fingerprint.in_({fingerprint for _, fingerprint in fingerprints.values()}))}
+        updates = []
+        for row_id, key in fingerprints.items():
+            if key in taken:
+                duplicates.append(row_id)
+                continue
+            taken.add(key)
+            updates.append({'id': row_id, 'url_fingerprint': key[1]})
+        if updates:
+            db.session.execute(update(MonitorSeenUrl), updates)
+        if duplicates:
+            MonitorSeenUrl.query.filter(MonitorSeenUrl.id.in_(duplicates)).delete(synchronize_session=False)
+        db.session.commit()
+        filled += len(updates)
+        removed += len(duplicates)
+    if filled or removed:
+        print(f'监控URL指纹回填: 已填充 {filled} 条，删除重复 {removed} 条')
+    return filled, removed
+
+
+def run_monitor(monitor, get_spider):
+    """
+    执行一次关键词监控，逐个来源增量抓取并记录执行情况
+
+    Args:
+        monitor: 已领取的KeywordMonitor实例
+        get_spider: 函数 get_spider(来源名称) -> 爬虫实例
+
+    Returns:
+        新增的RawData数量
+    """
+    from spider_policy import get_policy
+
+    pages = inserted = 0
+    errors = []
+    for source in json.loads(monitor.sources):
+        if get_policy(source).breaker.is_open():
+            errors.append(f'{source} 处于熔断状态，本轮跳过')
+            continue
+        try:
+            source_pages, new_count, source_inserted, error = crawl_source(monitor, source, get_spider(source))
+        except Exception as e:
+            db.session.rollback()
+            print(f'关键词监控 {monitor.keyword} - {source} 出错: {e}')
+            print(traceback.format_exc())
+            errors.append(f'{source}: {e}')
+            continue
+        pages += source_pages
+        inserted += source_inserted
+        if error:
+            errors.append(f'{source}: {error}')
+        print(f'关键词监控 {monitor.keyword} - {source} 完成：{source_pages} 页，新URL {new_count} 条，'
+              f'新增 {source_inserted} 条')
+
+    db.session.execute(update(KeywordMonitor).where(KeywordMonitor.id == monitor.id).values(
+        last_status=FAILED if errors else DONE, last_error='\n'.join(errors) or None,
+        last_pages=pages, last_inserted=inserted))
+    db.session.commit()
+    return inserted
+
+
+class MonitorScheduler:
+    """
+    关键词监控调度线程：定期检查到期的监控并逐个执行
+    """
+
+    def __init__(self, app, poll_interval=60.0):
+        """
+        Args:
+            app: Flask应用实例
+            poll_interval: 没有到期监控时的检查间隔（秒）
+        """
+        self.app = app
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        """
+        调度线程是否存活
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, exit_when_idle=False):
+        """
+        启动调度线程（已在运行时不重复启动）
+
+        Args:
+            exit_when_idle: 为True时执行完当前所有到期的监控后退出
+        """
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, args=(exit_when_idle,),
+                                            name='keyword-monitor', daemon=True)
+            self._thread.start()
+            print('已启动关键词监控调度线程')
+
+    def stop(self, wait=True):
+        """
+        通知调度线程在当前监控执行完成后退出
+        """
+        self._stop_event.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def join(self, timeout=None):
+        """
+        等待调度线程退出
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self, exit_when_idle):
+        with self.app.app_context():
+            # 爬虫实例在调度线程内复用，实例内部的会话池和限速器仍为进程共享
+            spiders = {}
+
+            def get_spider(source):
+                if source not in spiders:
+                    import importlib
+                    from page_archive import SPIDER_CLASSES
+
+                    module_name, class_name = SPIDER_CLASSES[source]
+                    spiders[source] = getattr(importlib.import_module(module_name), class_name)()
+                return spiders[source]
+
+            while not self._stop_event.is_set():
+                try:
+                    monitor = claim_due_monitor()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f'领取关键词监控出错: {e}')
+                    monitor = None
+                if monitor is None:
+                    if exit_when_idle:
+                        break
+                    self._stop_event.wait(self.poll_interval)
+                    continue
+                print(f'执行关键词监控 {monitor.id}: {monitor.keyword}')
+                run_monitor(monitor, get_spider)
+                db.session.remove()
+
+
+# 进程内共享的关键词监控调度器
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def configure(app, poll_interval=60.0):
+    """
+    配置进程内共享的关键词监控调度器（不会立即启动线程）
+
+    Returns:
+        新的MonitorScheduler实例
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop(wait=False)
+        _scheduler = MonitorScheduler(app, poll_interval)
+    return _scheduler
+
+
+def get_scheduler():
+    """
+    获取进程内共享的关键词监控调度器，未配置时返回None
+    """
+    return _scheduler
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+近似重复检测模块：为每条RawData计算 标题 + 摘要 的MinHash签名（64个哈希函数），
+按16段 × 4行分段，每段的哈希值作为一个桶登记到LSH分段索引表中。查找近似重复时只取出
+至少一个桶相同的候选记录，再用签名估计Jaccard相似度，不需要扫描全表。
+只有簇的代表记录登记到分段索引中，同一内容被反复抓取时桶的大小也不会随之增长
+"""
+
+import re
+import struct
+import hashlib
+import threading
+import unicodedata
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import RawData, NearDuplicateBand
+
+# 写入时对近似重复的处理方式：不检测（留给 cluster_existing 处理） / 写入并标记 / 不写入
+KEEP = 'keep'
+MARK = 'mark'
+SKIP = 'skip'
+MODES = (KEEP, MARK, SKIP)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# 16段 × 4行时，Jaccard相似度0.7的两条记录成为候选的概率约为99%，0.3的约为12%
+DEFAULT_THRESHOLD = 0.7
+
+# 规范化后少于该字符数的文本不计算签名（特征太少，签名不可靠）
+MIN_TEXT_LENGTH = 10
+# 一次IN查询最多携带的桶数
+LOOKUP_CHUNK_SIZE = 500
+
+# 每个特征用一次SHAKE-128生成 NUM_PERM 个32位哈希值，相当于 NUM_PERM 个独立的哈希函数
+_SIGNATURE = struct.Struct(f'>{NUM_PERM}I')
+_NON_WORD = re.compile(r'[\W_]+')
+
+# 进程内共享的配置
+_settings = {'mode': MARK, 'threshold': DEFAULT_THRESHOLD}
+_settings_lock = threading.Lock()
+
+
+def configure(mode=MARK, threshold=DEFAULT_THRESHOLD):
+    """
+    配置写入时的近似重复处理方式和判定阈值
+
+    Args:
+        mode: keep / mark / skip
+        threshold: 判定为近似重复的最低Jaccard相似度（0-1）
+
+    Raises:
+        ValueError: 参数无效
+    """
+    if mode not in MODES:
+        raise ValueError(f"近似重复处理方式必须为 {' / '.join(MODES)} 之一")
+    if not 0 < threshold <= 1:
+        raise ValueError('近似重复的相似度阈值必须在 0 到 1 之间')
+    with _settings_lock:
+        _settings.update(mode=mode, threshold=threshold)
+
+
+def get_mode():
+    """
+    获取写入时的近似重复处理方式
+    """
+    return _settings['mode']
+
+
+def minhash(text):
+    """
+    计算文本的MinHash签名：规范化（全角转半角、小写、去掉空白和标点）后取相邻两字符为特征
+
+    Returns:
+        NUM_PERM个整数组成的元组，文本过短时返回None
+    """
+    text = _NON_WORD.sub('', unicodedata.normalize('NFKC', text or '').lower())
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+
+    hashes = [_SIGNATURE.unpack(hashlib.shake_128(shingle.encode('utf-8')).digest(_SIGNATURE.size))
+              for shingle in {text[i:i + 2] for i in range(len(text) - 1)}]
+    # 每个哈希函数取所有特征中的最小值
+    return tuple(map(min, zip(*hashes)))
+
+
+def row_signature(title, summary):
+    """
+    一条记录的签名
+
+    Returns:
+        签名元组，文本过短时返回None
+    """
+    return minhash(f'{title or ""} {summary or ""}')
+
+
+def pack_signature(signature):
+    """
+    转换为minhash列中保存的字节串（无签名时为空字节串）
+    """
+    return b'' if signature is None else _SIGNATURE.pack(*signature)
+
+
+def unpack_signature(value):
+    """
+    解析minhash列的值
+
+    Returns:
+        签名元组，无签名时返回None
+    """
+    return _SIGNATURE.unpack(value) if value else None
+
+
+def buckets(signature):
+    """
+    签名各分段对应的桶：分段序号和该段的哈希值一起哈希为63位整数
+    """
+    return [
+        int.from_bytes(hashlib.blake2b(
+            struct.pack(f'>B{ROWS_PER_BAND}I', band, *signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]),
+            digest_size=8).digest(), 'big') >> 1
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a, b):
+    """
+    由两个签名估计的Jaccard相似度
+    """
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+class BandIndex:
+    """
+    内存中的分段索引：数据库中的候选记录和同一批次内已处理的记录放在一起查找
+    """
+
+    __slots__ = ('threshold', '_buckets')
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = {}
+
+    def add(self, signature, root, signature_buckets=None):
+        """
+        登记一个签名
+
+        Args:
+            signature: 签名元组
+            root: 该签名所在簇的代表（数据库记录ID，或批次内的标识）
+            signature_buckets: 已经计算好的桶，为None时重新计算
+        """
+        entry = (signature, root)
+        for bucket in signature_buckets or buckets(signature):
+            self._buckets.setdefault(bucket, []).append(entry)
+
+    def closest(self, signature, signature_buckets=None):
+        """
+        查找相似度达到阈值、最相似的签名
+
+        Returns:
+            (所在簇的代表, 估计的相似度)，没有近似重复时返回None
+        """
+        best = None
+        checked = set()
+        for bucket in signature_buckets or buckets(signature):
+            for entry in self._buckets.get(bucket, ()):
+                if id(entry) in checked:
+                    continue
+                checked.add(id(entry))
+                score = similarity(signature, entry[0])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (entry[1], score)
+        return best
+
+
+def load_candidates(bucket_lists):
+    """
+    按桶从分段索引表中取出候选记录，登记到新的内存索引中
+
+    Args:
+        bucket_lists: 每个待查找签名的桶列表
+
+    Returns:
+        BandIndex实例
+    """
+    index = BandIndex(_settings['threshold'])
+    wanted = sorted({bucket for signature_buckets in bucket_lists for bucket in signature_buckets})
+    seen = set()
+    for start in range(0, len(wanted), LOOKUP_CHUNK_SIZE):
+        rows = (db.session.query(RawData.id, RawData.minhash, RawData.near_duplicate_of)
+                .join(NearDuplicateBand, NearDuplicateBand.raw_data_id == RawData.id)
+                .filter(NearDuplicateBand.bucket.in_(wanted[start:start + LOOKUP_CHUNK_SIZE])))
+        for row_id, value, root in rows:
+            if row_id in seen or not value:
+                continue
+            seen.add(row_id)
+            index.add(unpack_signature(value), root or row_id)
+    return index
+
+
+def detect(rows, mode=None):
+    """
+    为待插入的RawData行计算签名并查找近似重复：就地设置行的 minhash 和 near_duplicate_of；
+    keep模式下不计算签名（minhash为NULL），由 cluster_existing 稍后处理
+
+    批次内的近似重复同样会被发现；mark模式下指向批次内更早的行时，其ID要在插入后才能确定，
+    通过links交给 index_rows 补记
+
+    Args:
+        rows: 行字典列表（包含 title、summary、url_fingerprint）
+        mode: keep / mark / skip，为None时使用配置的处理方式
+
+    Returns:
+        (需要插入的行, matches, links)：matches 为 行序号 -> (数据库记录ID或None, 批次内的行序号或None, 相似度)；
+        links 为 [(行的URL指纹, 批次内更早的行的URL指纹)]
+    """
+    mode = mode or get_mode()
+    if mode == KEEP:
+        for row in rows:
+            row['minhash'] = None
+            row['near_duplicate_of'] = None
+        return rows, {}, []
+
+    signatures = []
+    for row in rows:
+        signature = row_signature(row.get('title'), row.get('summary'))
+        row['minhash'] = pack_signature(signature)
+        row['near_duplicate_of'] = None
+        signatures.append((signature, buckets(signature) if signature is not None else None))
+
+    index = load_candidates([signature_buckets for _, signature_buckets in signatures if signature_buckets])
+    keep, matches, links = [], {}, []
+    for position, (row, (signature, signature_buckets)) in enumerate(zip(rows, signatures)):
+        if signature is None:
+            keep.append(row)
+            continue
+        match = index.closest(signature, signature_buckets)
+        if match is None:
+            # 新的簇，批次内的代表以行序号标识
+            index.add(signature, ('row', position), signature_buckets)
+            keep.append(row)
+            continue
+
+        root, score = match
+        if isinstance(root, tuple):
+            matches[position] = (None, root[1], score)
+        else:
+            matches[position] = (root, None, score)
+        if mode == SKIP:
+            continue
+        if isinstance(root, tuple):
+            links.append((row['url_fingerprint'], rows[root[1]]['url_fingerprint']))
+        else:
+            row['near_duplicate_of'] = root
+        keep.append(row)
+    return keep, matches, links
+
+
+def index_rows(rows, links=()):
+    """
+    插入后为新的簇代表记录登记分段索引，并补记指向批次内更早记录的近似重复（不提交事务）
+
+    Args:
+        rows: 已插入的行字典列表（已由 detect 计算签名）
+        links: detect 返回的links
+    """
+    linked = {fingerprint for fingerprint, _ in links}
+    roots = [row for row in rows
+             if row.get('minhash') and row.get('near_duplicate_of') is None and row['url_fingerprint'] not in linked]
+    if not roots and not links:
+        return
+    fingerprints = [row['url_fingerprint'] for row in roots] + [earlier for _, earlier in links] + list(linked)
+    ids = {}
+    for start in range(0, len(fingerprints), LOOKUP_CHUNK_SIZE):
+        ids.update(db.session.query(RawData.url_fingerprint, RawData.id).filter(
+            RawData.url_fingerprint.in_(fingerprints[start:start + LOOKUP_CHUNK_SIZE])))
+
+    band_rows = [
+        {'raw_data_id': ids[row['url_fingerprint']], 'bucket': bucket}
+        for row in roots if row['url_fingerprint'] in ids
+        for bucket in buckets(unpack_signature(row['minhash']))
+    ]
+    if band_rows:
+        db.session.execute(sqlite_insert(NearDuplicateBand).on_conflict_do_nothing(), band_rows)
+    updates = [{'id': ids[fingerprint], 'near_duplicate_of': ids[earlier]}
+               for fingerprint, earlier in links if fingerprint in ids and earlier in ids]
+    if updates:
+        db.session.execute(update(RawData), updates)
+
+
+def reset():
+    """
+    清空分段索引、签名和近似重复标记（签名算法或阈值变化后重新聚类时使用）
+    """
+    from app.ingest import write_lock
+
+    with write_lock:
+        NearDuplicateBand.query.delete()
+        db.session.execute(update(RawData).values(minhash=None, near_duplicate_of=None))
+        db.session.commit()
+
+
+def cluster_existing(batch_size=1000):
+    """
+    分批为尚未计算签名的记录计算签名并标记近似重复，每批提交一次；按ID顺序处理，
+    每条记录归入与之最相似的簇，没有近似记录时成为新的簇代表并登记分段索引
+
+    Returns:
+        (处理的记录数, 标记为近似重复的记录数)
+    """
+    from app.ingest import write_lock
+
+    processed = marked = 0
+    last_id = 0
+    while True:
+        rows = (db.session.query(RawData.id, RawData.title, RawData.summary)
+                .filter(RawData.minhash.is_(None), RawData.id > last_id)
+                .order_by(RawData.id).limit(batch_size).all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        signatures = {}
+        for row in rows:
+            signature = row_signature(row.title, row.summary)
+            signatures[row.id] = (signature, buckets(signature) if signature is not None else None)
+        with write_lock:
+            index = load_candidates([signature_buckets for _, signature_buckets in signatures.values()
+                                     if signature_buckets])
+            updates, band_rows = [], []
+            for row_id, (signature, signature_buckets) in signatures.items():
+                root = None
+                if signature is not None:
+                    match = index.closest(signature, signature_buckets)
+                    if match is not None:
+                        root = match[0]
+                        marked += 1
+                    else:
+                        index.add(signature, row_id, signature_buckets)
+                        band_rows.extend({'raw_data_id': row_id, 'bucket': bucket} for bucket in signature_buckets)
+                updates.append({'id': row_id, 'minhash': pack_signature(signature), 'near_duplicate_of': root})
+            db.session.execute(update(RawData), updates)
+            if band_rows:
+                db.session.execute(sqlite_insert(NearDuplicateBand).on_conflict_do_nothing(), band_rows)
+            db.session.commit()
+        processed += len(rows)
+        print(f'近似重复聚类: 已处理 {processed} 条，近似重复 {marked} 条')
+    return processed, marked
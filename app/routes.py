@@ -10,10 +10,19 @@ import sys
 import json
 import os
 from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, session, make_response
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, session, make_response, current_app, Response, stream_with_context
 from flask_login import login_user, logout_user, current_user, login_required
 from app import db
-from app.models import User, RawData, ReportData
+from app.models import User, RawData, ReportData, CrawlJob, KeywordMonitor
+from app.search_executor import fan_out, iter_fan_out, new_outcome, record, DONE
+from app.search_cache import get_search_cache
+from app.search_jobs import get_search_jobs, SearchJobsBusy
+from app import crawl_jobs
+from app import monitoring
+from app import ingest
+from app import near_duplicates
+from app import bulk_import
+from app import export
 import importlib.util
 import traceback
 
@@ -28,6 +37,12 @@ bilibili_spider_module = None
 current_dir = os.path.dirname(os.path.abspath(__file__))
 # 获取项目根目录
 project_root = os.path.dirname(current_dir)
+# 爬虫模块依赖项目根目录下的公共模块（如会话池），确保其可被导入
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from spider_policy import get_policy, snapshot_all
+from search_result import SearchResult, to_dicts
 
 try:
     # 动态导入baidu_spider.py
@@ -130,24 +145,253 @@ def dashboard():
     return render_template('dashboard.html')
 
 
+def _is_highly_relevant(result, keyword):
+    """
+    严格筛选函数 - 检查结果是否与关键词高度相关
+    """
+    # 检查标题、摘要是否包含关键词
+    title = (result.title or '').lower()
+    summary = (result.summary or '').lower()
+    keyword_lower = keyword.lower()
+    
+    # 完全匹配或包含关键词作为独立词
+    if (keyword_lower in title or keyword_lower in summary or 
+        (title.find(f" {keyword_lower} ") != -1) or 
+        (summary.find(f" {keyword_lower} ") != -1)):
+        return True
+    return False
+
+
+def _format_baidu_results(baidu_results, keyword):
+    """
+    筛选并格式化百度结果 - 限制返回5条高度相关的结果
+    """
+    baidu_selected = []
+    for result in baidu_results:
+        if _is_highly_relevant(result, keyword):
+            # 标记来源为百度，并添加原始来源信息（如果有）
+            source = '百度'
+            if result.source and result.source != '百度':
+                source = f"百度 - {result.source}"
+            baidu_selected.append(SearchResult(title=result.title or '', url=result.url or '',
+                                               summary=result.summary or '', source=source))
+            # 只保留前5条高度相关的结果
+            if len(baidu_selected) >= 5:
+                break
+    return baidu_selected
+
+
+def _format_bilibili_results(bilibili_results, keyword):
+    """
+    筛选并格式化B站结果 - 限制返回5条高度相关的结果
+    """
+    bilibili_selected = []
+    for result in bilibili_results:
+        if _is_highly_relevant(result, keyword):
+            # 将UP主信息和播放数据添加到摘要中，标记来源为B站
+            summary_lines = []
+            if result.author:
+                summary_lines.append(f"UP主: {result.author}")
+            if result.summary:
+                summary_lines.append(result.summary)
+            if result.stats:
+                summary_lines.append(f"数据: {result.stats}")
+            bilibili_selected.append(SearchResult(title=result.title or '', url=result.url or '',
+                                                  summary='\n'.join(summary_lines), source='Bilibili'))
+            # 只保留前5条高度相关的结果
+            if len(bilibili_selected) >= 5:
+                break
+    return bilibili_selected
+
+
+def _module_search(module, class_name):
+    """
+    返回调用爬虫模块搜索的函数：优先使用模块级search函数，否则实例化爬虫类
+    """
+    if hasattr(module, 'search'):
+        return module.search
+    return lambda keyword: getattr(module, class_name)().search(keyword)
+
+
+def _loaded_search_sources():
+    """
+    获取所有已加载的搜索源，按结果合并顺序排列
+
+    Returns:
+        列表，每项为 (来源名称, 搜索函数, 结果格式化函数)
+    """
+    sources = []
+    if spider_module:
+        sources.append(('百度', _module_search(spider_module, 'BaiduSpider'), _format_baidu_results))
+    else:
+        print("百度爬虫模块未加载")
+    if bilibili_spider_module:
+        sources.append(('Bilibili', _module_search(bilibili_spider_module, 'BilibiliSpider'), _format_bilibili_results))
+    else:
+        print("B站爬虫模块未加载")
+    return sources
+
+
+def _active_search_sources():
+    """
+    获取本次搜索要调用的搜索源：处于熔断状态的来源直接跳过，不再为其等待延迟和超时
+
+    Returns:
+        (搜索源列表, 跳过的来源名称列表)
+    """
+    sources = _loaded_search_sources()
+    skipped = [name for name, _, _ in sources if get_policy(name).breaker.is_open()]
+    if skipped:
+        print(f"以下搜索源处于熔断状态，已跳过: {', '.join(skipped)}")
+        sources = [source for source in sources if source[0] not in skipped]
+    return sources, skipped
+
+
+def _cached_search(source, search_func, force_refresh=False):
+    """
+    用搜索缓存包装来源的搜索函数
+    """
+    cache = get_search_cache()
+    return lambda keyword: cache.cached_call(source, keyword, 1, search_func, force_refresh)
+
+
+def _search_options():
+    """
+    读取搜索并发配置，供请求上下文之外（异步搜索任务）执行的搜索使用
+    """
+    return {
+        'default_timeout': current_app.config.get('SEARCH_SOURCE_TIMEOUT', 20),
+        'timeouts': current_app.config.get('SEARCH_SOURCE_TIMEOUTS'),
+        'max_workers': current_app.config.get('SEARCH_MAX_WORKERS', 8)
+    }
+
+
+def _search_error_response(keyword, e):
+    """
+    搜索出错时的响应：提供一个模拟结果，以便用户可以继续测试
+    """
+    error_msg = f"搜索过程发生错误: {str(e)}"
+    print(error_msg)
+    print(traceback.format_exc())
+    mock_results = [
+        {
+            'title': f'关于"{keyword}"的示例结果（系统错误）',
+            'url': '#',
+            'summary': f'系统在搜索过程中遇到问题: {str(e)}。这是一个替代显示的示例结果。',
+            'source': '系统'
+        }
+    ]
+    return {'status': 'success', 'results': mock_results, 'keyword': keyword, 'is_mock': True, 'error': str(e)}
+
+
+def _empty_search_response(keyword, outcome, skipped):
+    """
+    所有搜索源都没有结果时的响应：爬虫模块未加载时返回错误信息，否则返回模拟结果
+    """
+    # 如果两个爬虫都失败，提供更详细的错误信息
+    if not spider_module and not bilibili_spider_module:
+        print("百度爬虫和B站爬虫模块均未加载")
+        return {'status': 'error', 'message': '百度爬虫和B站爬虫模块均加载失败，请检查爬虫模块是否正确安装'}
+    elif not spider_module:
+        print("百度爬虫模块未加载，但B站爬虫模块已加载")
+        return {'status': 'error', 'message': '百度爬虫模块加载失败，请检查baidu_spider.py文件'}
+    elif not bilibili_spider_module:
+        print("B站爬虫模块未加载，但百度爬虫模块已加载")
+        return {'status': 'error', 'message': 'B站爬虫模块加载失败，请检查bilibili_spider.py文件'}
+    print("爬虫模块已加载，但未返回任何结果")
+    # 创建一个模拟结果，以便用户可以测试系统功能
+    mock_results = [
+        {
+            'title': f'关于"{keyword}"的示例结果',
+            'url': '#',
+            'summary': '这是一个模拟的搜索结果，用于测试系统功能。实际使用时，这里会显示相关的搜索内容。',
+            'source': '百度'
+        }
+    ]
+    return {'status': 'success', 'results': mock_results, 'keyword': keyword, 'is_mock': True,
+            'timed_out': outcome['timed_out'], 'skipped': skipped, 'errors': outcome['errors']}
+
+
+def _run_search(keyword, force_refresh, options):
+    """
+    并发调用百度爬虫和B站爬虫，筛选合并结果（同步 /search 和异步搜索任务共用）
+
+    Args:
+        keyword: 搜索关键词
+        force_refresh: 为真时跳过搜索缓存
+        options: _search_options() 返回的并发配置
+
+    Returns:
+        搜索响应字典
+    """
+    try:
+        sources, skipped = _active_search_sources()
+        
+        # 并发调用所有已加载的爬虫（先查搜索缓存），每个来源单独应用截止时间
+        outcome = fan_out(
+            {name: _cached_search(name, search_func, force_refresh) for name, search_func, _ in sources},
+            keyword,
+            **options
+        )
+        
+        # 按来源顺序合并结果：先百度，再B站
+        all_formatted_results = []
+        for name, _, format_results in sources:
+            if name not in outcome['results']:
+                continue
+            selected = format_results(outcome['results'][name], keyword)
+            print(f"{name}爬虫筛选后获得 {len(selected)} 条结果")
+            all_formatted_results.extend(selected)
+        
+        print(f"合并后的总结果数: {len(all_formatted_results)}")
+        if outcome['timed_out']:
+            print(f"以下搜索源超时: {', '.join(outcome['timed_out'])}")
+        
+        # 检查是否有结果
+        if not all_formatted_results:
+            return _empty_search_response(keyword, outcome, skipped)
+        
+        # 成功返回结果，同时报告超时和出错的搜索源
+        return {
+            'status': 'success',
+            'results': to_dicts(all_formatted_results),
+            'keyword': keyword,
+            'timed_out': outcome['timed_out'],
+            'skipped': skipped,
+            'errors': outcome['errors'],
+            'timings': outcome['timings']
+        }
+        
+    except Exception as e:
+        return _search_error_response(keyword, e)
+
+
 @main.route('/search', methods=['POST'])
 @login_required
 def search():
     """
-    执行搜索，同时调用百度爬虫和B站爬虫
+    执行搜索，并发调用百度爬虫和B站爬虫
+
+    async为真时只提交异步搜索任务并立即返回任务ID（HTTP 202），
+    由客户端轮询 /search/<job_id> 获取结果
     """
     print("开始处理搜索请求")
+    keyword = ''
     try:
         # 检查请求方法和数据
         if request.method != 'POST':
             return jsonify({'status': 'error', 'message': '请求方法错误'}), 405
         
-        # 获取搜索关键词
+        # 获取搜索关键词，force_refresh为真时跳过搜索缓存，async为真时异步执行
         if request.is_json:
             data = request.json
             keyword = data.get('keyword', '').strip()
+            force_refresh = bool(data.get('force_refresh', False))
+            run_async = bool(data.get('async', False))
         else:
             keyword = request.form.get('keyword', '').strip()
+            force_refresh = request.form.get('force_refresh', '').lower() in ('1', 'true', 'yes', 'on')
+            run_async = request.form.get('async', '').lower() in ('1', 'true', 'yes', 'on')
             
         print(f"接收到的搜索关键词: '{keyword}'")
         
@@ -158,172 +402,284 @@ def search():
         # 记录搜索关键词到session中，用于保存数据时使用
         session['last_search_keyword'] = keyword
         
-        # 合并结果列表
-        all_formatted_results = []
-        
-        # 严格筛选函数 - 检查结果是否与关键词高度相关
-        def is_highly_relevant(result, keyword):
-            # 检查标题、摘要是否包含关键词
-            title = result.get('title', '').lower()
-            summary = result.get('summary', '').lower()
-            keyword_lower = keyword.lower()
-            
-            # 完全匹配或包含关键词作为独立词
-            if (keyword_lower in title or keyword_lower in summary or 
-                (title.find(f" {keyword_lower} ") != -1) or 
-                (summary.find(f" {keyword_lower} ") != -1)):
-                return True
-            return False
-
-        # 调用百度爬虫 - 限制返回5条高度相关的结果
-        baidu_selected = []
-        if spider_module:
-            print("开始调用百度爬虫")
+        if run_async:
+            options = _search_options()
             try:
-                # 首先尝试直接调用模块的search函数
-                if hasattr(spider_module, 'search'):
-                    baidu_results = spider_module.search(keyword)
-                else:
-                    # 如果没有直接的search函数，则实例化BaiduSpider类
-                    spider = spider_module.BaiduSpider()
-                    baidu_results = spider.search(keyword)
-                
-                print(f"百度爬虫返回了 {len(baidu_results)} 条原始结果")
-                
-                # 严格筛选百度结果
-                for result in baidu_results:
-                    if is_highly_relevant(result, keyword):
-                        formatted_result = {
-                            'title': result.get('title', ''),
-                            'url': result.get('url', ''),
-                            'summary': result.get('summary', ''),
-                            'source': '百度'  # 标记来源为百度
-                        }
-                        # 添加原始来源信息（如果有）
-                        if result.get('source') and result.get('source') != '百度':
-                            formatted_result['source'] = f"百度 - {result.get('source')}"
-                        baidu_selected.append(formatted_result)
-                        # 只保留前5条高度相关的结果
-                        if len(baidu_selected) >= 5:
-                            break
-                
-                print(f"百度爬虫筛选后获得 {len(baidu_selected)} 条结果")
-                
-            except Exception as inner_e:
-                error_msg = f"调用百度爬虫失败: {str(inner_e)}"
-                print(error_msg)
-                print(traceback.format_exc())
-        else:
-            print("百度爬虫模块未加载")
+                job, coalesced = get_search_jobs().submit(
+                    keyword, lambda keyword, force_refresh: _run_search(keyword, force_refresh, options),
+                    force_refresh)
+            except SearchJobsBusy as e:
+                print(str(e))
+                return jsonify({'status': 'error', 'message': '当前搜索任务较多，请稍后重试'}), 503
+            if coalesced:
+                print(f"搜索 '{keyword}' 已在进行中，合并到任务 {job.id}")
+            data = job.to_dict()
+            data.update(status='accepted', coalesced_into_existing=coalesced,
+                        poll_url=url_for('main.search_job', job_id=job.id))
+            return jsonify(data), 202
+        
+        return jsonify(_run_search(keyword, force_refresh, _search_options()))
         
-        # 调用B站爬虫 - 限制返回5条高度相关的结果
-        bilibili_selected = []
-        if bilibili_spider_module:
-            print("开始调用B站爬虫")
-            try:
-                # 首先尝试直接调用模块的search函数
-                if hasattr(bilibili_spider_module, 'search'):
-                    bilibili_results = bilibili_spider_module.search(keyword)
-                else:
-                    # 如果没有直接的search函数，则实例化BilibiliSpider类
-                    spider = bilibili_spider_module.BilibiliSpider()
-                    bilibili_results = spider.search(keyword)
-                
-                print(f"B站爬虫返回了 {len(bilibili_results)} 条原始结果")
-                
-                # 严格筛选B站结果
-                for result in bilibili_results:
-                    if is_highly_relevant(result, keyword):
-                        formatted_result = {
-                            'title': result.get('title', ''),
-                            'url': result.get('url', ''),
-                            'summary': result.get('summary', ''),
-                            'source': 'Bilibili'  # 标记来源为B站
-                        }
-                        # 添加UP主信息到摘要中
-                        if result.get('author'):
-                            if formatted_result['summary']:
-                                formatted_result['summary'] = f"UP主: {result.get('author')}\n{formatted_result['summary']}"
-                            else:
-                                formatted_result['summary'] = f"UP主: {result.get('author')}"
-                        # 添加播放数据到摘要中
-                        if result.get('stats'):
-                            if formatted_result['summary']:
-                                formatted_result['summary'] = f"{formatted_result['summary']}\n数据: {result.get('stats')}"
-                            else:
-                                formatted_result['summary'] = f"数据: {result.get('stats')}"
-                        bilibili_selected.append(formatted_result)
-                        # 只保留前5条高度相关的结果
-                        if len(bilibili_selected) >= 5:
-                            break
-                
-                print(f"B站爬虫筛选后获得 {len(bilibili_selected)} 条结果")
-                
-            except Exception as inner_e:
-                error_msg = f"调用B站爬虫失败: {str(inner_e)}"
-                print(error_msg)
-                print(traceback.format_exc())
+    except Exception as e:
+        return jsonify(_search_error_response(keyword, e))
+
+
+def _sse_event(event, data):
+    """
+    编码一条Server-Sent Events消息
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_search(keyword, force_refresh, options):
+    """
+    并发调用各搜索源，每个来源完成后立即推送其筛选后的结果，最后推送汇总
+
+    事件依次为：start（参与搜索的来源）、每个完成的来源一条 results、
+    最后一条 done（结果总数、超时/跳过/出错的来源和耗时；没有任何结果时与同步 /search 一样
+    给出错误信息或模拟结果）
+    """
+    try:
+        sources, skipped = _active_search_sources()
+        formatters = {name: format_results for name, _, format_results in sources}
+        yield _sse_event('start', {'keyword': keyword, 'sources': list(formatters), 'skipped': skipped})
+        
+        outcome = new_outcome()
+        total = 0
+        for name, status, value, elapsed in iter_fan_out(
+                {name: _cached_search(name, search_func, force_refresh) for name, search_func, _ in sources},
+                keyword, **options):
+            record(outcome, name, status, value, elapsed)
+            if status != DONE:
+                continue
+            selected = formatters[name](value, keyword)
+            print(f"{name}爬虫筛选后获得 {len(selected)} 条结果")
+            total += len(selected)
+            yield _sse_event('results', {'source': name, 'results': to_dicts(selected), 'elapsed': elapsed})
+        
+        print(f"流式搜索推送的总结果数: {total}")
+        if total:
+            summary = {'status': 'success', 'keyword': keyword, 'total': total, 'timed_out': outcome['timed_out'],
+                       'skipped': skipped, 'errors': outcome['errors'], 'timings': outcome['timings']}
         else:
-            print("B站爬虫模块未加载")
-        
-        # 合并结果
-        all_formatted_results = []
-        # 先添加百度结果
-        all_formatted_results.extend(baidu_selected)
-        # 再添加B站结果
-        all_formatted_results.extend(bilibili_selected)
-        
-        print(f"合并后的总结果数: {len(all_formatted_results)}")
-        
-        # 检查是否有结果
-        if not all_formatted_results:
-            # 如果两个爬虫都失败，提供更详细的错误信息
-            if not spider_module and not bilibili_spider_module:
-                print("百度爬虫和B站爬虫模块均未加载")
-                return jsonify({'status': 'error', 'message': '百度爬虫和B站爬虫模块均加载失败，请检查爬虫模块是否正确安装'})
-            elif not spider_module:
-                print("百度爬虫模块未加载，但B站爬虫模块已加载")
-                return jsonify({'status': 'error', 'message': '百度爬虫模块加载失败，请检查baidu_spider.py文件'})
-            elif not bilibili_spider_module:
-                print("B站爬虫模块未加载，但百度爬虫模块已加载")
-                return jsonify({'status': 'error', 'message': 'B站爬虫模块加载失败，请检查bilibili_spider.py文件'})
-            else:
-                print("爬虫模块已加载，但未返回任何结果")
-                # 创建一个模拟结果，以便用户可以测试系统功能
-                mock_results = [
-                    {
-                        'title': f'关于"{keyword}"的示例结果',
-                        'url': '#',
-                        'summary': '这是一个模拟的搜索结果，用于测试系统功能。实际使用时，这里会显示相关的搜索内容。',
-                        'source': '百度'
-                    }
-                ]
-                return jsonify({'status': 'success', 'results': mock_results, 'keyword': keyword, 'is_mock': True})
-        
-        # 成功返回结果
-        return jsonify({'status': 'success', 'results': all_formatted_results, 'keyword': keyword})
-        
+            summary = _empty_search_response(keyword, outcome, skipped)
+        yield _sse_event('done', summary)
+    except Exception as e:
+        yield _sse_event('done', _search_error_response(keyword, e))
+
+
+@main.route('/search/stream', methods=['GET'])
+@login_required
+def search_stream():
+    """
+    流式搜索（Server-Sent Events）：每个搜索源完成后立即推送其结果，
+    首条结果的等待时间取决于最快的来源，而不是最慢的来源
+    """
+    keyword = request.args.get('keyword', '').strip()
+    force_refresh = request.args.get('force_refresh', '').lower() in ('1', 'true', 'yes', 'on')
+    print(f"接收到的流式搜索关键词: '{keyword}'")
+    if not keyword:
+        return jsonify({'status': 'error', 'message': '搜索关键词不能为空'}), 400
+    
+    # 记录搜索关键词到session中，用于保存数据时使用（须在开始推送前写入）
+    session['last_search_keyword'] = keyword
+    
+    response = Response(stream_with_context(_stream_search(keyword, force_refresh, _search_options())),
+                        mimetype='text/event-stream')
+    # 禁止缓存，并关闭反向代理（如nginx）的响应缓冲，保证事件及时送达
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@main.route('/search/<job_id>', methods=['GET'])
+@login_required
+def search_job(job_id):
+    """
+    获取异步搜索任务的状态；任务完成后返回与同步 /search 相同的搜索响应，
+    另附 job_id 和 job_status 字段
+    """
+    job = get_search_jobs().get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': '搜索任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+
+@main.route('/search/jobs_stats', methods=['GET'])
+@login_required
+def search_jobs_stats():
+    """
+    获取异步搜索任务的统计
+    """
+    return jsonify({'status': 'success', 'data': get_search_jobs().get_stats()})
+
+
+@main.route('/search/cache_stats', methods=['GET'])
+@login_required
+def search_cache_stats():
+    """
+    获取搜索缓存的命中统计
+    """
+    return jsonify({'status': 'success', 'data': get_search_cache().get_stats()})
+
+
+@main.route('/search/source_status', methods=['GET'])
+@login_required
+def search_source_status():
+    """
+    获取各搜索源的熔断器状态和计数
+    """
+    return jsonify({'status': 'success', 'data': snapshot_all()})
+
+
+@main.route('/crawl_jobs', methods=['POST'])
+@login_required
+def create_crawl_job():
+    """
+    提交后台批量抓取任务：keywords为关键词列表（或换行/逗号分隔的字符串），
+    sources为来源列表（默认全部来源），pages为每个关键词抓取的页数
+    """
+    data = request.get_json(silent=True) or request.form
+    keywords = crawl_jobs.parse_keywords(data.get('keywords', []))
+    available = crawl_jobs.available_sources()
+    sources = data.get('sources') or available
+    if isinstance(sources, str):
+        sources = [source.strip() for source in sources.split(',') if source.strip()]
+    try:
+        pages = int(data.get('pages', 1))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': '页数必须为整数'}), 400
+    
+    if not keywords:
+        return jsonify({'status': 'error', 'message': '关键词不能为空'}), 400
+    if len(keywords) > current_app.config.get('CRAWL_MAX_KEYWORDS', 1000):
+        return jsonify({'status': 'error', 'message': f"关键词数量不能超过 {current_app.config.get('CRAWL_MAX_KEYWORDS', 1000)} 个"}), 400
+    unknown = [source for source in sources if source not in available]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f"不支持的来源: {', '.join(unknown)}"}), 400
+    if not 1 <= pages <= current_app.config.get('CRAWL_MAX_PAGES', 10):
+        return jsonify({'status': 'error', 'message': f"页数必须在 1 到 {current_app.config.get('CRAWL_MAX_PAGES', 10)} 之间"}), 400
+    
+    try:
+        job = crawl_jobs.create_job(keywords, sources, pages)
     except Exception as e:
-        error_msg = f"搜索过程发生错误: {str(e)}"
-        print(error_msg)
+        db.session.rollback()
+        print(f"创建抓取任务出错: {str(e)}")
         print(traceback.format_exc())
-        # 即使发生错误，也提供一个模拟结果，以便用户可以继续测试
-        mock_results = [
-            {
-                'title': f'关于"{keyword}"的示例结果（系统错误）',
-                'url': '#',
-                'summary': f'系统在搜索过程中遇到问题: {str(e)}。这是一个替代显示的示例结果。',
-                'source': '系统'
-            }
-        ]
-        return jsonify({'status': 'success', 'results': mock_results, 'keyword': keyword, 'is_mock': True, 'error': str(e)})
+        return jsonify({'status': 'error', 'message': '创建抓取任务失败，请稍后重试'}), 500
+    
+    pool = crawl_jobs.get_worker_pool()
+    if pool is not None:
+        pool.start()
+    return jsonify({'status': 'success', 'data': crawl_jobs.job_progress(job)})
+
+
+@main.route('/crawl_jobs', methods=['GET'])
+@login_required
+def list_crawl_jobs():
+    """
+    获取最近的后台抓取任务及其进度
+    """
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    jobs = CrawlJob.query.order_by(CrawlJob.id.desc()).limit(limit).all()
+    return jsonify({'status': 'success', 'data': [crawl_jobs.job_progress(job) for job in jobs]})
+
+
+@main.route('/crawl_jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_crawl_job(job_id):
+    """
+    获取单个后台抓取任务的进度，包括失败子任务的错误信息
+    """
+    job = db.session.get(CrawlJob, job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': '抓取任务不存在'}), 404
+    return jsonify({'status': 'success', 'data': crawl_jobs.job_progress(job, include_failures=True)})
+
+
+@main.route('/crawl_jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_crawl_job(job_id):
+    """
+    取消后台抓取任务中尚未开始的子任务
+    """
+    job = db.session.get(CrawlJob, job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': '抓取任务不存在'}), 404
+    cancelled = crawl_jobs.cancel_job(job)
+    return jsonify({'status': 'success', 'message': f'已取消 {cancelled} 个未开始的子任务',
+                    'data': crawl_jobs.job_progress(job)})
+
+
+@main.route('/monitors', methods=['GET'])
+@login_required
+def list_monitors():
+    """
+    获取已登记的关键词监控及其最近一次执行情况
+    """
+    monitors = KeywordMonitor.query.order_by(KeywordMonitor.id).all()
+    return jsonify({'status': 'success', 'data': [monitoring.monitor_info(monitor) for monitor in monitors]})
+
+
+@main.route('/monitors', methods=['POST'])
+@login_required
+def create_monitor():
+    """
+    登记（或更新）关键词监控：keywords为关键词列表（或换行/逗号分隔的字符串），
+    sources为来源列表（默认全部来源），interval为执行间隔（分钟），pages为每次最多翻页数
+    """
+    data = request.get_json(silent=True) or request.form
+    keywords = crawl_jobs.parse_keywords(data.get('keywords', []))
+    available = crawl_jobs.available_sources()
+    sources = data.get('sources') or available
+    if isinstance(sources, str):
+        sources = [source.strip() for source in sources.split(',') if source.strip()]
+    try:
+        interval = int(data.get('interval') or current_app.config.get('MONITOR_DEFAULT_INTERVAL', 1440))
+        pages = int(data.get('pages') or current_app.config.get('MONITOR_MAX_PAGES', 5))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': '执行间隔和页数必须为整数'}), 400
+    
+    if not keywords:
+        return jsonify({'status': 'error', 'message': '关键词不能为空'}), 400
+    unknown = [source for source in sources if source not in available]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f"不支持的来源: {', '.join(unknown)}"}), 400
+    if interval < 1:
+        return jsonify({'status': 'error', 'message': '执行间隔必须大于0'}), 400
+    if not 1 <= pages <= current_app.config.get('CRAWL_MAX_PAGES', 10):
+        return jsonify({'status': 'error', 'message': f"页数必须在 1 到 {current_app.config.get('CRAWL_MAX_PAGES', 10)} 之间"}), 400
+    
+    try:
+        monitors = [monitoring.create_monitor(keyword, sources, interval, pages) for keyword in keywords]
+    except Exception as e:
+        db.session.rollback()
+        print(f"登记关键词监控出错: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'status': 'error', 'message': '登记关键词监控失败，请稍后重试'}), 500
+    return jsonify({'status': 'success', 'data': [monitoring.monitor_info(monitor) for monitor in monitors]})
+
+
+@main.route('/monitors/<int:monitor_id>/delete', methods=['POST'])
+@login_required
+def delete_monitor(monitor_id):
+    """
+    删除关键词监控（已写入的数据保留）
+    """
+    monitor = db.session.get(KeywordMonitor, monitor_id)
+    if monitor is None:
+        return jsonify({'status': 'error', 'message': '关键词监控不存在'}), 404
+    monitoring.delete_monitor(monitor)
+    return jsonify({'status': 'success', 'message': f'已删除关键词监控: {monitor.keyword}'})
 
 
 @main.route('/save_data', methods=['POST'])
 @login_required
 def save_data():
     """
-    批量保存数据到数据库
+    批量保存数据到数据库：整批去重后一次查出已存在的记录，新记录用一条批量插入写入，
+    响应中的outcomes给出每条数据的写入结果（inserted / existing / duplicate / near_duplicate / invalid）；
+    可选参数 near_duplicates（keep / mark / skip）指定对标题、摘要近似的数据的处理方式
     """
     print("接收到保存数据请求")
     try:
@@ -333,7 +689,6 @@ def save_data():
             return jsonify({'status': 'error', 'message': '请求数据格式错误，请使用JSON格式'}), 400
         
         data = request.json
-        print(f"接收到的数据完整内容: {json.dumps(data, ensure_ascii=False, default=str)}")
         
         # 提取结果和关键词
         results = data.get('results', [])
@@ -343,139 +698,43 @@ def save_data():
         if not results:
             print("没有数据需要保存")
             return jsonify({'status': 'error', 'message': '没有数据需要保存'})
-        
-        # 批量保存数据
-        saved_count = 0
-        all_items_valid = True
-        
-        for index, result in enumerate(results):
-            try:
-                # 打印每个结果的完整信息用于调试
-                print(f"处理数据项 {index+1}/{len(results)}: {json.dumps(result, ensure_ascii=False, default=str)}")
-                
-                # 验证必要字段
-                if not isinstance(result, dict):
-                    print(f"数据项 {index+1} 不是字典格式")
-                    all_items_valid = False
-                    continue
-                
-                # 确保关键字段存在
-                title = result.get('title', '无标题')
-                if not title or not title.strip():
-                    title = '无标题'
-                
-                # 尝试提取来源信息，确保标准化
-                source = result.get('source', '')
-                # 标准化来源名称
-                if source:
-                    if source.find('百度') != -1:
-                        source = '百度'
-                    elif source.find('B站') != -1 or source.find('Bilibili') != -1:
-                        source = 'Bilibili'
-                
-                # 如果没有来源信息，尝试从URL推断
-                if not source and 'url' in result and result['url']:
-                    url = result['url']
-                    try:
-                        from urllib.parse import urlparse
-                        parsed_url = urlparse(url)
-                        print(f"解析URL: {parsed_url.netloc}")
-                        if 'baidu' in parsed_url.netloc:
-                            source = '百度'
-                        elif 'bilibili' in parsed_url.netloc:
-                            source = 'Bilibili'
-                        else:
-                            source = parsed_url.netloc
-                    except Exception as url_e:
-                        print(f"URL解析错误: {str(url_e)}")
-                
-                # 创建数据对象，确保所有字段都有默认值
-                new_data = RawData(
-                    keyword=keyword,  # 关键字是必填字段
-                    title=title,
-                    url=result.get('url', '') or '',
-                    summary=result.get('summary', '') or '',
-                    content=result.get('content', '') or result.get('summary', '') or '',
-                    source=source or '未知'
-                )
-                
-                # 验证数据模型
-                try:
-                    db.session.add(new_data)
-                    print(f"已添加数据项 {index+1}: {title}, 来源: {source}, 关键词: {keyword}")
-                    saved_count += 1
-                except Exception as db_add_e:
-                    print(f"添加到数据库失败，数据项 {index+1}: {str(db_add_e)}")
-                    all_items_valid = False
-                    continue
-                
-            except Exception as item_e:
-                print(f"处理单个数据项 {index+1} 错误: {str(item_e)}")
-                print(traceback.format_exc())
-                all_items_valid = False
-                continue
-        
-        # 只有在有数据需要保存时才提交
-        if saved_count > 0:
-            # 添加去重检查
-            new_objects = []
-            for obj in db.session.new:
-                # 检查数据库中是否已存在相同的记录
-                existing = RawData.query.filter_by(
-                    title=obj.title,
-                    url=obj.url,
-                    source=obj.source
-                ).first()
-                
-                if existing:
-                    print(f"数据已存在，跳过保存: {obj.title}")
-                    db.session.expunge(obj)  # 从会话中移除已存在的对象
-                else:
-                    new_objects.append(obj)
-            
-            # 更新实际要保存的数量
-            actual_save_count = len(new_objects)
-            
-            if actual_save_count > 0:
-                try:
-                    # 先验证会话中的对象是否有效
-                    for obj in new_objects:
-                        print(f"待保存对象: {obj}")
-                        # 检查关键字段
-                        if not obj.keyword:
-                            print(f"警告: 对象缺少关键字段keyword")
-                        if not obj.title:
-                            print(f"警告: 对象缺少title字段")
-                        if not obj.source:
-                            print(f"警告: 对象缺少source字段")
-                    
-                    print(f"准备提交 {actual_save_count} 条数据到数据库")
-                    db.session.commit()
-                    print(f"✓ 成功提交 {actual_save_count} 条数据到数据库")
-                    
-                    # 立即验证数据是否真正保存
-                    db.session.expire_all()  # 确保我们从数据库读取最新数据
-                    count_after = RawData.query.filter_by(keyword=keyword).count()
-                    print(f"保存后数据库中关键词 '{keyword}' 的记录数量: {count_after}")
-                    
-                    if actual_save_count == saved_count:
-                        return jsonify({'status': 'success', 'message': f'成功保存 {actual_save_count} 条数据到数据库'})
-                    else:
-                        skipped_count = saved_count - actual_save_count
-                        return jsonify({'status': 'success', 'message': f'成功保存 {actual_save_count} 条数据到数据库，跳过 {skipped_count} 条重复数据'})
-                except Exception as commit_e:
-                    print(f"数据库提交错误: {str(commit_e)}")
-                    print(traceback.format_exc())
-                    return jsonify({'status': 'error', 'message': '数据库保存失败，请稍后重试'})
-            else:
-                print("所有数据都已存在于数据库中，无需保存")
-                return jsonify({'status': 'info', 'message': '所有选中数据已存在于数据仓库中'})
+        if not isinstance(results, list):
+            return jsonify({'status': 'error', 'message': '请求数据格式错误，results必须为列表'}), 400
+        near_duplicate_mode = data.get('near_duplicates')
+        if near_duplicate_mode is not None and near_duplicate_mode not in near_duplicates.MODES:
+            return jsonify({'status': 'error',
+                            'message': f"near_duplicates必须为 {' / '.join(near_duplicates.MODES)} 之一"}), 400
+        
+        try:
+            with ingest.write_lock:
+                outcomes, inserted = ingest.save_results(keyword, results, near_duplicate_mode)
+                db.session.commit()
+        except Exception as commit_e:
+            db.session.rollback()
+            print(f"数据库提交错误: {str(commit_e)}")
+            print(traceback.format_exc())
+            return jsonify({'status': 'error', 'message': '数据库保存失败，请稍后重试'})
+        
+        counts = {outcome: 0 for outcome in ingest.OUTCOMES}
+        for item in outcomes:
+            counts[item['outcome']] += 1
+        print(f"保存完成: 新增 {counts[ingest.INSERTED]} 条，已存在 {counts[ingest.EXISTING]} 条，"
+              f"批内重复 {counts[ingest.DUPLICATE]} 条，近似重复 {counts[ingest.NEAR_DUPLICATE]} 条，"
+              f"无效 {counts[ingest.INVALID]} 条")
+        
+        skipped_count = counts[ingest.EXISTING] + counts[ingest.DUPLICATE] + counts[ingest.NEAR_DUPLICATE]
+        if inserted:
+            status = 'success'
+            message = f'成功保存 {inserted} 条数据到数据库'
+            if skipped_count:
+                message += f'，跳过 {skipped_count} 条重复数据'
+        elif skipped_count:
+            print("所有数据都已存在于数据库中，无需保存")
+            status, message = 'info', '所有选中数据已存在于数据仓库中'
         else:
             print("没有成功添加任何数据项")
-            error_msg = '所有数据项处理失败，请检查数据格式'
-            if not all_items_valid:
-                error_msg += '，数据格式可能存在问题'
-            return jsonify({'status': 'error', 'message': error_msg})
+            status, message = 'error', '所有数据项处理失败，请检查数据格式，数据格式可能存在问题'
+        return jsonify({'status': status, 'message': message, 'counts': counts, 'outcomes': outcomes})
             
     except Exception as e:
         print(f"保存数据错误: {str(e)}")
@@ -483,6 +742,73 @@ def save_data():
         return jsonify({'status': 'error', 'message': '保存数据时发生系统错误，请稍后重试'})
 
 
+def _stream_import(run, records, keyword):
+    """
+    逐块导入并以NDJSON推送进度：每块一行 progress，最后一行 done 为导入汇总
+    """
+    try:
+        for progress in run.run(records, keyword):
+            yield json.dumps(dict(progress, event='progress'), ensure_ascii=False) + '\n'
+        yield json.dumps(dict(run.summary(), event='done', status='success'), ensure_ascii=False) + '\n'
+    except Exception as e:
+        db.session.rollback()
+        print(f"导入数据错误: {str(e)}")
+        print(traceback.format_exc())
+        yield json.dumps(dict(run.summary(), event='done', status='error', message=f'导入中断: {str(e)}'),
+                         ensure_ascii=False) + '\n'
+
+
+@main.route('/import_data', methods=['POST'])
+@login_required
+def import_data():
+    """
+    流式批量导入：逐行读取请求体（或上传的file字段）中的NDJSON/CSV数据，按块校验、写入并提交，
+    内存占用与数据量无关
+
+    查询参数：format（ndjson / csv，默认按Content-Type或文件名判断）、keyword（数据中没有keyword时使用）、
+    chunk_size（每块行数）、near_duplicates（keep / mark / skip）、progress（为1时以NDJSON逐块推送进度）
+    """
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    stream = upload.stream if upload is not None else request.stream
+    data_format = request.args.get('format') or bulk_import.detect_format(
+        upload.filename if upload is not None else None,
+        upload.content_type if upload is not None else request.content_type)
+    if data_format not in bulk_import.FORMATS:
+        return jsonify({'status': 'error', 'message': f"format必须为 {' / '.join(bulk_import.FORMATS)} 之一"}), 400
+    near_duplicate_mode = request.args.get('near_duplicates') or None
+    if near_duplicate_mode is not None and near_duplicate_mode not in near_duplicates.MODES:
+        return jsonify({'status': 'error',
+                        'message': f"near_duplicates必须为 {' / '.join(near_duplicates.MODES)} 之一"}), 400
+    max_chunk_size = current_app.config.get('IMPORT_MAX_CHUNK_SIZE', 10000)
+    try:
+        chunk_size = int(request.args.get('chunk_size') or current_app.config.get('IMPORT_CHUNK_SIZE', 1000))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'chunk_size必须为整数'}), 400
+    if not 1 <= chunk_size <= max_chunk_size:
+        return jsonify({'status': 'error', 'message': f'chunk_size必须在 1 到 {max_chunk_size} 之间'}), 400
+    keyword = request.args.get('keyword', '').strip() or None
+    print(f"接收到导入数据请求 - 格式: {data_format}, 关键词: {keyword}, 每块 {chunk_size} 行")
+    
+    run = bulk_import.ImportRun(chunk_size, near_duplicate_mode, current_app.config.get('IMPORT_MAX_ERRORS', 100))
+    records = bulk_import.iter_csv(stream) if data_format == bulk_import.CSV else bulk_import.iter_ndjson(stream)
+    if request.args.get('progress') == '1':
+        return Response(stream_with_context(_stream_import(run, records, keyword)),
+                        mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+    
+    try:
+        for _ in run.run(records, keyword):
+            pass
+    except Exception as e:
+        db.session.rollback()
+        print(f"导入数据错误: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify(dict(run.summary(), status='error', message=f'导入中断: {str(e)}'))
+    summary = run.summary()
+    print(f"导入完成: {summary['lines']} 行，新增 {summary['counts'][ingest.INSERTED]} 条，"
+          f"无效 {summary['counts'][ingest.INVALID]} 条")
+    return jsonify(dict(summary, status='success'))
+
+
 @main.route('/data_warehouse')
 @login_required
 def data_warehouse():
@@ -511,37 +837,21 @@ def get_raw_data():
         # 获取查询参数
         keyword = request.args.get('keyword', '').strip()
         date_str = request.args.get('date', '')
+        source = request.args.get('source', '').strip()
+        # 为1时只返回每个近似重复簇的代表记录
+        hide_near_duplicates = request.args.get('hide_near_duplicates', '0') == '1'
         page = int(request.args.get('page', 1))
         per_page = 10
         
-        print(f"获取原始数据请求 - 关键词: '{keyword}', 日期: '{date_str}', 页码: {page}")
-        
-        # 构建查询
-        query = RawData.query
-        
-        # 关键词搜索 - 优化搜索范围
-        if keyword:
-            from sqlalchemy import or_
-            query = query.filter(
-                or_(
-                    RawData.keyword.contains(keyword),
-                    RawData.title.contains(keyword),
-                    RawData.summary.contains(keyword),
-                    RawData.content.contains(keyword)
-                )
-            )
-            print(f"关键词搜索条件: {keyword}")
-        
-        # 日期筛选
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, '%Y-%m-%d')
-                query = query.filter(
-                    RawData.created_at >= target_date,
-                    RawData.created_at < target_date.replace(day=target_date.day + 1)
-                )
-            except ValueError as e:
-                print(f"日期格式错误: {str(e)}")
+        print(f"获取原始数据请求 - 关键词: '{keyword}', 日期: '{date_str}', 来源: '{source}', 页码: {page}")
+        
+        # 构建查询：关键词、日期、来源筛选与 /export_data 一致
+        try:
+            filters = export.build_filters(keyword, date_str, source, hide_near_duplicates)
+        except ValueError as e:
+            print(f"日期格式错误: {str(e)}")
+            filters = export.build_filters(keyword, None, source, hide_near_duplicates)
+        query = RawData.query.filter(*filters)
         
         # 分页
         pagination = query.order_by(RawData.created_at.desc()).paginate(page=page, per_page=per_page)
@@ -556,6 +866,7 @@ def get_raw_data():
                 'summary': item.summary,
                 'content': item.content,
                 'source': item.source,
+                'near_duplicate_of': item.near_duplicate_of,
                   'keyword': item.keyword,
                   'created_at': item.created_at.strftime('%Y-%m-%d %H:%M:%S')
               })
@@ -574,6 +885,37 @@ def get_raw_data():
         return jsonify({'status': 'error', 'message': f'获取数据出错: {str(e)}'})
 
 
+@main.route('/export_data', methods=['GET'])
+@login_required
+def export_data():
+    """
+    流式导出原始数据：筛选参数与 /get_raw_data 相同（keyword、date、source、hide_near_duplicates），
+    format 为 csv / ndjson / parquet（parquet需要安装pyarrow），columns 为逗号分隔的列名（默认全部列）
+    """
+    data_format = request.args.get('format', export.CSV)
+    if data_format not in export.FORMATS:
+        return jsonify({'status': 'error', 'message': f"format必须为 {' / '.join(export.FORMATS)} 之一"}), 400
+    if data_format == export.PARQUET and not export.parquet_available():
+        return jsonify({'status': 'error', 'message': '导出Parquet需要安装pyarrow'}), 400
+    try:
+        columns = export.parse_columns(request.args.get('columns'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    try:
+        filters = export.build_filters(request.args.get('keyword', '').strip(), request.args.get('date', ''),
+                                       request.args.get('source', '').strip(),
+                                       request.args.get('hide_near_duplicates', '0') == '1')
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '日期格式错误，应为 YYYY-MM-DD'}), 400
+    print(f"导出数据请求 - 格式: {data_format}, 参数: {dict(request.args)}")
+    
+    filename = f"raw_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{data_format}"
+    batches = export.export(data_format, filters, columns, current_app.config.get('EXPORT_BATCH_SIZE', 2000))
+    return Response(stream_with_context(batches), mimetype=export.MIMETYPES[data_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
+
+
 @main.route('/get_dates', methods=['GET'])
 @login_required
 def get_dates():
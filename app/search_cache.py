@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+搜索结果缓存模块
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_keyword(keyword):
+    """
+    规范化关键词：合并空白并转为小写，使同义的搜索命中同一缓存项
+    """
+    return ' '.join(keyword.split()).lower()
+
+
+class SQLiteCacheTier:
+    """
+    基于SQLite的二级缓存，服务重启后仍然有效
+    """
+
+    def __init__(self, db_path, max_entries=10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS search_cache ('
+                     'cache_key TEXT PRIMARY KEY, results TEXT NOT NULL, stored_at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_search_cache_stored_at ON search_cache (stored_at)')
+
+    def _connection(self):
+        """
+        每个线程使用独立的数据库连接
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, cache_key, ttl):
+        """
+        读取未过期的缓存项
+
+        Returns:
+            (SearchResult列表, 写入时间)，未命中时返回None
+        """
+        row = self._connection().execute(
+            'SELECT results, stored_at FROM search_cache WHERE cache_key = ? AND stored_at > ?',
+            (cache_key, time.time() - ttl)).fetchone()
+        if row is None:
+            return None
+        from search_result import from_dicts
+        return from_dicts(json.loads(row[0])), row[1]
+
+    def set(self, cache_key, results, stored_at):
+        """
+        写入缓存项，超过容量时淘汰最早写入的项
+        """
+        from search_result import to_dicts
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO search_cache (cache_key, results, stored_at) VALUES (?, ?, ?)',
+                     (cache_key, json.dumps(to_dicts(results), ensure_ascii=False), stored_at))
+        conn.execute('DELETE FROM search_cache WHERE cache_key IN ('
+                     'SELECT cache_key FROM search_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                     (self.max_entries,))
+
+    def clear(self):
+        """
+        清空二级缓存
+        """
+        self._connection().execute('DELETE FROM search_cache')
+
+
+class SearchCache:
+    """
+    以 (来源, 规范化关键词, 页码) 为键的搜索结果缓存：
+    内存LRU一级缓存 + 可选SQLite二级缓存，两级均按TTL过期
+    """
+
+    def __init__(self, ttl=600, max_entries=256, db_path=None, db_max_entries=10000):
+        """
+        Args:
+            ttl: 缓存有效期（秒）
+            max_entries: 内存缓存最大条目数，超出时淘汰最久未使用的项
+            db_path: 可选SQLite文件路径，设置后启用二级缓存
+            db_max_entries: SQLite缓存最大条目数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_tier = SQLiteCacheTier(db_path, db_max_entries) if db_path else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'db_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(source, keyword, page=1):
+        """
+        构造缓存键
+        """
+        return f'{source}\x1f{normalize_keyword(keyword)}\x1f{page}'
+
+    def get(self, source, keyword, page=1):
+        """
+        读取缓存
+
+        Returns:
+            结果列表，未命中或已过期时返回None
+        """
+        cache_key = self.make_key(source, keyword, page)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                results, stored_at = entry
+                if now - stored_at < self.ttl:
+                    self._entries.move_to_end(cache_key)
+                    self.stats['hits'] += 1
+                    return results
+                del self._entries[cache_key]
+
+        if self.db_tier is not None:
+            entry = self.db_tier.get(cache_key, self.ttl)
+            if entry is not None:
+                with self._lock:
+                    self.stats['db_hits'] += 1
+                    self._store(cache_key, entry[0], entry[1])
+                return entry[0]
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, source, keyword, page, results):
+        """
+        写入缓存，同时写入两级缓存
+        """
+        cache_key = self.make_key(source, keyword, page)
+        stored_at = time.time()
+        with self._lock:
+            self._store(cache_key, results, stored_at)
+        if self.db_tier is not None:
+            self.db_tier.set(cache_key, results, stored_at)
+
+    def _store(self, cache_key, results, stored_at):
+        """
+        写入内存缓存并按容量淘汰最久未使用的项，调用方需持有锁
+        """
+        self._entries[cache_key] = (results, stored_at)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def cached_call(self, source, keyword, page, search_func, force_refresh=False):
+        """
+        先查缓存，未命中时调用搜索函数并缓存非空结果
+
+        Args:
+            source: 来源名称
+            keyword: 搜索关键词
+            page: 页码
+            search_func: 未命中时调用的函数 search_func(keyword) -> 结果列表
+            force_refresh: 为True时跳过缓存读取，直接重新抓取
+
+        Returns:
+            结果列表
+        """
+        if not force_refresh:
+            results = self.get(source, keyword, page)
+            if results is not None:
+                print(f'搜索缓存命中: {source} - {keyword} 第 {page} 页')
+                return results
+
+        results = search_func(keyword)
+        # 空结果通常意味着被反爬或请求失败，不写入缓存
+        if results:
+            self.set(source, keyword, page, results)
+        return results
+
+    def clear(self):
+        """
+        清空两级缓存
+        """
+        with self._lock:
+            self._entries.clear()
+        if self.db_tier is not None:
+            self.db_tier.clear()
+
+    def get_stats(self):
+        """
+        获取命中统计和当前容量
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+# 进程内共享的搜索缓存
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def configure(ttl=600, max_entries=256, db_path=None, db_max_entries=10000):
+    """
+    配置进程内共享的搜索缓存
+
+    Returns:
+        新的SearchCache实例
+    """
+    global _search_cache
+    with _search_cache_lock:
+        _search_cache = SearchCache(ttl, max_entries, db_path, db_max_entries)
+    return _search_cache
+
+
+def get_search_cache():
+    """
+    获取进程内共享的搜索缓存，未配置时使用默认参数创建
+    """
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+    return _search_cache
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+多源并发搜索执行模块
+"""
+
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 进程内共享的线程池，避免每次搜索都创建新线程
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=8):
+    """
+    获取（必要时创建）共享线程池
+
+    Args:
+        max_workers: 线程池最大线程数，仅在首次创建时生效
+
+    Returns:
+        ThreadPoolExecutor实例
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='search-source')
+    return _executor
+
+
+# 单个搜索源的结束状态
+DONE = 'done'
+TIMED_OUT = 'timed_out'
+ERROR = 'error'
+
+
+def iter_fan_out(sources, keyword, default_timeout=20, timeouts=None, max_workers=8):
+    """
+    并发调用所有搜索源，按完成先后逐个给出每个搜索源的结果
+
+    超过截止时间的搜索源以TIMED_OUT给出，其结果被丢弃。注意Python线程无法被强制终止，
+    超时的爬虫仍会在后台线程中运行完毕，但不会再阻塞调用方。
+
+    Args:
+        sources: 有序字典，来源名称 -> 可调用对象 callable(keyword) -> 结果列表
+        keyword: 搜索关键词
+        default_timeout: 默认的单源截止时间（秒）
+        timeouts: 可选字典，来源名称 -> 截止时间（秒），覆盖默认值
+        max_workers: 线程池最大线程数
+
+    Yields:
+        (来源名称, 状态, 值, 耗时秒数)：状态为DONE时值为结果列表，为ERROR时为错误信息，
+        为TIMED_OUT时为None
+    """
+    timeouts = timeouts or {}
+    executor = get_executor(max_workers)
+    started_at = time.monotonic()
+
+    pending = {}
+    deadlines = {}
+
+    for name, func in sources.items():
+        future = executor.submit(func, keyword)
+        pending[future] = name
+        deadlines[name] = started_at + timeouts.get(name, default_timeout)
+
+    while pending:
+        now = time.monotonic()
+
+        # 处理已经超过截止时间的搜索源
+        for future, name in list(pending.items()):
+            if not future.done() and now >= deadlines[name]:
+                print(f"搜索源 {name} 超过截止时间 {deadlines[name] - started_at:.1f} 秒，放弃等待")
+                future.cancel()
+                del pending[future]
+                yield name, TIMED_OUT, None, round(now - started_at, 3)
+
+        if not pending:
+            break
+
+        # 等待到最近的截止时间或任一搜索源完成
+        next_deadline = min(deadlines[name] for name in pending.values())
+        done, _ = wait(list(pending), timeout=max(0, next_deadline - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = pending.pop(future)
+            elapsed = round(time.monotonic() - started_at, 3)
+            try:
+                results = future.result() or []
+            except Exception as e:
+                print(f"搜索源 {name} 执行出错: {str(e)}")
+                print(traceback.format_exc())
+                yield name, ERROR, str(e), elapsed
+                continue
+            print(f"搜索源 {name} 完成，返回 {len(results)} 条原始结果，耗时 {elapsed} 秒")
+            yield name, DONE, results, elapsed
+
+
+def new_outcome():
+    """
+    创建空的汇总结果
+    """
+    return {'results': {}, 'timed_out': [], 'errors': {}, 'timings': {}}
+
+
+def record(outcome, name, status, value, elapsed):
+    """
+    将iter_fan_out给出的一个搜索源结果记入汇总结果
+    """
+    outcome['timings'][name] = elapsed
+    if status == DONE:
+        outcome['results'][name] = value
+    elif status == TIMED_OUT:
+        outcome['timed_out'].append(name)
+    else:
+        outcome['errors'][name] = value
+
+
+def fan_out(sources, keyword, default_timeout=20, timeouts=None, max_workers=8):
+    """
+    并发调用所有搜索源，并对每个搜索源分别应用截止时间，等待全部完成或超时后汇总返回
+
+    超过截止时间的搜索源会被记录到timed_out中，其结果被丢弃；
+    已完成的搜索源结果照常返回。
+
+    Args:
+        参数同 iter_fan_out
+
+    Returns:
+        字典，包含 results（来源 -> 结果列表）、timed_out（超时来源列表）、
+        errors（来源 -> 错误信息）、timings（来源 -> 耗时秒数）
+    """
+    outcome = new_outcome()
+    for event in iter_fan_out(sources, keyword, default_timeout, timeouts, max_workers):
+        record(outcome, *event)
+    return outcome
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小鱼智能数据分析处理系统
+异步搜索任务模块：/search 可以只提交任务并立即返回任务ID，由后台线程执行抓取，
+客户端轮询 /search/<job_id> 获取结果，不再占用Web工作线程等待爬虫
+"""
+
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.search_cache import normalize_keyword
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED_STATUSES = (DONE, FAILED)
+
+
+class SearchJobsBusy(Exception):
+    """
+    等待执行的搜索任务已达上限
+    """
+    pass
+
+
+class SearchJob:
+    """
+    一次异步搜索：同一关键词进行中的搜索共用一个任务
+    """
+
+    def __init__(self, keyword, force_refresh=False):
+        self.id = uuid.uuid4().hex
+        self.keyword = keyword
+        self.force_refresh = force_refresh
+        self.status = PENDING
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.response = None
+        self.error = None
+        # 合并到本任务的重复提交次数
+        self.coalesced = 0
+
+    def to_dict(self):
+        """
+        任务状态，完成后包含搜索响应
+        """
+        data = {
+            'job_id': self.id,
+            'job_status': self.status,
+            'keyword': self.keyword,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'coalesced': self.coalesced
+        }
+        if self.status == DONE:
+            # 搜索响应（status、results等字段）与同步 /search 的响应一致
+            data.update(self.response)
+        elif self.status == FAILED:
+            data.update(status='error', message=self.error)
+        else:
+            data['status'] = self.status
+        return data
+
+
+class SearchJobManager:
+    """
+    在有界线程池中执行异步搜索任务：进行中的相同搜索合并为一个任务，
+    完成的任务保留ttl秒后清除
+    """
+
+    def __init__(self, max_workers=4, max_pending=32, ttl=600, max_jobs=1000):
+        """
+        Args:
+            max_workers: 同时执行的搜索任务数
+            max_pending: 尚未完成的任务数上限，超出时拒绝新任务
+            ttl: 完成的任务及其结果保留的时间（秒）
+            max_jobs: 保留的任务总数上限，超出时先清除最早完成的任务
+        """
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='search-job')
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'done': 0, 'failed': 0, 'expired': 0}
+
+    def submit(self, keyword, search_func, force_refresh=False):
+        """
+        提交搜索任务；同一关键词已有进行中的任务时直接返回该任务
+
+        Args:
+            keyword: 搜索关键词
+            search_func: 在后台线程中执行的函数 search_func(keyword, force_refresh) -> 搜索响应字典
+            force_refresh: 是否跳过搜索缓存
+
+        Returns:
+            (SearchJob, 是否合并到了已有任务)
+
+        Raises:
+            SearchJobsBusy: 未完成的任务数已达上限
+        """
+        key = normalize_keyword(keyword)
+        with self._lock:
+            self._purge()
+            job = self._in_flight.get(key)
+            if job is not None:
+                # 进行中的任务本身就是新抓取的结果，force_refresh的提交同样可以合并
+                job.coalesced += 1
+                self.stats['coalesced'] += 1
+                return job, True
+            if len(self._in_flight) >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise SearchJobsBusy(f'等待执行的搜索任务已达上限 {self.max_pending} 个')
+            job = SearchJob(keyword, force_refresh)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self.stats['submitted'] += 1
+        self._executor.submit(self._run, job, key, search_func)
+        return job, False
+
+    def _run(self, job, key, search_func):
+        """
+        在线程池中执行任务
+        """
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.response = search_func(job.keyword, job.force_refresh)
+            status = DONE
+        except Exception as e:
+            print(f'异步搜索任务 {job.id} 出错: {e}')
+            print(traceback.format_exc())
+            job.error = str(e)
+            status = FAILED
+        with self._lock:
+            job.finished_at = time.time()
+            job.status = status
+            self.stats[status] += 1
+            if self._in_flight.get(key) is job:
+                del self._in_flight[key]
+
+    def get(self, job_id):
+        """
+        获取任务，不存在或已过期时返回None
+        """
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        """
+        清除超过保留时间的已完成任务，调用方需持有锁
+        """
+        expires_before = time.time() - self.ttl
+        overflow = len(self._jobs) - self.max_jobs
+        for job_id, job in list(self._jobs.items()):
+            if job.status not in FINISHED_STATUSES:
+                continue
+            if job.finished_at < expires_before or overflow > 0:
+                del self._jobs[job_id]
+                overflow -= 1
+                self.stats['expired'] += 1
+
+    def get_stats(self):
+        """
+        获取任务统计和当前任务数
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['jobs'] = len(self._jobs)
+            stats['in_flight'] = len(self._in_flight)
+        return stats
+
+
+# 进程内共享的异步搜索任务管理器
+_search_jobs = None
+_search_jobs_lock = threading.Lock()
+
+
+def configure(max_workers=4, max_pending=32, ttl=600, max_jobs=1000):
+    """
+    配置进程内共享的异步搜索任务管理器
+
+    Returns:
+        新的SearchJobManager实例
+    """
+    global _search_jobs
+    with _search_jobs_lock:
+        _search_jobs = SearchJobManager(max_workers, max_pending, ttl, max_jobs)
+    return _search_jobs
+
+
+def get_search_jobs():
+    """
+    获取进程内共享的异步搜索任务管理器，未配置时使用默认参数创建
+    """
+    global _search_jobs
+    if _search_jobs is None:
+        with _search_jobs_lock:
+            if _search_jobs is None:
+                _search_jobs = SearchJobManager()
+    return _search_jobs
@@ -89,6 +89,16 @@ function performSearch() {
     searchResults = [];
     currentPage = 1;
     
+    // 支持Server-Sent Events的浏览器使用流式搜索，各来源完成后立即显示其结果
+    if (window.EventSource) {
+        streamSearch(keyword, function() {
+            // 恢复搜索按钮原始状态
+            searchBtn.html(originalBtnHtml).prop('disabled', false);
+            hideLoading();
+        });
+        return;
+    }
+    
     // 发送搜索请求
     $.ajax({
         url: '/search',
@@ -104,13 +114,7 @@ function performSearch() {
                 renderResults(searchResults);
                 renderPagination();
                 
-                // 如果是模拟结果，显示提示
-                if (response.is_mock) {
-                    showAlert('当前显示的是模拟结果，实际搜索可能需要调整', 'warning');
-                    console.warn('显示的是模拟搜索结果');
-                } else {
-                    showAlert(`搜索完成，共找到 ${response.results.length} 条结果`, 'success');
-                }
+                showSearchSummary(response, response.results.length);
             } else {
                 const errorMessage = response.message || '搜索失败';
                 showAlert(errorMessage, 'error');
@@ -166,6 +170,87 @@ function performSearch() {
     });
 }
 
+// 流式搜索：每个来源完成后立即追加其结果，最后根据汇总事件显示提示
+function streamSearch(keyword, onComplete) {
+    const eventSource = new EventSource(`/search/stream?keyword=${encodeURIComponent(keyword)}`);
+    let finished = false;
+    
+    // 收到汇总或连接出错后关闭连接，避免浏览器自动重连再次发起搜索
+    function finish() {
+        finished = true;
+        eventSource.close();
+        onComplete();
+    }
+    
+    // 追加结果并刷新当前页
+    function appendResults(results) {
+        searchResults = searchResults.concat(results);
+        renderResults(searchResults);
+        renderPagination();
+    }
+    
+    eventSource.addEventListener('results', function(e) {
+        const data = JSON.parse(e.data);
+        console.log(`${data.source} 返回 ${data.results.length} 条结果，耗时 ${data.elapsed} 秒`);
+        if (data.results.length) {
+            appendResults(data.results);
+        }
+    });
+    
+    eventSource.addEventListener('done', function(e) {
+        const response = JSON.parse(e.data);
+        console.log('搜索汇总:', response);
+        finish();
+        
+        if (response.status !== 'success') {
+            const errorMessage = response.message || '搜索失败';
+            showAlert(errorMessage, 'error');
+            if (!searchResults.length) {
+                renderEmptyResults();
+            }
+            console.error('搜索错误:', errorMessage);
+            return;
+        }
+        // 没有任何结果时，汇总中带有模拟结果
+        if (response.results && response.results.length) {
+            appendResults(response.results);
+        }
+        showSearchSummary(response, searchResults.length);
+    });
+    
+    eventSource.onerror = function() {
+        if (finished) {
+            return;
+        }
+        console.error('流式搜索连接出错');
+        finish();
+        showAlert('搜索连接中断，请稍后重试', 'error');
+        if (!searchResults.length) {
+            renderEmptyResults();
+        }
+    };
+}
+
+// 根据搜索响应（或流式搜索的汇总）显示搜索完成提示
+function showSearchSummary(response, count) {
+    // 如果是模拟结果，显示提示
+    if (response.is_mock) {
+        showAlert('当前显示的是模拟结果，实际搜索可能需要调整', 'warning');
+        console.warn('显示的是模拟搜索结果');
+    } else if ((response.timed_out && response.timed_out.length) || (response.skipped && response.skipped.length)) {
+        const notes = [];
+        if (response.timed_out && response.timed_out.length) {
+            notes.push(`${response.timed_out.join('、')} 超时`);
+        }
+        if (response.skipped && response.skipped.length) {
+            notes.push(`${response.skipped.join('、')} 暂时不可用`);
+        }
+        showAlert(`搜索完成，共找到 ${count} 条结果（${notes.join('，')}）`, 'warning');
+    } else {
+        showAlert(`搜索完成，共找到 ${count} 条结果`, 'success');
+    }
+}
+
 // 获取用户在页面上选中的文本
 function getUserSelectedText() {
     let selectedText = '';
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步爬虫引擎
+功能：在一个事件循环中并发抓取多个关键词/页码组合，
+所有请求共享全局并发上限和按主机划分的并发上限，礼貌延迟由令牌桶限速器异步等待，
+HTML解析复用同步爬虫的_parse_response并放到线程池中执行，不阻塞事件循环
+"""
+
+import asyncio
+import random
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from baidu_spider import BaiduSpider
+from bilibili_spider import BilibiliSpider
+from rate_limiter import get_rate_limiter
+from spider_policy import CaptchaDetected
+from debug_capture import CAPTCHA
+
+
+class AsyncSpiderEngine:
+    """
+    异步抓取引擎，持有并发控制、HTTP会话和解析线程池
+    """
+
+    def __init__(self, max_concurrency=10, per_host_limit=2, parse_workers=4, request_timeout=10):
+        """
+        Args:
+            max_concurrency: 全局同时进行的请求数上限
+            per_host_limit: 每个主机同时进行的请求数上限
+            parse_workers: 解析线程池大小
+            request_timeout: 单个请求超时时间（秒）
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.request_timeout = request_timeout
+        self.parse_executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix='spider-parse')
+
+        # 以下对象绑定事件循环，在crawl()中创建
+        self._global_semaphore = None
+        self._host_semaphores = {}
+        self._sessions = {}
+        self._warmup_locks = {}
+
+    def _host_semaphore(self, url):
+        """
+        获取URL所属主机的并发信号量
+        """
+        host = urllib.parse.urlparse(url).hostname
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def _get_session(self, spider):
+        """
+        获取爬虫对应的aiohttp会话，首次使用时访问首页预热Cookie
+        """
+        import aiohttp
+
+        if spider.name not in self._warmup_locks:
+            self._warmup_locks[spider.name] = asyncio.Lock()
+
+        async with self._warmup_locks[spider.name]:
+            if spider.name not in self._sessions:
+                headers = spider.spider.headers.copy()
+                # Host头由aiohttp根据URL自动设置
+                headers.pop('Host', None)
+                headers['User-Agent'] = random.choice(spider.spider.user_agents)
+                session = aiohttp.ClientSession(headers=headers, cookies=spider.spider.cookies)
+                self._sessions[spider.name] = session
+
+                # 先访问首页建立会话，首页请求同样受按主机限速约束
+                try:
+                    await get_rate_limiter().acquire_async(spider.home_url)
+                    await self.fetch(session, spider.home_url)
+                    print(f'{spider.name} 首页预热完成')
+                except Exception as e:
+                    print(f'{spider.name} 首页预热失败: {e}')
+                session.headers.update({'Referer': spider.home_url})
+            return self._sessions[spider.name]
+
+    async def fetch(self, session, url, reader=None):
+        """
+        在全局和主机并发上限内发送GET请求
+
+        Args:
+            session: aiohttp会话
+            url: 请求地址
+            reader: 流式读取器（StreamedText），指定时边下载边解码并可提前停止
+
+        Returns:
+            UTF-8解码后的响应文本
+        """
+        import aiohttp
+
+        async with self._global_semaphore, self._host_semaphore(url):
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            async with session.get(url, timeout=timeout) as response:
+                response.raise_for_status()
+                if reader is not None:
+                    return await reader.read_async(response)
+                return await response.text(encoding='utf-8', errors='replace')
+
+    async def parse(self, parse_func, html_content):
+        """
+        在解析线程池中执行解析函数
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_executor, parse_func, html_content)
+
+    async def _run_job(self, spider, keyword, page):
+        """
+        执行单个关键词/页码抓取任务，出错时返回空结果
+        """
+        started_at = time.monotonic()
+        try:
+            results = await spider.search(keyword, page)
+        except Exception as e:
+            print(f'{spider.name} 抓取 {keyword} 第 {page} 页出错: {e}')
+            results = []
+        return {
+            'source': spider.name,
+            'keyword': keyword,
+            'page': page,
+            'results': results,
+            'elapsed': round(time.monotonic() - started_at, 3)
+        }
+
+    async def crawl(self, jobs):
+        """
+        并发执行所有抓取任务
+
+        Args:
+            jobs: 列表，每项为 (异步爬虫实例, 关键词, 页码)
+
+        Returns:
+            与jobs顺序一致的结果字典列表
+        """
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_semaphores = {}
+        self._warmup_locks = {}
+        self._sessions = {}
+        try:
+            return await asyncio.gather(*[self._run_job(spider, keyword, page) for spider, keyword, page in jobs])
+        finally:
+            for session in self._sessions.values():
+                await session.close()
+            self._sessions = {}
+
+    def close(self):
+        """
+        关闭解析线程池
+        """
+        self.parse_executor.shutdown(wait=False)
+
+
+class AsyncSpider:
+    """
+    异步爬虫基类，复用同步爬虫的请求头、URL构造、来源策略和解析逻辑
+    """
+    name = None
+    home_url = None
+    spider_class = None
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.spider = self.spider_class()
+
+    async def _fetch(self, session, url):
+        """
+        发送一次搜索请求，返回了验证码页面时抛出CaptchaDetected
+        """
+        # 按主机令牌桶限速，等待期间不占用线程
+        await get_rate_limiter().acquire_async(url)
+
+        # 边下载边检查验证码标记，结果已足够时停止下载
+        reader = self.spider.stream_reader()
+        html_content = await self.engine.fetch(session, url, reader)
+        if reader.blocked:
+            print(f'警告: 可能被{self.name}识别为爬虫，需要验证码验证')
+            if self.spider.debug_capture:
+                self.spider.debug_capture.capture(self.name, CAPTCHA, html_content, url)
+            raise CaptchaDetected(f'{self.name}验证码页面')
+        return html_content
+
+    async def search(self, keyword, page=1):
+        """
+        执行搜索
+
+        Args:
+            keyword: 搜索关键词
+            page: 页码
+
+        Returns:
+            搜索结果列表
+        """
+        session = await self.engine._get_session(self)
+        url = self.spider.build_search_url(keyword, page)
+        print(f'[异步] 正在搜索{self.name}关键词: {keyword}, 页码: {page}')
+
+        # 与同步爬虫共享来源策略：临时性错误退避重试，验证码或连续失败时熔断
+        html_content = await self.spider.policy.call_async(self._fetch, session, url)
+        return await self.engine.parse(self.spider._parse_response, html_content)
+
+
+class AsyncBaiduSpider(AsyncSpider):
+    """
+    BaiduSpider的异步版本
+    """
+    name = '百度'
+    home_url = 'https://www.baidu.com/'
+    spider_class = BaiduSpider
+
+
+class AsyncBilibiliSpider(AsyncSpider):
+    """
+    BilibiliSpider的异步版本
+    """
+    name = 'Bilibili'
+    home_url = 'https://www.bilibili.com/'
+    spider_class = BilibiliSpider
+
+
+# 来源名称到异步爬虫类的映射
+ASYNC_SPIDERS = {
+    AsyncBaiduSpider.name: AsyncBaiduSpider,
+    AsyncBilibiliSpider.name: AsyncBilibiliSpider
+}
+
+
+def crawl(keywords, pages=1, sources=None, max_concurrency=10, per_host_limit=2):
+    """
+    模块级别的批量抓取函数，在新的事件循环中并发抓取所有关键词/页码组合
+
+    Args:
+        keywords: 关键词列表
+        pages: 每个关键词抓取的页数
+        sources: 来源名称列表，默认使用全部异步爬虫
+        max_concurrency: 全局并发上限
+        per_host_limit: 每个主机的并发上限
+
+    Returns:
+        结果字典列表，每项包含 source、keyword、page、results、elapsed
+    """
+    engine = AsyncSpiderEngine(max_concurrency=max_concurrency, per_host_limit=per_host_limit)
+    try:
+        spiders = [ASYNC_SPIDERS[name](engine) for name in (sources or ASYNC_SPIDERS)]
+        jobs = [(spider, keyword, page)
+                for keyword in keywords
+                for spider in spiders
+                for page in range(1, pages + 1)]
+        return asyncio.run(engine.crawl(jobs))
+    finally:
+        engine.close()
+
+
+def main():
+    """
+    主函数：python async_spider.py 关键词1,关键词2 [页数]
+    """
+    import sys
+
+    if len(sys.argv) < 2:
+        print('用法: python async_spider.py 关键词1,关键词2 [页数]')
+        return
+
+    keywords = [k.strip() for k in sys.argv[1].split(',') if k.strip()]
+    pages = 1
+    if len(sys.argv) > 2:
+        try:
+            pages = max(1, int(sys.argv[2]))
+        except ValueError:
+            print('无效的页数参数，将爬取1页')
+
+    started_at = time.monotonic()
+    outcomes = crawl(keywords, pages)
+    for outcome in outcomes:
+        print(f"{outcome['source']} - {outcome['keyword']} 第 {outcome['page']} 页: "
+              f"{len(outcome['results'])} 条结果，耗时 {outcome['elapsed']} 秒")
+    print(f'\n共完成 {len(outcomes)} 个抓取任务，总耗时 {time.monotonic() - started_at:.1f} 秒')
+
+
+if __name__ == '__main__':
+    main()
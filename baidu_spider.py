@@ -6,13 +6,61 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
 import urllib.parse
 import time
-import random
+import re
+import threading
+
+from spider_session import SessionPool, StreamedText
+from rate_limiter import get_rate_limiter
+from page_archive import get_page_archive
+from debug_capture import get_debug_capture, SAMPLE, CAPTCHA, EMPTY, ERROR
+from spider_policy import get_policy, CaptchaDetected, CircuitOpenError
+from parse_engine import get_engine, query, region
+from search_result import SearchResult
+
+# 百度搜索地址
+SEARCH_URL = 'https://www.baidu.com/s'
+
+# 结果容器类名（完整匹配），自然结果和聚合卡片都带有这些类名
+RESULT_CONTAINER_QUERY = query(class_name=('c-container', 'result', 'result-op'))
+# 结果链接和兜底文本块的查询条件
+LINK_QUERY = query('a', attrs=('href',))
+TEXT_BLOCK_QUERY = query(('p', 'div', 'span'))
+# 容器内的标题标签和摘要元素类名关键字
+HEADING_TAGS = frozenset(('h3', 'h2'))
+ABSTRACT_CLASS_PATTERN = re.compile('content-right|c-abstract')
+# 每页最多返回的结果数
+MAX_RESULTS = 10
+# 结果区之后的页面区域（右侧栏、翻页），读到这些标记时结果已完整，不必再下载页面的其余部分
+RESULTS_END_MARKERS = ('id="content_right"', 'id="page"')
+# 受限解析的结果区域：左侧结果列表，只为其中的结果容器建树
+RESULTS_REGION = region('id="content_left"', RESULTS_END_MARKERS, RESULT_CONTAINER_QUERY)
+
+# 所有BaiduSpider实例共享的会话池，按预热首页区分（指向替身服务器时使用单独的池）
+_session_pools = {}
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool(headers, cookies, user_agents, home_url='https://www.baidu.com/'):
+    """
+    获取（必要时创建）百度爬虫共享的会话池
+    """
+    pool = _session_pools.get(home_url)
+    if pool is None:
+        with _session_pool_lock:
+            pool = _session_pools.get(home_url)
+            if pool is None:
+                pool = _session_pools[home_url] = SessionPool(home_url, headers, cookies, user_agents)
+    return pool
 
 class BaiduSpider:
-    def __init__(self):
+    def __init__(self, search_url=None):
+        """
+        Args:
+            search_url: 搜索地址，可指向本地替身服务器联调
+        """
+        self.search_url = search_url or SEARCH_URL
         # 使用更真实的浏览器请求头
         self.headers = {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
@@ -27,105 +75,282 @@ class BaiduSpider:
             'BDORZ': 'FFFB88E999055A3F8A630C64834BD6D0',
             'BAIDUID': '154B547D9085A05D2B4F5500D935A2EF:FG=1'
         }
+        # 随机选择不同的User-Agent，避免被识别为爬虫
+        self.user_agents = [
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/88.0',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/91.0.864.59'
+        ]
+        # 预热过的HTTP会话池，跨调用和线程共享
+        self.session_pool = get_session_pool(self.headers, self.cookies, self.user_agents,
+                                             urllib.parse.urljoin(self.search_url, '/'))
+        # 进程内共享的按主机限速器
+        self.rate_limiter = get_rate_limiter()
+        # 原始页面归档，未启用时为None
+        self.page_archive = get_page_archive()
+        # 调试页面采集（后台写入、抽样），关闭时为None
+        self.debug_capture = get_debug_capture()
+        # 来源策略：重试、退避和熔断，所有实例共享
+        self.policy = get_policy('百度')
+        self.parse_engine = get_engine('百度')
+        # 最近一次search因请求失败、验证码或熔断而返回空结果时的错误说明，成功时为None
+        self.last_error = None
     
-    def search(self, keyword, page=1):
+    def build_search_url(self, keyword, page=1):
         """
-        执行百度搜索
+        构造百度搜索URL
         
         Args:
             keyword: 搜索关键词
             page: 页码
             
         Returns:
-            搜索结果列表
+            搜索URL
         """
-        try:
-            # URL编码关键词
-            encoded_keyword = urllib.parse.quote(keyword)
-            
-            # 构造更完整的搜索URL，包含更多参数
-            start = (page - 1) * 10
-            # 添加一些常见的URL参数以模拟真实搜索
-            url = f'https://www.baidu.com/s?wd={encoded_keyword}&pn={start}&oq={encoded_keyword}&ie=utf-8&rsv_idx=2&rsv_pq=b0c73e8902c9f41c&rsv_t=5d7aS8LbX3XJ7X6zX5zX4zX3zX2zX1zX0'
-            
-            print(f'正在搜索关键词: {keyword}, 页码: {page}')
-            print(f'请求URL: {url}')
-            
-            # 添加较长的随机延迟，更接近人类行为
-            time.sleep(random.uniform(2, 4))
-            
-            # 创建会话
-            session = requests.Session()
-            
-            # 随机修改一些请求头信息，避免被识别为爬虫
-            headers = self.headers.copy()
-            # 随机选择不同的User-Agent
-            user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/88.0',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/91.0.864.59'
-            ]
-            headers['User-Agent'] = random.choice(user_agents)
-            
-            session.headers.update(headers)
-            if self.cookies:
-                session.cookies.update(self.cookies)
-            
-            # 先发送一个请求到百度首页，获取Cookie和建立会话
-            home_response = session.get('https://www.baidu.com/', timeout=5)
-            print(f'首页请求状态码: {home_response.status_code}')
-            
-            # 再次添加延迟
-            time.sleep(random.uniform(1, 2))
-            
-            # 添加referer头
-            session.headers.update({'Referer': 'https://www.baidu.com/'})
-            
-            # 发送搜索请求
-            response = session.get(url, timeout=10)
+        # URL编码关键词
+        encoded_keyword = urllib.parse.quote(keyword)
+        
+        # 构造更完整的搜索URL，包含更多参数
+        start = (page - 1) * 10
+        # 添加一些常见的URL参数以模拟真实搜索
+        return f'{self.search_url}?wd={encoded_keyword}&pn={start}&oq={encoded_keyword}&ie=utf-8&rsv_idx=2&rsv_pq=b0c73e8902c9f41c&rsv_t=5d7aS8LbX3XJ7X6zX5zX4zX3zX2zX1zX0'
+    
+    def is_captcha_page(self, html_content):
+        """
+        检查是否被百度识别为爬虫，返回了验证码页面
+        """
+        return '百度安全验证' in html_content or '请输入验证码' in html_content
+    
+    def stream_reader(self):
+        """
+        创建流式读取器：开头出现验证码标记或结果区已读完时停止下载
+        """
+        return StreamedText(is_blocked=self.is_captcha_page,
+                            is_enough=lambda text: any(marker in text for marker in RESULTS_END_MARKERS))
+    
+    def _fetch(self, url, keyword, page):
+        """
+        发送一次搜索请求
+        
+        Args:
+            url: 搜索URL
+            keyword: 搜索关键词
+            page: 页码
             
-            # 检查响应状态
-            response.raise_for_status()
+        Returns:
+            页面HTML文本
             
-            # 设置正确的编码
-            response.encoding = 'utf-8'
+        Raises:
+            CaptchaDetected: 返回了验证码页面
+            requests.exceptions.RequestException: 请求失败
+        """
+        # 按主机令牌桶限速，只有请求预算用完时才等待
+        self.rate_limiter.acquire(url)
+        
+        # 从会话池借用预热过的会话，复用连接和Cookie
+        with self.session_pool.session() as pooled:
+            # 以流的方式发送搜索请求，边下载边解码
+            with pooled.session.get(url, timeout=10, stream=True) as response:
+                # 检查响应状态
+                response.raise_for_status()
+                
+                reader = self.stream_reader()
+                html_content = reader.read(response)
             
             # 调试信息
             print(f'搜索请求状态码: {response.status_code}')
-            print(f'响应内容长度: {len(response.text)} 字符')
+            print(f'响应内容长度: {reader.length} 字符' + ('（结果区已读完，提前停止下载）' if reader.truncated else ''))
+            
+            # 归档原始页面，解析规则修复后可直接重新解析而无需重新抓取；提前停止下载的页面记录截断标记
+            if self.page_archive:
+                self.page_archive.store('百度', url, keyword, page, response.status_code, html_content,
+                                        reader.truncated, reader.bytes_read)
             
             # 检查是否被百度识别为爬虫
-            if '百度安全验证' in response.text or '请输入验证码' in response.text:
+            if reader.blocked:
                 print('警告: 可能被百度识别为爬虫，需要验证码验证')
-                with open('captcha_page.html', 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                print('验证页面已保存到 captcha_page.html')
+                # 触发验证码的会话不再复用
+                pooled.invalidate()
+                if self.debug_capture:
+                    self.debug_capture.capture('百度', CAPTCHA, html_content, url, keyword)
+                raise CaptchaDetected('百度安全验证页面')
+        
+        return html_content
+    
+    def search(self, keyword, page=1):
+        """
+        执行百度搜索
+        
+        Args:
+            keyword: 搜索关键词
+            page: 页码
+            
+        Returns:
+            搜索结果列表，出错时为空列表（错误说明见 last_error）
+        """
+        self.last_error = None
+        try:
+            url = self.build_search_url(keyword, page)
+            
+            print(f'正在搜索关键词: {keyword}, 页码: {page}')
+            print(f'请求URL: {url}')
+            
+            # 按来源策略发送请求：临时性错误指数退避重试，验证码或连续失败时熔断
+            html_content = self.policy.call(self._fetch, url, keyword, page)
             
             # 解析响应内容
-            results = self._parse_response(response.text)
+            results = self._parse_response(html_content)
             
             return results
             
+        except CircuitOpenError as e:
+            print(e)
+            self.last_error = str(e)
+            return []
+        except CaptchaDetected as e:
+            print('百度返回了验证码页面，本次搜索放弃')
+            self.last_error = str(e)
+            return []
         except requests.exceptions.RequestException as e:
             print(f'请求出错: {e}')
-            try:
-                with open('error_page.html', 'w', encoding='utf-8') as f:
-                    f.write(str(e))
-                print('错误页面已保存到 error_page.html')
-            except:
-                pass
+            self.last_error = f'请求出错: {e}'
+            if self.debug_capture:
+                self.debug_capture.capture('百度', ERROR, str(e), url, keyword)
             return []
         except Exception as e:
             print(f'搜索过程出错: {e}')
+            self.last_error = f'搜索过程出错: {e}'
             import traceback
             traceback.print_exc()
             return []
     
+    def _link_result(self, engine, a):
+        """
+        按结果链接的过滤条件检查链接：
+        - 链接长度适中
+        - 文本长度适中
+        - 不是JavaScript链接
+        - 可能包含/link?url= 或 http
+        
+        Returns:
+            (标题, 完整链接)，不是结果链接时返回None
+        """
+        href = engine.attr(a, 'href') or ''
+        if (len(href) <= 20 or href.startswith('javascript:') or
+                not (href.startswith('/link?url=') or href.startswith('http'))):
+            return None
+        # 先检查链接再取文本，被过滤的链接不必计算文本
+        text = engine.text(a)
+        if not 5 < len(text) < 200:
+            return None
+        return text, href if href.startswith('http') else 'https://www.baidu.com' + href
+    
+    def _sibling_summary(self, engine, a):
+        """
+        取链接父元素之后第一个长度合适的相邻元素文本作为摘要
+        """
+        parent = engine.parent(a)
+        if parent is not None:
+            for sibling in engine.next_siblings(parent):
+                text = engine.text(sibling)
+                if 20 < len(text) < 300:
+                    return text
+        return ''
+    
+    def _iter_result_containers(self, engine, doc):
+        """
+        按页面顺序给出结果容器，嵌套在已给出容器内的容器类节点不再重复给出
+        """
+        accepted = set()
+        for container in engine.find_all(doc, RESULT_CONTAINER_QUERY):
+            node = engine.parent(container)
+            while node is not None and engine.node_key(node) not in accepted:
+                node = engine.parent(node)
+            if node is None:
+                accepted.add(engine.node_key(container))
+                yield container
+    
+    def _extract_container(self, engine, container):
+        """
+        遍历一次容器的后代节点，提取标题、链接和摘要
+        
+        标题优先取标题标签内的链接，其次取容器内第一个符合条件的链接；摘要优先取
+        摘要类元素，没有时取标题链接父元素之后的相邻元素
+        
+        Returns:
+            SearchResult，没有有效标题时返回None
+        """
+        heading = abstract_elem = None
+        links = []
+        for node in engine.descendants(container):
+            tag = engine.tag(node)
+            if tag == 'a':
+                links.append(node)
+            elif heading is None and tag in HEADING_TAGS:
+                heading = node
+            elif abstract_elem is None and ABSTRACT_CLASS_PATTERN.search(engine.attr(node, 'class') or ''):
+                abstract_elem = node
+        
+        title_link = engine.find(heading, LINK_QUERY) if heading is not None else None
+        for a in ([title_link] if title_link is not None else []) + links:
+            link = self._link_result(engine, a)
+            if link is not None and len(link[0]) > 8:
+                title, url = link
+                break
+        else:
+            return None
+        
+        summary = engine.text(abstract_elem) if abstract_elem is not None else ''
+        return SearchResult(title=title, url=url, summary=summary or self._sibling_summary(engine, a))
+    
+    def _extract_results(self, engine, doc):
+        """
+        逐个结果容器单次提取标题、链接和摘要，边提取边去重，达到结果上限即停止；
+        文档中没有结果容器时退回到逐个链接查找
+        
+        Returns:
+            结果列表
+        """
+        results = []
+        seen_titles = set()
+        
+        def add_result(result):
+            # 按标题去重，返回是否已达到结果上限
+            if result.title not in seen_titles:
+                seen_titles.add(result.title)
+                results.append(result)
+                print(f'添加结果: {result.title}')
+            return len(results) >= MAX_RESULTS
+        
+        for container in self._iter_result_containers(engine, doc):
+            try:
+                result = self._extract_container(engine, container)
+            except Exception as e:
+                print(f'解析单个结果出错: {e}')
+                continue
+            if result and add_result(result):
+                break
+        
+        # 没有结果容器时逐个检查链接，摘要只为入选的链接计算
+        if not results:
+            print('未找到结果容器，尝试使用链接查找方法')
+            for a in engine.iter_find(doc, LINK_QUERY):
+                link = self._link_result(engine, a)
+                if link is None or len(link[0]) <= 8 or link[0] in seen_titles:
+                    continue
+                title, url = link
+                if add_result(SearchResult(title=title, url=url, summary=self._sibling_summary(engine, a))):
+                    break
+        return results
+    
     def _parse_response(self, html_content):
         """
         解析HTML响应内容，提取搜索结果
         
+        先只为结果区域的结果容器建树并提取；没有结果时再解析整个页面，
+        仍然没有结果时才提取页面中的文本内容
+        
         Args:
             html_content: HTML内容
             
@@ -135,94 +360,59 @@ class BaiduSpider:
         results = []
         
         try:
-            # 保存完整的HTML以便调试
-            with open('debug_page.html', 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            print('调试页面已保存到 debug_page.html')
-            
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(html_content, 'html.parser')  # 使用更简单的解析器
-            
             # 检查页面是否包含搜索结果的特征文本
             if '百度为您找到相关结果约' in html_content:
                 print('检测到搜索结果页面特征')
             else:
                 print('未检测到搜索结果页面特征，可能被反爬')
             
-            # 尝试使用更简单直接的方法查找结果
-            # 1. 查找所有包含href属性的a标签
-            all_a_tags = soup.find_all('a', href=True)
-            print(f'找到 {len(all_a_tags)} 个链接标签')
-            
-            # 过滤出可能的搜索结果链接
-            candidate_links = []
-            for a in all_a_tags:
-                href = a['href']
-                text = a.get_text(strip=True)
-                
-                # 过滤条件：
-                # - 链接长度适中
-                # - 文本长度适中
-                # - 不是JavaScript链接
-                # - 可能包含/link?url= 或 http
-                if (len(href) > 20 and 
-                    len(text) > 5 and len(text) < 200 and 
-                    not href.startswith('javascript:') and 
-                    (href.startswith('/link?url=') or href.startswith('http'))):
-                    
-                    # 查找这个链接的父元素，尝试获取摘要
-                    summary = ''
-                    parent = a.find_parent()
-                    if parent:
-                        # 查找可能包含摘要的相邻元素
-                        for sibling in parent.find_next_siblings():
-                            sib_text = sibling.get_text(strip=True)
-                            if len(sib_text) > 20 and len(sib_text) < 300:
-                                summary = sib_text
-                                break
-                    
-                    candidate_links.append({
-                        'title': text,
-                        'url': href if href.startswith('http') else 'https://www.baidu.com' + href,
-                        'summary': summary
-                    })
-            
-            print(f'过滤后得到 {len(candidate_links)} 个候选链接')
-            
-            # 去重处理
-            seen_titles = set()
-            for link in candidate_links:
-                if link['title'] not in seen_titles and len(link['title']) > 8:
-                    seen_titles.add(link['title'])
-                    results.append(link)
-                    print(f'添加结果: {link["title"]}')
-                    # 最多返回10个结果
-                    if len(results) >= 10:
-                        break
+            # 使用配置的解析引擎，先只解析结果区域
+            engine = self.parse_engine
+            doc = engine.parse_region(html_content, RESULTS_REGION)
+            if doc is None:
+                print('未找到结果区域，解析整个页面')
+            else:
+                try:
+                    results = self._extract_results(engine, doc)
+                finally:
+                    # 显式释放文档树
+                    engine.release(doc)
+                    del doc
+                if not results:
+                    print('结果区域没有解析到结果，解析整个页面')
             
-            # 如果仍然没有找到结果，尝试提取页面中的文本内容
             if not results:
-                print('尝试提取页面中的文本内容...')
-                # 提取所有段落和div文本
-                all_texts = []
-                for tag in soup.find_all(['p', 'div', 'span']):
-                    text = tag.get_text(strip=True)
-                    if len(text) > 50 and len(text) < 500:
-                        all_texts.append(text)
-                
-                # 添加前3个较长的文本片段
-                for i, text in enumerate(all_texts[:3]):
-                    results.append({
-                        'type': 'text',
-                        'content': text[:200] + '...'
-                    })
+                doc = engine.parse(html_content)
+                try:
+                    results = self._extract_results(engine, doc)
+                    
+                    # 如果仍然没有找到结果，尝试提取页面中的文本内容
+                    if not results:
+                        print('尝试提取页面中的文本内容...')
+                        # 取前3个较长的段落和div文本
+                        for tag in engine.iter_find(doc, TEXT_BLOCK_QUERY):
+                            text = engine.text(tag)
+                            if len(text) > 50 and len(text) < 500:
+                                results.append(SearchResult(type='text', content=text[:200] + '...'))
+                                if len(results) >= 3:
+                                    break
+                finally:
+                    engine.release(doc)
+                    del doc
             
             print(f'最终解析到 {len(results)} 条有效结果')
             
+            # 调试页面交给后台线程保存：没有搜索结果的页面总是保存，其余按比例抽样
+            if self.debug_capture:
+                has_results = any(result.title is not None for result in results)
+                self.debug_capture.capture('百度', SAMPLE if has_results else EMPTY, html_content)
+            
         except Exception as e:
             print(f'解析HTML出错: {e}')
             import traceback
             traceback.print_exc()
+            if self.debug_capture:
+                self.debug_capture.capture('百度', ERROR, html_content)
         
         return results
     
@@ -244,16 +434,16 @@ class BaiduSpider:
                 
                 for i, result in enumerate(results, 1):
                     f.write(f'结果 {i}:\n')
-                    if 'title' in result:
-                        f.write(f'标题: {result["title"]}\n')
-                    if 'url' in result:
-                        f.write(f'链接: {result["url"]}\n')
-                    if 'summary' in result:
-                        f.write(f'摘要: {result["summary"]}\n')
-                    if 'source' in result:
-                        f.write(f'来源: {result["source"]}\n')
-                    if 'type' in result and result['type'] == 'special':
-                        f.write(f'内容: {result["content"]}\n')
+                    if result.title is not None:
+                        f.write(f'标题: {result.title}\n')
+                    if result.url is not None:
+                        f.write(f'链接: {result.url}\n')
+                    if result.summary is not None:
+                        f.write(f'摘要: {result.summary}\n')
+                    if result.source is not None:
+                        f.write(f'来源: {result.source}\n')
+                    if result.type == 'special':
+                        f.write(f'内容: {result.content}\n')
                     f.write('-' * 80 + '\n\n')
             
             print(f'结果已保存到: {filename}')
@@ -301,10 +491,6 @@ def main():
         for page in range(1, page_count + 1):
             results = spider.search(keyword, page)
             all_results.extend(results)
-            
-            # 如果不是最后一页，添加延迟
-            if page < page_count:
-                time.sleep(random.uniform(2, 5))
         
         # 显示结果
         print(f'\n共找到 {len(all_results)} 条结果\n')
@@ -314,16 +500,16 @@ def main():
             print("前几条结果预览:")
             for i, result in enumerate(all_results[:5], 1):
                 print(f'\n结果 {i}:')
-                if 'title' in result:
-                    print(f'标题: {result["title"]}')
-                if 'url' in result:
-                    print(f'链接: {result["url"]}')
-                if 'summary' in result:
-                    print(f'摘要: {result["summary"]}')
-                if 'source' in result:
-                    print(f'来源: {result["source"]}')
-                if 'type' in result and result['type'] == 'special':
-                    print(f'内容: {result["content"]}')
+                if result.title is not None:
+                    print(f'标题: {result.title}')
+                if result.url is not None:
+                    print(f'链接: {result.url}')
+                if result.summary is not None:
+                    print(f'摘要: {result.summary}')
+                if result.source is not None:
+                    print(f'来源: {result.source}')
+                if result.type == 'special':
+                    print(f'内容: {result.content}')
             
             # 自动保存结果
             print("\n正在保存结果到文件...")
@@ -361,10 +547,6 @@ def main():
         for page in range(1, page_count + 1):
             results = spider.search(keyword, page)
             all_results.extend(results)
-            
-            # 如果不是最后一页，添加延迟
-            if page < page_count:
-                time.sleep(random.uniform(2, 5))
         
         # 显示结果
         print(f'\n共找到 {len(all_results)} 条结果\n')
@@ -374,16 +556,16 @@ def main():
             print("前几条结果预览:")
             for i, result in enumerate(all_results[:5], 1):
                 print(f'\n结果 {i}:')
-                if 'title' in result:
-                    print(f'标题: {result["title"]}')
-                if 'url' in result:
-                    print(f'链接: {result["url"]}')
-                if 'summary' in result:
-                    print(f'摘要: {result["summary"]}')
-                if 'source' in result:
-                    print(f'来源: {result["source"]}')
-                if 'type' in result and result['type'] == 'special':
-                    print(f'内容: {result["content"]}')
+                if result.title is not None:
+                    print(f'标题: {result.title}')
+                if result.url is not None:
+                    print(f'链接: {result.url}')
+                if result.summary is not None:
+                    print(f'摘要: {result.summary}')
+                if result.source is not None:
+                    print(f'来源: {result.source}')
+                if result.type == 'special':
+                    print(f'内容: {result.content}')
             
             # 保存结果
             save_choice = input("\n是否保存所有结果到文件？(y/n): ")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析器基准测试
+功能：用fixtures/中录制的百度、B站搜索页面，测量各解析引擎下爬虫_parse_response的
+耗时、内存分配（tracemalloc）和结果数，并对照expected_results.json中固定的预期结果
+校验正确性；结果可输出为JSON，便于在不同提交之间对比
+用法：python benchmarks/run_parsers.py [--repeat 次数] [--engine 引擎 ...] [--page 页面 ...]
+      [--output 结果.json] [--compare 上次结果.json] [--pin]
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'fixtures')
+EXPECTED_PATH = os.path.join(BENCHMARKS_DIR, 'expected_results.json')
+
+# 爬虫模块位于项目根目录
+sys.path.insert(0, ROOT_DIR)
+
+import parse_engine
+import page_archive
+import debug_capture
+from page_archive import SPIDER_CLASSES
+
+# 基准页面：页面名称 -> (录制文件, 来源)
+CORPUS = {
+    'baidu_serp': ('baidu_serp.html', '百度'),
+    'bilibili_search_page': ('bilibili_search_page.html', 'Bilibili'),
+}
+# 固定预期结果时每个页面保存的结果条数
+PINNED_RESULTS = 3
+
+
+def load_spider(source, engine_name):
+    """
+    创建使用指定解析引擎的爬虫实例
+
+    Returns:
+        爬虫实例，引擎所需的库未安装时返回None
+    """
+    parse_engine.configure(default=parse_engine.DEFAULT_ENGINE, sources={source: engine_name})
+    # 基准测试不归档页面，也不采集调试页面
+    page_archive.configure(None)
+    debug_capture.configure(None)
+    module_name, class_name = SPIDER_CLASSES[source]
+    with redirect_stdout(io.StringIO()):
+        spider = getattr(importlib.import_module(module_name), class_name)()
+    if spider.parse_engine.name != engine_name:
+        return None
+    return spider
+
+
+def measure(spider, html_content, repeat):
+    """
+    测量一次页面解析
+
+    Returns:
+        (结果列表, 耗时列表（毫秒）, 峰值内存（字节）, 解析结束后仍占用的内存（字节）)
+    """
+    with redirect_stdout(io.StringIO()):
+        # 预热一次：编译查询条件、导入解析库
+        results = spider._parse_response(html_content)
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            spider._parse_response(html_content)
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+        tracemalloc.start()
+        try:
+            spider._parse_response(html_content)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return results, timings, peak, retained
+
+
+def pin_results(results):
+    """
+    取结果的前几条作为固定的预期结果
+    """
+    return {
+        'count': len(results),
+        'results': [{key: getattr(result, key) for key in ('title', 'url')} for result in results[:PINNED_RESULTS]]
+    }
+
+
+def check_results(results, expected):
+    """
+    对照预期结果校验
+
+    Returns:
+        不一致之处的说明列表，一致时为空列表
+    """
+    if expected is None:
+        return ['没有固定的预期结果，请使用 --pin 生成']
+    problems = []
+    if len(results) != expected['count']:
+        problems.append(f"结果数 {len(results)}，预期 {expected['count']}")
+    actual = pin_results(results)['results']
+    for i, pinned in enumerate(expected['results']):
+        if i >= len(actual) or actual[i] != pinned:
+            problems.append(f'第 {i + 1} 条结果与预期不一致: {actual[i] if i < len(actual) else None}')
+    return problems
+
+
+def git_commit():
+    """
+    当前提交的短哈希，不在git仓库中时返回None
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(report, baseline):
+    """
+    打印与上次结果的对比：耗时取中位数，内存取峰值
+    """
+    previous = {(case['page'], case['engine']): case for case in baseline['cases']}
+    print(f"\n与 {baseline.get('commit') or '上次结果'} 对比：")
+    for case in report['cases']:
+        old = previous.get((case['page'], case['engine']))
+        if old is None or 'time_ms' not in case or 'time_ms' not in old:
+            continue
+        old_time, new_time = old['time_ms']['median'], case['time_ms']['median']
+        print(f"  {case['page']:<22} {case['engine']:<12} "
+              f"耗时 {old_time:8.2f} -> {new_time:8.2f} ms ({(new_time - old_time) / old_time * 100:+.1f}%)  "
+              f"峰值内存 {old['peak_kib']:7.0f} -> {case['peak_kib']:7.0f} KiB  "
+              f"结果数 {old['results']} -> {case['results']}")
+
+
+def run(pages, engines, repeat, expected=None):
+    """
+    对每个页面和解析引擎执行基准测试
+
+    Args:
+        pages: 页面名称列表
+        engines: 解析引擎名称列表
+        repeat: 计时次数
+        expected: 页面名称 -> 固定的预期结果；为None时以第一个引擎的结果为准
+
+    Returns:
+        (报告字典, 当前结果的固定预期)
+    """
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'repeat': repeat,
+        'cases': []
+    }
+    pinned = {}
+    for page in pages:
+        filename, source = CORPUS[page]
+        with open(os.path.join(FIXTURES_DIR, filename), encoding='utf-8') as f:
+            html_content = f.read()
+        for engine_name in engines:
+            case = {'page': page, 'source': source, 'engine': engine_name, 'chars': len(html_content)}
+            report['cases'].append(case)
+            spider = load_spider(source, engine_name)
+            if spider is None:
+                case['skipped'] = f'解析引擎 {engine_name} 不可用'
+                print(f'{page:<22} {engine_name:<12} 跳过（引擎不可用）')
+                continue
+
+            results, timings, peak, retained = measure(spider, html_content, repeat)
+            pinned.setdefault(page, pin_results(results))
+            problems = check_results(results, (expected if expected is not None else pinned).get(page))
+            case.update({
+                'results': len(results),
+                'time_ms': {
+                    'min': round(min(timings), 3),
+                    'median': round(statistics.median(timings), 3),
+                    'mean': round(statistics.mean(timings), 3)
+                },
+                'peak_kib': round(peak / 1024, 1),
+                'retained_kib': round(retained / 1024, 1),
+                'ok': not problems,
+                'problems': problems
+            })
+            print(f"{page:<22} {engine_name:<12} 中位数 {case['time_ms']['median']:8.2f} ms  "
+                  f"最小 {case['time_ms']['min']:8.2f} ms  峰值内存 {case['peak_kib']:7.0f} KiB  "
+                  f"结果 {len(results):>2} 条  {'通过' if not problems else '不一致'}")
+            for problem in problems:
+                print(f'    {problem}')
+    return report, pinned
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫解析器基准测试')
+    parser.add_argument('--repeat', type=int, default=20, help='每个页面和引擎的计时次数')
+    parser.add_argument('--engine', action='append', choices=list(parse_engine.ENGINE_CLASSES),
+                        help='只测试该解析引擎，可重复指定，默认全部引擎')
+    parser.add_argument('--page', action='append', choices=list(CORPUS), help='只测试该页面，可重复指定')
+    parser.add_argument('--output', help='将结果写入该JSON文件')
+    parser.add_argument('--compare', help='与该JSON文件中的上次结果对比')
+    parser.add_argument('--pin', action='store_true', help='用本次html.parser的结果更新固定的预期结果')
+    args = parser.parse_args()
+
+    expected = {}
+    if os.path.exists(EXPECTED_PATH):
+        with open(EXPECTED_PATH, encoding='utf-8') as f:
+            expected = json.load(f)
+
+    pages = args.page or list(CORPUS)
+    engines = args.engine or list(parse_engine.ENGINE_CLASSES)
+    if args.pin:
+        # 预期结果以html.parser（与BeautifulSoup原有解析方式一致）为准
+        engines = [parse_engine.HTML_PARSER] + [name for name in engines if name != parse_engine.HTML_PARSER]
+    report, pinned = run(pages, engines, args.repeat, None if args.pin else expected)
+
+    if args.pin:
+        expected.update(pinned)
+        with open(EXPECTED_PATH, 'w', encoding='utf-8') as f:
+            json.dump(expected, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f'预期结果已更新: {EXPECTED_PATH}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存到: {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(report, json.load(f))
+
+    if not all(case.get('ok', True) for case in report['cases']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,13 +6,88 @@ Bilibili搜索爬虫程序
 """
 
 import requests
-from bs4 import BeautifulSoup
 import urllib.parse
 import time
-import random
+import re
+import html
+import threading
+
+from spider_session import SessionPool, StreamedText, MARKER_OVERLAP
+from rate_limiter import get_rate_limiter
+from page_archive import get_page_archive
+from debug_capture import get_debug_capture, SAMPLE, CAPTCHA, EMPTY, ERROR
+from spider_policy import get_policy, CaptchaDetected, CircuitOpenError
+from parse_engine import get_engine, query, region
+from search_result import SearchResult
+
+# 默认抓取方式：'api' 优先调用JSON搜索接口，失败时回退到HTML页面；'html' 只抓取HTML页面
+DEFAULT_FETCH_MODE = 'api'
+# B站网页端JSON搜索接口
+SEARCH_API_URL = 'https://api.bilibili.com/x/web-interface/search/type'
+# B站网页端搜索页面和预热会话时访问的首页
+SEARCH_URL = 'https://search.bilibili.com/all'
+HOME_URL = 'https://www.bilibili.com/'
+
+# 视频卡片类名（完整匹配）；页面没有这些类名时，退而使用带数据ID的列表项
+VIDEO_CARD_CLASSES = ('bili-video-card', 'video-list-item', 'video-card', 'search-item', 'list-item')
+VIDEO_CARD_QUERY = query(class_name=VIDEO_CARD_CLASSES)
+# 流式读取时识别视频卡片的开始标签（类名完整匹配，不含 bili-video-card__wrap 等卡片内部元素）
+CARD_START_PATTERN = re.compile(r'class="(?:[^"]*\s)?(?:%s)["\s]' % '|'.join(map(re.escape, VIDEO_CARD_CLASSES)))
+VIDEO_CARD_LI_QUERY = query('li', attrs=('data-id',))
+LINK_QUERY = query('a', attrs=('href',))
+TEXT_BLOCK_QUERY = query(('p', 'div', 'span'))
+# 卡片内各字段元素的标签和类名关键字
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4'))
+TITLE_TAGS = frozenset(('h3', 'h2', 'a'))
+BLOCK_TAGS = frozenset(('p', 'div', 'span'))
+FIELD_TAGS = TITLE_TAGS | BLOCK_TAGS
+TITLE_CLASS_PATTERN = re.compile('title|name')
+STATS_CLASS_PATTERN = re.compile('play|view|danmaku|stat')
+AUTHOR_CLASS_PATTERN = re.compile('up|author')
+DESC_CLASS_PATTERN = re.compile('desc|intro')
+BV_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+# 每页最多返回的结果数
+MAX_RESULTS = 10
+# 视频卡片之后的页面状态脚本，读到时卡片已全部下载
+PAGE_STATE_MARKER = '__pinia'
+# 受限解析的结果区域：搜索结果列表到页面状态脚本之前，只为其中的视频卡片建树
+RESULTS_REGION = region(('search-page-wrapper', 'video-list'), PAGE_STATE_MARKER, VIDEO_CARD_QUERY)
+
+
+class ApiRejected(Exception):
+    """
+    JSON搜索接口被风控拦截（-412），只说明接口方式暂不可用，HTML页面仍可抓取
+    """
+
+
+# 所有BilibiliSpider实例共享的会话池，按预热首页区分（指向替身服务器时使用单独的池）
+_session_pools = {}
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool(headers, cookies, user_agents, home_url=HOME_URL):
+    """
+    获取（必要时创建）B站爬虫共享的会话池
+    """
+    pool = _session_pools.get(home_url)
+    if pool is None:
+        with _session_pool_lock:
+            pool = _session_pools.get(home_url)
+            if pool is None:
+                pool = _session_pools[home_url] = SessionPool(home_url, headers, cookies, user_agents)
+    return pool
 
 class BilibiliSpider:
-    def __init__(self):
+    def __init__(self, fetch_mode=None, api_url=None, search_url=None):
+        """
+        Args:
+            fetch_mode: 抓取方式，'api' 或 'html'，默认为DEFAULT_FETCH_MODE
+            api_url: JSON搜索接口地址，可指向本地替身服务器联调
+            search_url: 搜索页面地址，可指向本地替身服务器联调
+        """
+        self.fetch_mode = fetch_mode or DEFAULT_FETCH_MODE
+        self.api_url = api_url or SEARCH_API_URL
+        self.search_url = search_url or SEARCH_URL
         # 使用用户提供的请求头信息
         self.headers = {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -49,106 +124,527 @@ class BilibiliSpider:
             'CURRENT_FNVAL': '2000',
             'sid': 'qlmnxp4w'
         }
+        # 随机选择不同的User-Agent
+        self.user_agents = [
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 SLBrowser/9.0.6.8151 SLBChan/112 SLBVPV/64-bit',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/125.0',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/124.0.0.0'
+        ]
+        # 预热过的HTTP会话池，跨调用和线程共享；指向替身服务器时在替身服务器上预热
+        override_url = search_url or api_url
+        self.session_pool = get_session_pool(self.headers, self.cookies, self.user_agents,
+                                             urllib.parse.urljoin(override_url, '/') if override_url else HOME_URL)
+        # 进程内共享的按主机限速器
+        self.rate_limiter = get_rate_limiter()
+        # 原始页面归档，未启用时为None
+        self.page_archive = get_page_archive()
+        # 调试页面采集（后台写入、抽样），关闭时为None
+        self.debug_capture = get_debug_capture()
+        # 来源策略：重试、退避和熔断，所有实例共享
+        self.policy = get_policy('Bilibili')
+        self.parse_engine = get_engine('Bilibili')
+        # 最近一次search因请求失败、验证码或熔断而返回空结果时的错误说明，成功时为None
+        self.last_error = None
     
-    def search(self, keyword, page=1):
+    def build_search_url(self, keyword, page=1):
         """
-        执行Bilibili搜索
+        构造Bilibili搜索URL
         
         Args:
             keyword: 搜索关键词
             page: 页码
             
         Returns:
-            搜索结果列表
+            搜索URL
         """
-        try:
-            # URL编码关键词
-            encoded_keyword = urllib.parse.quote(keyword)
-            
-            # 构造搜索URL
-            # Bilibili搜索结果通常使用pn参数表示页码，每页10条结果
-            pn = (page - 1) * 10
-            url = f'https://search.bilibili.com/all?keyword={encoded_keyword}&pn={pn}&from_source=webtop_search&spm_id_from=333.1007&search_source=3'
-            
-            print(f'正在搜索Bilibili关键词: {keyword}, 页码: {page}')
-            print(f'请求URL: {url}')
+        # URL编码关键词
+        encoded_keyword = urllib.parse.quote(keyword)
+        
+        # Bilibili搜索结果通常使用pn参数表示页码，每页10条结果
+        pn = (page - 1) * 10
+        return f'{self.search_url}?keyword={encoded_keyword}&pn={pn}&from_source=webtop_search&spm_id_from=333.1007&search_source=3'
+    
+    def is_captcha_page(self, html_content):
+        """
+        检查是否有验证信息，即被Bilibili识别为爬虫
+        """
+        return '验证码' in html_content or '安全验证' in html_content
+    
+    def stream_reader(self):
+        """
+        创建流式读取器：开头出现验证码标记时停止下载；结果区域内已有MAX_RESULTS个视频卡片
+        下载完整（其后的卡片已开始）时，或读到页面状态脚本时，不必再下载页面的其余部分
+
+        推荐和广告等位置同样带有BV号，只统计结果区域内完整的、包含视频链接的卡片，
+        否则可能在结果卡片下载完之前就停止
+        """
+        tail = ''
+        pending = None  # 结果区域内尚未确认完整的文本，结果区域开始前为None
+        videos = set()
+        
+        def is_enough(window):
+            nonlocal tail, pending
+            # 窗口开头是上一片段末尾的重叠部分，只有其后的文本是新读到的
+            piece = window[len(tail):]
+            tail = window[-MARKER_OVERLAP:]
+            if PAGE_STATE_MARKER in window:
+                return True
+            if pending is None:
+                starts = [position for position in map(window.find, RESULTS_REGION.start_markers) if position >= 0]
+                if not starts:
+                    return False
+                pending = window[min(starts):]
+            else:
+                pending += piece
+            
+            # 每个卡片开始时，前一个卡片已下载完整
+            cards = [match.start() for match in CARD_START_PATTERN.finditer(pending)]
+            for start, end in zip(cards, cards[1:]):
+                match = BV_PATTERN.search(pending, start, end)
+                if match:
+                    videos.add(match.group(0))
+            if cards:
+                pending = pending[cards[-1]:]
+            return len(videos) >= MAX_RESULTS
+        
+        return StreamedText(is_blocked=self.is_captcha_page, is_enough=is_enough)
+    
+    def build_api_url(self, keyword, page=1):
+        """
+        构造JSON搜索接口URL（只搜索视频）
+        """
+        params = urllib.parse.urlencode({'search_type': 'video', 'keyword': keyword, 'page': page})
+        return f'{self.api_url}?{params}'
+    
+    def _fetch_api(self, url):
+        """
+        请求JSON搜索接口
+        
+        Returns:
+            接口返回的JSON数据
             
-            # 添加随机延迟，模拟人类行为
-            time.sleep(random.uniform(2, 4))
+        Raises:
+            ApiRejected: 接口返回-412，请求被风控拦截
+            ValueError: 接口返回其他错误码
+            requests.exceptions.RequestException: 请求失败
+        """
+        self.rate_limiter.acquire(url)
+        
+        with self.session_pool.session() as pooled:
+            response = pooled.session.get(url, timeout=10, headers={
+                'Accept': 'application/json, text/plain, */*',
+                'Host': urllib.parse.urlparse(url).netloc,
+                'Origin': 'https://search.bilibili.com',
+                'Referer': 'https://search.bilibili.com/',
+                'Sec-Fetch-Dest': 'empty',
+                'Sec-Fetch-Mode': 'cors',
+                'Sec-Fetch-Site': 'same-site'
+            })
+            response.raise_for_status()
+            data = response.json()
+            
+            code = data.get('code')
+            if code == -412:
+                # 请求被风控拦截，该会话不再复用
+                pooled.invalidate()
+                if self.debug_capture:
+                    self.debug_capture.capture('Bilibili', CAPTCHA, response.text, url)
+                raise ApiRejected(f'Bilibili搜索接口请求被拦截: {data.get("message")}')
+            if code != 0:
+                raise ValueError(f'Bilibili搜索接口返回错误 {code}: {data.get("message")}')
+        
+        return data
+    
+    def _parse_api_response(self, data):
+        """
+        将JSON搜索接口的视频结果映射为SearchResult
+        
+        Args:
+            data: 接口返回的JSON数据
             
-            # 创建会话
-            session = requests.Session()
+        Returns:
+            解析后的结果列表，包含结构化的play、danmaku字段
+        """
+        results = []
+        for item in (data.get('data') or {}).get('result') or []:
+            if item.get('type', 'video') != 'video':
+                continue
+            
+            # 标题中的关键词用<em>标签高亮，需要去掉标签并反转义
+            title = html.unescape(re.sub(r'<[^>]+>', '', item.get('title') or '')).strip()
+            if len(title) <= 5:
+                continue
+            
+            result = SearchResult(title=title, author=item.get('author') or None)
+            if item.get('bvid'):
+                result.url = f'https://www.bilibili.com/video/{item["bvid"]}/'
+            elif item.get('arcurl'):
+                result.url = item['arcurl'].replace('http://', 'https://', 1)
+            
+            # 结构化的播放量和弹幕数，同时保留与HTML解析一致的stats文本
+            play = item.get('play')
+            danmaku = item.get('video_review', item.get('danmaku'))
+            stats = []
+            if isinstance(play, int):
+                result.play = play
+                stats.append(f'播放 {play}')
+            if isinstance(danmaku, int):
+                result.danmaku = danmaku
+                stats.append(f'弹幕 {danmaku}')
+            if item.get('duration'):
+                result.duration = item['duration']
+                stats.append(f'时长 {item["duration"]}')
+            if stats:
+                result.stats = ' '.join(stats)
+            
+            description = html.unescape(item.get('description') or '').strip()
+            if description:
+                result.summary = description
+            
+            results.append(result)
+            # 最多返回10个结果
+            if len(results) >= MAX_RESULTS:
+                break
+        
+        print(f'搜索接口解析到 {len(results)} 条有效结果')
+        return results
+    
+    def _search_api(self, keyword, page):
+        """
+        通过JSON搜索接口搜索，接口失败时返回空列表以便回退到HTML页面抓取
+        
+        接口的风控拦截（-412）与其他接口错误一样只记为一次普通失败，不按验证码熔断，
+        否则整个来源会被熔断，HTML页面也无法再抓取
+        
+        Raises:
+            CircuitOpenError: 来源处于熔断状态
+        """
+        url = self.build_api_url(keyword, page)
+        print(f'请求搜索接口: {url}')
+        try:
+            return self._parse_api_response(self.policy.call(self._fetch_api, url))
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f'搜索接口请求失败: {e}')
+            return []
+    
+    def _fetch(self, url, keyword, page):
+        """
+        发送一次搜索请求
+        
+        Args:
+            url: 搜索URL
+            keyword: 搜索关键词
+            page: 页码
             
-            # 随机修改一些请求头信息
-            headers = self.headers.copy()
-            # 随机选择不同的User-Agent
-            user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 SLBrowser/9.0.6.8151 SLBChan/112 SLBVPV/64-bit',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/125.0',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/124.0.0.0'
-            ]
-            headers['User-Agent'] = random.choice(user_agents)
+        Returns:
+            页面HTML文本
             
-            # 设置请求头和cookies
-            session.headers.update(headers)
-            if self.cookies:
-                session.cookies.update(self.cookies)
+        Raises:
+            CaptchaDetected: 返回了验证码页面
+            requests.exceptions.RequestException: 请求失败
+        """
+        # 按主机令牌桶限速，只有请求预算用完时才等待
+        self.rate_limiter.acquire(url)
+        
+        # 从会话池借用预热过的会话，复用连接和Cookie
+        with self.session_pool.session() as pooled:
+            # 以流的方式发送搜索请求，边下载边解码
+            with pooled.session.get(url, timeout=10, stream=True) as response:
+                # 检查响应状态
+                response.raise_for_status()
+                
+                reader = self.stream_reader()
+                html_content = reader.read(response)
             
-            # 先访问Bilibili首页建立会话
-            home_response = session.get('https://www.bilibili.com/', timeout=5)
-            print(f'首页请求状态码: {home_response.status_code}')
+            # 调试信息
+            print(f'搜索请求状态码: {response.status_code}')
+            print(f'响应内容长度: {reader.length} 字符' + ('（结果已足够，提前停止下载）' if reader.truncated else ''))
             
-            # 再次添加延迟
-            time.sleep(random.uniform(1, 2))
+            # 归档原始页面，解析规则修复后可直接重新解析而无需重新抓取；提前停止下载的页面记录截断标记
+            if self.page_archive:
+                self.page_archive.store('Bilibili', url, keyword, page, response.status_code, html_content,
+                                        reader.truncated, reader.bytes_read)
             
-            # 添加referer头
-            session.headers.update({'Referer': 'https://www.bilibili.com/'})
+            # 检查是否有验证信息
+            if reader.blocked:
+                print('警告: 可能被Bilibili识别为爬虫，需要验证码验证')
+                # 触发验证码的会话不再复用
+                pooled.invalidate()
+                if self.debug_capture:
+                    self.debug_capture.capture('Bilibili', CAPTCHA, html_content, url, keyword)
+                raise CaptchaDetected('Bilibili验证码页面')
+        
+        return html_content
+    
+    def search(self, keyword, page=1):
+        """
+        执行Bilibili搜索
+        
+        Args:
+            keyword: 搜索关键词
+            page: 页码
             
-            # 发送搜索请求
-            response = session.get(url, timeout=10)
+        Returns:
+            搜索结果列表，出错时为空列表（错误说明见 last_error）
+        """
+        self.last_error = None
+        try:
+            # 构造搜索URL
+            url = self.build_search_url(keyword, page)
             
-            # 检查响应状态
-            response.raise_for_status()
+            print(f'正在搜索Bilibili关键词: {keyword}, 页码: {page}')
             
-            # 设置正确的编码
-            response.encoding = 'utf-8'
+            # 优先使用JSON搜索接口，失败或无结果时回退到HTML页面抓取
+            if self.fetch_mode == 'api':
+                results = self._search_api(keyword, page)
+                if results:
+                    return results
+                print('搜索接口无结果，回退到HTML页面抓取')
             
-            # 调试信息
-            print(f'搜索请求状态码: {response.status_code}')
-            print(f'响应内容长度: {len(response.text)} 字符')
+            print(f'请求URL: {url}')
             
-            # 检查是否有验证信息
-            if '验证码' in response.text or '安全验证' in response.text:
-                print('警告: 可能被Bilibili识别为爬虫，需要验证码验证')
-                with open('bilibili_captcha_page.html', 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                print('验证页面已保存到 bilibili_captcha_page.html')
+            # 按来源策略发送请求：临时性错误指数退避重试，验证码或连续失败时熔断
+            html_content = self.policy.call(self._fetch, url, keyword, page)
             
             # 解析响应内容
-            results = self._parse_response(response.text)
+            results = self._parse_response(html_content)
             
             return results
             
+        except CircuitOpenError as e:
+            print(e)
+            self.last_error = str(e)
+            return []
+        except CaptchaDetected as e:
+            print('Bilibili返回了验证码页面，本次搜索放弃')
+            self.last_error = str(e)
+            return []
         except requests.exceptions.RequestException as e:
             print(f'请求出错: {e}')
-            try:
-                with open('bilibili_error_page.html', 'w', encoding='utf-8') as f:
-                    f.write(str(e))
-                print('错误页面已保存到 bilibili_error_page.html')
-            except:
-                pass
+            self.last_error = f'请求出错: {e}'
+            if self.debug_capture:
+                self.debug_capture.capture('Bilibili', ERROR, str(e), url, keyword)
             return []
         except Exception as e:
             print(f'搜索过程出错: {e}')
+            self.last_error = f'搜索过程出错: {e}'
             import traceback
             traceback.print_exc()
             return []
     
+    def _video_key(self, href):
+        """
+        判断链接是否为视频链接（包含/video/或BV号），返回用于合并同一视频的键
+        
+        Returns:
+            BV号或去掉参数的链接，非视频链接返回None
+        """
+        if not href or len(href) <= 20 or ('/video/' not in href and 'BV' not in href.upper()):
+            return None
+        match = BV_PATTERN.search(href)
+        return match.group(0) if match else href.split('?')[0].rstrip('/')
+    
+    def _iter_video_cards(self, engine, doc):
+        """
+        按页面顺序逐个给出视频卡片：每个视频只对应一个卡片节点
+        
+        卡片取只包含一个视频的最外层卡片类节点，嵌套在其中的卡片类节点不再重复
+        计入；包含多个视频的卡片类节点视为列表容器，继续使用其中的卡片。页面没有
+        卡片类节点时，取同一视频所有链接的最近公共祖先。调用方取够结果后停止迭代，
+        剩余的卡片不会再被处理
+        
+        Returns:
+            (视频键, 卡片节点, 卡片内该视频的链接列表) 的生成器
+        """
+        candidates = engine.find_all(doc, VIDEO_CARD_QUERY) or engine.find_all(doc, VIDEO_CARD_LI_QUERY)
+        accepted = set()
+        seen_videos = set()
+        for card in candidates:
+            # 已采用卡片内部的卡片类节点不再处理
+            node = engine.parent(card)
+            while node is not None and engine.node_key(node) not in accepted:
+                node = engine.parent(node)
+            if node is not None:
+                continue
+            
+            links = {}
+            for a in engine.find_all(card, LINK_QUERY):
+                video = self._video_key(engine.attr(a, 'href'))
+                if video is not None:
+                    links.setdefault(video, []).append(a)
+            if len(links) != 1:
+                continue
+            video, video_links = links.popitem()
+            accepted.add(engine.node_key(card))
+            if video not in seen_videos:
+                seen_videos.add(video)
+                yield video, card, video_links
+        if accepted:
+            return
+        
+        # 没有卡片类节点：按视频归并链接，取其最近公共祖先（只有一个链接时为其父节点）
+        print('未找到视频卡片，尝试使用链接查找方法')
+        video_links = {}
+        for a in engine.find_all(doc, LINK_QUERY):
+            video = self._video_key(engine.attr(a, 'href'))
+            if video is not None:
+                video_links.setdefault(video, []).append(a)
+        for video, links in video_links.items():
+            ancestors = []
+            node = engine.parent(links[0])
+            while node is not None:
+                ancestors.append(node)
+                node = engine.parent(node)
+            depth = 0
+            for link in links[1:]:
+                link_ancestors = set()
+                node = engine.parent(link)
+                while node is not None:
+                    link_ancestors.add(engine.node_key(node))
+                    node = engine.parent(node)
+                while depth < len(ancestors) - 1 and engine.node_key(ancestors[depth]) not in link_ancestors:
+                    depth += 1
+            if ancestors:
+                yield video, ancestors[depth], links
+    
+    def _extract_card(self, engine, card, links):
+        """
+        遍历一次卡片的后代节点，提取标题、链接、UP主、播放数据和简介
+        
+        Args:
+            engine: 解析引擎
+            card: 卡片节点
+            links: 卡片内该视频的链接列表
+            
+        Returns:
+            SearchResult，没有有效标题时返回None
+        """
+        tag_of = engine.tag
+        attr_of = engine.attr
+        title_elem = author_elem = desc_elem = None
+        headings = []
+        stats = []
+        blocks = []
+        for node in engine.descendants(card):
+            tag = tag_of(node)
+            if tag in HEADING_TAGS:
+                headings.append(node)
+            elif tag not in FIELD_TAGS:
+                continue
+            classes = attr_of(node, 'class') or ''
+            if tag in BLOCK_TAGS:
+                blocks.append(node)
+            if not classes:
+                continue
+            if title_elem is None and tag in TITLE_TAGS and TITLE_CLASS_PATTERN.search(classes):
+                title_elem = node
+            if tag == 'span' or tag == 'div':
+                if STATS_CLASS_PATTERN.search(classes):
+                    stats.append(node)
+                if author_elem is None and AUTHOR_CLASS_PATTERN.search(classes):
+                    author_elem = node
+            if desc_elem is None and (tag == 'p' or tag == 'div') and DESC_CLASS_PATTERN.search(classes):
+                desc_elem = node
+        
+        card_key = engine.node_key(card)
+        
+        def ancestors_in_card(node):
+            node = engine.parent(node)
+            while node is not None and engine.node_key(node) != card_key:
+                yield node
+                node = engine.parent(node)
+        
+        # 没有标题类元素时：优先取包含标题标签的视频链接，否则取第一个文本足够长的视频链接
+        if title_elem is None and headings:
+            link_keys = {engine.node_key(link) for link in links}
+            for heading in headings:
+                title_elem = next((node for node in ancestors_in_card(heading)
+                                   if engine.node_key(node) in link_keys), None)
+                if title_elem is not None:
+                    break
+        if title_elem is None:
+            title_elem = next((link for link in links if len(engine.text(link)) > 5), None)
+        if title_elem is None:
+            return None
+        
+        result = SearchResult(title=engine.text(title_elem))
+        if len(result.title) <= 5:
+            return None
+        href = attr_of(title_elem, 'href')
+        if href:
+            if not href.startswith('http'):
+                href = 'https:' + href if href.startswith('//') else 'https://www.bilibili.com' + href
+            result.url = href
+        
+        # 播放量、弹幕数等：嵌套匹配时只取最内层的元素，避免同一数据重复出现
+        if stats:
+            stat_keys = {engine.node_key(stat) for stat in stats}
+            outer_keys = set()
+            for stat in stats:
+                for node in ancestors_in_card(stat):
+                    if engine.node_key(node) in stat_keys:
+                        outer_keys.add(engine.node_key(node))
+            stats_text = ' '.join(text for text in (engine.text(stat) for stat in stats
+                                                    if engine.node_key(stat) not in outer_keys) if text)
+            if stats_text:
+                result.stats = stats_text
+        
+        if author_elem is not None:
+            result.author = engine.text(author_elem)
+        
+        if desc_elem is not None:
+            result.summary = engine.text(desc_elem)
+        else:
+            # 没有简介元素时取第一个长度合适的文本块，跳过包含标题的外层元素；
+            # 后代的文本是祖先文本的一部分，祖先文本过短时其后代不必再计算
+            skipped = {engine.node_key(node) for node in ancestors_in_card(title_elem)}
+            short_blocks = set()
+            for block in blocks:
+                block_key = engine.node_key(block)
+                if block_key in skipped:
+                    continue
+                if short_blocks and any(engine.node_key(node) in short_blocks for node in ancestors_in_card(block)):
+                    continue
+                text = engine.text(block)
+                if 20 < len(text) < 200:
+                    result.summary = text
+                    break
+                if len(text) <= 20:
+                    short_blocks.add(block_key)
+        return result
+    
+    def _extract_results(self, engine, doc):
+        """
+        逐个视频卡片单次遍历提取字段，达到结果上限即停止
+        
+        Returns:
+            结果列表
+        """
+        results = []
+        for video, card, links in self._iter_video_cards(engine, doc):
+            try:
+                result = self._extract_card(engine, card, links)
+            except Exception as e:
+                print(f'解析单个视频项出错: {e}')
+                continue
+            if result:
+                results.append(result)
+                print(f'添加结果: {result.title}')
+                # 最多返回10个结果
+                if len(results) >= MAX_RESULTS:
+                    break
+        return results
+    
     def _parse_response(self, html_content):
         """
         解析HTML响应内容，提取搜索结果
         
+        先只为结果区域的视频卡片建树并提取；没有结果时再解析整个页面，
+        仍然没有结果时才提取页面中的文本内容
+        
         Args:
             html_content: HTML内容
             
@@ -158,135 +654,59 @@ class BilibiliSpider:
         results = []
         
         try:
-            # 保存完整的HTML以便调试
-            with open('bilibili_debug_page.html', 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            print('调试页面已保存到 bilibili_debug_page.html')
-            
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
             # 检查页面是否包含搜索结果的特征
             if 'search-list' in html_content or 'video-list' in html_content:
                 print('检测到搜索结果页面特征')
             else:
                 print('未检测到搜索结果页面特征，可能被反爬')
             
-            # 尝试提取视频搜索结果
-            # 查找视频卡片元素
-            video_items = []
-            
-            # 尝试多种可能的选择器
-            selectors = [
-                '.video-list-item',  # 常见的视频列表项类名
-                '.video-card',      # 视频卡片类名
-                '.search-item',     # 搜索项类名
-                '.list-item',       # 列表项类名
-                'li[data-id]'       # 可能带有数据ID的列表项
-            ]
-            
-            for selector in selectors:
-                items = soup.select(selector)
-                if items:
-                    video_items.extend(items)
-                    print(f'通过选择器 {selector} 找到 {len(items)} 个视频项')
-            
-            # 如果直接选择器没有找到，尝试查找包含href的链接
-            if not video_items:
-                print('尝试使用链接查找方法')
-                all_a_tags = soup.find_all('a', href=True)
-                # 过滤出可能的视频链接（通常包含/video/或BV号）
-                video_links = []
-                for a in all_a_tags:
-                    href = a['href']
-                    if ('/video/' in href or 'BV' in href.upper()) and len(href) > 20:
-                        parent = a.find_parent()
-                        if parent and parent not in video_links:
-                            video_links.append(parent)
-                video_items = video_links
-                print(f'找到 {len(video_items)} 个可能的视频链接')
-            
-            # 解析找到的视频项
-            for item in video_items:
+            # 使用配置的解析引擎，先只解析结果区域
+            engine = self.parse_engine
+            doc = engine.parse_region(html_content, RESULTS_REGION)
+            if doc is None:
+                print('未找到结果区域，解析整个页面')
+            else:
                 try:
-                    result = {}
-                    
-                    # 提取标题
-                    title_elem = item.find(['h3', 'h2', 'a'], class_=lambda x: x and ('title' in x or 'name' in x))
-                    if not title_elem:
-                        # 尝试查找所有可能包含标题的a标签
-                        a_tags = item.find_all('a', href=True)
-                        for a in a_tags:
-                            if len(a.get_text(strip=True)) > 5 and ('/video/' in a['href'] or 'BV' in a['href'].upper()):
-                                title_elem = a
-                                break
-                    
-                    if title_elem:
-                        result['title'] = title_elem.get_text(strip=True)
-                        # 获取链接
-                        if title_elem.get('href'):
-                            href = title_elem['href']
-                            if not href.startswith('http'):
-                                href = 'https:' + href if href.startswith('//') else 'https://www.bilibili.com' + href
-                            result['url'] = href
-                    
-                    # 提取播放量、弹幕数等信息
-                    stats = item.find_all(['span', 'div'], class_=lambda x: x and ('play' in x or 'view' in x or 'danmaku' in x or 'stat' in x))
-                    stats_text = ' '.join([s.get_text(strip=True) for s in stats])
-                    if stats_text:
-                        result['stats'] = stats_text
-                    
-                    # 提取UP主信息
-                    up_elem = item.find(['span', 'div'], class_=lambda x: x and ('up' in x or 'author' in x))
-                    if up_elem:
-                        result['author'] = up_elem.get_text(strip=True)
-                    
-                    # 提取视频简介
-                    desc_elem = item.find(['p', 'div'], class_=lambda x: x and ('desc' in x or 'description' in x or 'intro' in x))
-                    if desc_elem:
-                        result['summary'] = desc_elem.get_text(strip=True)
-                    
-                    # 如果没有简介，尝试从其他文本元素提取
-                    if 'summary' not in result:
-                        text_elems = item.find_all(['p', 'div', 'span'])
-                        for elem in text_elems:
-                            text = elem.get_text(strip=True)
-                            if len(text) > 20 and len(text) < 200 and 'summary' not in result:
-                                result['summary'] = text
-                    
-                    # 只添加有效结果
-                    if 'title' in result and len(result['title']) > 5:
-                        results.append(result)
-                        print(f'添加结果: {result["title"]}')
-                        # 最多返回10个结果
-                        if len(results) >= 10:
-                            break
-                except Exception as e:
-                    print(f'解析单个视频项出错: {e}')
-            
-            # 如果仍然没有找到结果，尝试提取页面中的文本内容
+                    results = self._extract_results(engine, doc)
+                finally:
+                    # 显式释放文档树
+                    engine.release(doc)
+                    del doc
+                if not results:
+                    print('结果区域没有解析到结果，解析整个页面')
+            
             if not results:
-                print('尝试提取页面中的文本内容...')
-                # 提取所有段落和div文本
-                all_texts = []
-                for tag in soup.find_all(['p', 'div', 'span']):
-                    text = tag.get_text(strip=True)
-                    if len(text) > 50 and len(text) < 500:
-                        all_texts.append(text)
-                
-                # 添加前3个较长的文本片段
-                for i, text in enumerate(all_texts[:3]):
-                    results.append({
-                        'type': 'text',
-                        'content': text[:200] + '...'
-                    })
+                doc = engine.parse(html_content)
+                try:
+                    results = self._extract_results(engine, doc)
+                    
+                    # 如果仍然没有找到结果，尝试提取页面中的文本内容
+                    if not results:
+                        print('尝试提取页面中的文本内容...')
+                        # 取前3个较长的段落和div文本
+                        for tag in engine.iter_find(doc, TEXT_BLOCK_QUERY):
+                            text = engine.text(tag)
+                            if len(text) > 50 and len(text) < 500:
+                                results.append(SearchResult(type='text', content=text[:200] + '...'))
+                                if len(results) >= 3:
+                                    break
+                finally:
+                    engine.release(doc)
+                    del doc
             
             print(f'最终解析到 {len(results)} 条有效结果')
             
+            # 调试页面交给后台线程保存：没有搜索结果的页面总是保存，其余按比例抽样
+            if self.debug_capture:
+                has_results = any(result.title is not None for result in results)
+                self.debug_capture.capture('Bilibili', SAMPLE if has_results else EMPTY, html_content)
+            
         except Exception as e:
             print(f'解析HTML出错: {e}')
             import traceback
             traceback.print_exc()
+            if self.debug_capture:
+                self.debug_capture.capture('Bilibili', ERROR, html_content)
         
         return results
     
@@ -308,18 +728,18 @@ class BilibiliSpider:
                 
                 for i, result in enumerate(results, 1):
                     f.write(f'结果 {i}:\n')
-                    if 'title' in result:
-                        f.write(f'标题: {result["title"]}\n')
-                    if 'url' in result:
-                        f.write(f'链接: {result["url"]}\n')
-                    if 'summary' in result:
-                        f.write(f'摘要: {result["summary"]}\n')
-                    if 'author' in result:
-                        f.write(f'UP主: {result["author"]}\n')
-                    if 'stats' in result:
-                        f.write(f'数据: {result["stats"]}\n')
-                    if 'type' in result and result['type'] == 'text':
-                        f.write(f'内容: {result["content"]}\n')
+                    if result.title is not None:
+                        f.write(f'标题: {result.title}\n')
+                    if result.url is not None:
+                        f.write(f'链接: {result.url}\n')
+                    if result.summary is not None:
+                        f.write(f'摘要: {result.summary}\n')
+                    if result.author is not None:
+                        f.write(f'UP主: {result.author}\n')
+                    if result.stats is not None:
+                        f.write(f'数据: {result.stats}\n')
+                    if result.type == 'text':
+                        f.write(f'内容: {result.content}\n')
                     f.write('-' * 80 + '\n\n')
             
             print(f'结果已保存到: {filename}')
@@ -367,10 +787,6 @@ def main():
         for page in range(1, page_count + 1):
             results = spider.search(keyword, page)
             all_results.extend(results)
-            
-            # 如果不是最后一页，添加延迟
-            if page < page_count:
-                time.sleep(random.uniform(2, 5))
         
         # 显示结果
         print(f'\n共找到 {len(all_results)} 条结果\n')
@@ -380,16 +796,16 @@ def main():
             print("前几条结果预览:")
             for i, result in enumerate(all_results[:5], 1):
                 print(f'\n结果 {i}:')
-                if 'title' in result:
-                    print(f'标题: {result["title"]}')
-                if 'url' in result:
-                    print(f'链接: {result["url"]}')
-                if 'summary' in result:
-                    print(f'摘要: {result["summary"]}')
-                if 'author' in result:
-                    print(f'UP主: {result["author"]}')
-                if 'stats' in result:
-                    print(f'数据: {result["stats"]}')
+                if result.title is not None:
+                    print(f'标题: {result.title}')
+                if result.url is not None:
+                    print(f'链接: {result.url}')
+                if result.summary is not None:
+                    print(f'摘要: {result.summary}')
+                if result.author is not None:
+                    print(f'UP主: {result.author}')
+                if result.stats is not None:
+                    print(f'数据: {result.stats}')
             
             # 自动保存结果
             print("\n正在保存结果到文件...")
@@ -427,10 +843,6 @@ def main():
         for page in range(1, page_count + 1):
             results = spider.search(keyword, page)
             all_results.extend(results)
-            
-            # 如果不是最后一页，添加延迟
-            if page < page_count:
-                time.sleep(random.uniform(2, 5))
         
         # 显示结果
         print(f'\n共找到 {len(all_results)} 条结果\n')
@@ -440,16 +852,16 @@ def main():
             print("前几条结果预览:")
             for i, result in enumerate(all_results[:5], 1):
                 print(f'\n结果 {i}:')
-                if 'title' in result:
-                    print(f'标题: {result["title"]}')
-                if 'url' in result:
-                    print(f'链接: {result["url"]}')
-                if 'summary' in result:
-                    print(f'摘要: {result["summary"]}')
-                if 'author' in result:
-                    print(f'UP主: {result["author"]}')
-                if 'stats' in result:
-                    print(f'数据: {result["stats"]}')
+                if result.title is not None:
+                    print(f'标题: {result.title}')
+                if result.url is not None:
+                    print(f'链接: {result.url}')
+                if result.summary is not None:
+                    print(f'摘要: {result.summary}')
+                if result.author is not None:
+                    print(f'UP主: {result.author}')
+                if result.stats is not None:
+                    print(f'数据: {result.stats}')
             
             # 保存结果
             save_choice = input("\n是否保存所有结果到文件？(y/n): ")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调试页面采集
+功能：把爬虫抓取到的页面交给后台写入线程保存，不阻塞请求；正常页面按比例抽样，
+验证码、零结果和出错的页面总是保存；每个页面单独压缩成一个文件，目录中只保留
+最近的若干个文件（磁盘上的环形缓冲）；生产环境（APP_ENV=production）下完全关闭
+"""
+
+import os
+import re
+import gzip
+import time
+import queue
+import random
+import itertools
+import threading
+from collections import deque
+
+# 采集原因：抽样的正常页面，以及总是保存的异常页面
+SAMPLE = 'sample'
+CAPTCHA = 'captcha'
+EMPTY = 'empty'
+ERROR = 'error'
+ANOMALIES = frozenset((CAPTCHA, EMPTY, ERROR))
+
+# 文件名中不允许出现的字符
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def is_production():
+    """
+    当前是否运行在生产环境
+    """
+    return os.environ.get('APP_ENV', '').lower() == 'production'
+
+
+class DebugCapture:
+    """
+    后台写入、抽样并按文件数轮转的调试页面目录
+    """
+
+    def __init__(self, root, sample_rate=0.05, max_files=200, queue_size=64):
+        """
+        Args:
+            root: 保存目录
+            sample_rate: 正常页面的抽样比例（0~1），异常页面不受影响
+            max_files: 目录中保留的文件数上限，超出时删除最早的文件
+            queue_size: 等待写入的页面数上限，写入跟不上时丢弃新页面而不是阻塞请求
+        """
+        self.root = root
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'evicted': 0, 'errors': 0}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._sequence = itertools.count(1)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        # 按文件名（以时间开头）排序的已有文件，从最早的开始淘汰
+        self._files = deque(sorted(name for name in os.listdir(root) if name.endswith('.html.gz')))
+
+    def capture(self, source, reason, content, url=None, keyword=None):
+        """
+        提交一个页面，立即返回
+
+        Args:
+            source: 来源名称
+            reason: 采集原因，SAMPLE 按抽样比例保存，ANOMALIES 中的原因总是保存
+            content: 页面HTML或错误信息文本
+            url: 请求URL
+            keyword: 搜索关键词
+
+        Returns:
+            是否已提交给写入线程
+        """
+        if reason not in ANOMALIES and random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((time.time(), next(self._sequence), source, reason, content, url, keyword))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['queued'] += 1
+        self._ensure_writer()
+        return True
+
+    def _ensure_writer(self):
+        """
+        首次提交页面时启动写入线程
+        """
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._writer_loop, name='debug-capture', daemon=True)
+                    self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(*item)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f'保存调试页面出错: {e}')
+            finally:
+                self._queue.task_done()
+
+    def _write(self, captured_at, sequence, source, reason, content, url, keyword):
+        """
+        压缩保存一个页面并淘汰超出上限的最早文件，只在写入线程中调用
+        """
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(captured_at))
+        # 文件名带上进程号和序号，多个进程共用目录时也不会互相覆盖
+        name = f'{stamp}-{os.getpid()}-{sequence:06d}-{_UNSAFE_CHARS.sub("_", source)}-{reason}.html.gz'
+        # 请求信息写在文件开头的注释中
+        header = f'<!-- source: {source} | reason: {reason} | url: {url or ""} | keyword: {keyword or ""} | ' \
+                 f'captured_at: {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(captured_at))} -->\n'
+        path = os.path.join(self.root, name)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress((header + content).encode('utf-8'), compresslevel=6))
+        os.replace(tmp_path, path)
+        self._files.append(name)
+        self.stats['written'] += 1
+
+        while len(self._files) > self.max_files:
+            oldest = self._files.popleft()
+            try:
+                os.remove(os.path.join(self.root, oldest))
+                self.stats['evicted'] += 1
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """
+        等待已提交的页面全部写入
+        """
+        if self._writer is not None:
+            self._queue.join()
+
+
+# 进程内共享的调试页面目录
+_debug_capture = None
+_debug_capture_lock = threading.Lock()
+# 默认保存目录：项目根目录下的debug_pages
+DEFAULT_CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'debug_pages')
+
+
+def configure(root=DEFAULT_CAPTURE_DIR, sample_rate=0.05, max_files=200):
+    """
+    配置进程内共享的调试页面采集
+
+    Args:
+        root: 保存目录，为None时关闭采集
+        sample_rate: 正常页面的抽样比例
+        max_files: 目录中保留的文件数上限
+
+    Returns:
+        DebugCapture实例，关闭采集时返回None
+    """
+    global _debug_capture
+    with _debug_capture_lock:
+        _debug_capture = DebugCapture(root, sample_rate, max_files) if root else False
+    return _debug_capture or None
+
+
+def get_debug_capture():
+    """
+    获取进程内共享的调试页面采集，未配置时使用默认设置创建（生产环境下关闭）；
+    采集关闭时返回None
+    """
+    global _debug_capture
+    if _debug_capture is None:
+        with _debug_capture_lock:
+            if _debug_capture is None:
+                _debug_capture = False if is_production() else DebugCapture(DEFAULT_CAPTURE_DIR)
+    return _debug_capture or None
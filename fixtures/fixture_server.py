@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地替身服务器
+功能：按请求路径返回录制好的页面/接口响应，让爬虫无需访问真实站点即可联调；
+用法：python fixtures/fixture_server.py [端口]，然后把爬虫的URL指向 http://127.0.0.1:端口
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 请求路径 -> (录制文件, Content-Type)
+ROUTES = {
+    '/': ('home.html', 'text/html; charset=utf-8'),
+    '/x/web-interface/search/type': ('bilibili_search_api.json', 'application/json; charset=utf-8'),
+    '/all': ('bilibili_search_page.html', 'text/html; charset=utf-8'),
+    '/s': ('baidu_serp.html', 'text/html; charset=utf-8'),
+}
+
+# 请求参数中的关键词（B站为keyword，百度为wd）取这些值时返回对应的录制文件，用于模拟被拦截等异常响应
+KEYWORD_OVERRIDES = {
+    ('/x/web-interface/search/type', 'blocked'): 'bilibili_search_api_blocked.json',
+    ('/s', 'blocked'): 'baidu_captcha.html',
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    按ROUTES返回录制文件，未登记的路径或录制文件缺失时返回404
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        route = ROUTES.get(parsed.path)
+        if route is None:
+            self._send(404, b'not found', 'text/plain; charset=utf-8')
+            return
+
+        filename, content_type = route
+        params = parse_qs(parsed.query)
+        keyword = (params.get('keyword') or params.get('wd') or [''])[0]
+        filename = KEYWORD_OVERRIDES.get((parsed.path, keyword), filename)
+        path = os.path.join(FIXTURES_DIR, filename)
+        if not os.path.exists(path):
+            self._send(404, f'fixture not found: {filename}'.encode('utf-8'), 'text/plain; charset=utf-8')
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self._send(200, body, content_type)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    替身服务器：客户端提前断开（例如流式读取到足够结果后关闭连接）属于正常情况，不打印错误
+    """
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start(port=0):
+    """
+    在后台线程中启动替身服务器
+
+    Args:
+        port: 监听端口，0表示随机分配
+
+    Returns:
+        (服务器实例, 基础URL)
+    """
+    server = FixtureServer(('127.0.0.1', port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = FixtureServer(('127.0.0.1', port), FixtureHandler)
+    print(f'替身服务器已启动: http://127.0.0.1:{port}')
+    server.serve_forever()
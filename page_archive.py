@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取页面归档
+功能：以内容哈希为地址，压缩保存爬虫抓取到的原始HTML，并在SQLite索引中
+追加记录URL、关键词、页码、状态码、抓取时间，以及页面是否因结果已足够而提前停止下载
+（截断）和实际读取的字节数；解析规则修复后可以直接在进程池中用最新的_parse_response
+重新解析归档页面，而无需重新抓取
+"""
+
+import os
+import gzip
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 来源名称 -> (爬虫模块名, 爬虫类名)，重新解析时在工作进程中按此加载
+SPIDER_CLASSES = {
+    '百度': ('baidu_spider', 'BaiduSpider'),
+    'Bilibili': ('bilibili_spider', 'BilibiliSpider')
+}
+
+
+def _get_codec():
+    """
+    选择压缩方式：安装了zstandard时使用zstd，否则使用gzip
+    """
+    try:
+        import zstandard
+        return 'zst'
+    except ImportError:
+        return 'gz'
+
+
+def compress(data, codec):
+    """
+    按指定方式压缩字节串
+    """
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    """
+    按指定方式解压字节串
+    """
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageArchive:
+    """
+    内容寻址的压缩页面归档，索引只追加不修改
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root: 归档根目录，页面保存在 objects/ 下，索引为 index.db
+        """
+        self.root = root
+        self.codec = _get_codec()
+        self._local = threading.local()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS pages ('
+                     'id INTEGER PRIMARY KEY AUTOINCREMENT, sha256 TEXT NOT NULL, codec TEXT NOT NULL, '
+                     'source TEXT NOT NULL, url TEXT, keyword TEXT, page INTEGER, status INTEGER, '
+                     'fetched_at REAL NOT NULL, truncated INTEGER NOT NULL DEFAULT 0, bytes_read INTEGER)')
+        # 旧版本创建的索引没有截断标记和读取字节数，补充这两列（旧记录视为完整页面）
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(pages)')}
+        if 'truncated' not in columns:
+            conn.execute('ALTER TABLE pages ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0')
+        if 'bytes_read' not in columns:
+            conn.execute('ALTER TABLE pages ADD COLUMN bytes_read INTEGER')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_pages_source ON pages (source, fetched_at)')
+
+    def _connection(self):
+        """
+        每个线程使用独立的数据库连接
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.root, 'index.db'), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _object_path(self, sha256, codec):
+        """
+        页面文件路径：按哈希前两位分目录
+        """
+        return os.path.join(self.root, 'objects', sha256[:2], f'{sha256}.html.{codec}')
+
+    def store(self, source, url, keyword, page, status, html_content, truncated=False, bytes_read=None):
+        """
+        归档一个抓取到的页面，相同内容只保存一份
+
+        Args:
+            source: 来源名称
+            url: 请求URL
+            keyword: 搜索关键词
+            page: 页码
+            status: HTTP状态码
+            html_content: 页面HTML文本
+            truncated: 是否因结果已足够而提前停止下载，此时归档的只是页面的前一部分
+            bytes_read: 实际读取的响应字节数
+
+        Returns:
+            页面内容的sha256，归档失败时返回None
+        """
+        try:
+            data = html_content.encode('utf-8')
+            sha256 = hashlib.sha256(data).hexdigest()
+            path = self._object_path(sha256, self.codec)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 先写临时文件再改名，避免并发写入产生不完整的文件
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compress(data, self.codec))
+                os.replace(tmp_path, path)
+            self._connection().execute(
+                'INSERT INTO pages (sha256, codec, source, url, keyword, page, status, fetched_at, '
+                'truncated, bytes_read) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (sha256, self.codec, source, url, keyword, page, status, time.time(), int(truncated), bytes_read))
+            return sha256
+        except Exception as e:
+            print(f'归档页面出错: {e}')
+            return None
+
+    def iter_entries(self, source=None, keyword=None):
+        """
+        遍历归档索引，同一来源下相同内容的页面只返回最新的一条
+
+        Args:
+            source: 可选，只返回该来源的页面
+            keyword: 可选，只返回该关键词的页面
+
+        Returns:
+            索引记录字典的生成器；truncated 为真的页面只包含提前停止下载前读到的部分
+        """
+        sql = ('SELECT * FROM pages WHERE id IN ('
+               'SELECT MAX(id) FROM pages WHERE 1 = 1')
+        params = []
+        if source:
+            sql += ' AND source = ?'
+            params.append(source)
+        if keyword:
+            sql += ' AND keyword = ?'
+            params.append(keyword)
+        sql += ' GROUP BY source, sha256) ORDER BY id'
+        for row in self._connection().execute(sql, params):
+            entry = dict(row)
+            entry['path'] = self._object_path(entry['sha256'], entry['codec'])
+            yield entry
+
+    def load(self, entry):
+        """
+        读取归档页面的HTML文本
+        """
+        return load_entry(entry)
+
+
+def load_entry(entry):
+    """
+    读取归档记录对应的HTML文本
+    """
+    with open(entry['path'], 'rb') as f:
+        return decompress(f.read(), entry['codec']).decode('utf-8')
+
+
+def _reparse_entry(entry):
+    """
+    在工作进程中用当前的_parse_response重新解析一个归档页面
+
+    Returns:
+        (归档记录, 解析结果列表)
+    """
+    import importlib
+    import debug_capture
+
+    # 重新解析的是已归档的页面，工作进程中不再归档，也不采集调试页面；
+    # 须在创建爬虫之前关闭，否则爬虫构造时会按默认配置创建归档和调试目录
+    configure(None)
+    debug_capture.configure(None)
+    module_name, class_name = SPIDER_CLASSES[entry['source']]
+    spider_class = getattr(importlib.import_module(module_name), class_name)
+    spider = spider_class()
+    try:
+        results = spider._parse_response(load_entry(entry))
+    except Exception as e:
+        print(f"重新解析 {entry['sha256']} 出错: {e}")
+        results = []
+    return entry, results
+
+
+def reparse(entries, workers=None):
+    """
+    在进程池中并行重新解析归档页面
+
+    Args:
+        entries: 归档记录可迭代对象
+        workers: 进程数，默认为CPU核数
+
+    Returns:
+        (归档记录, 解析结果列表) 的生成器，按输入顺序返回
+    """
+    entries = [entry for entry in entries if entry['source'] in SPIDER_CLASSES]
+    if not entries:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for entry, results in executor.map(_reparse_entry, entries, chunksize=4):
+            yield entry, results
+
+
+# 进程内共享的页面归档
+_page_archive = None
+_page_archive_lock = threading.Lock()
+# 默认归档目录：项目根目录下的archive
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+
+
+def configure(root=DEFAULT_ARCHIVE_DIR):
+    """
+    配置进程内共享的页面归档
+
+    Args:
+        root: 归档根目录，为None时关闭归档
+
+    Returns:
+        PageArchive实例，关闭归档时返回None
+    """
+    global _page_archive
+    with _page_archive_lock:
+        _page_archive = PageArchive(root) if root else False
+    return _page_archive or None
+
+
+def get_page_archive():
+    """
+    获取进程内共享的页面归档，未配置时使用默认目录创建；归档关闭时返回None
+    """
+    global _page_archive
+    if _page_archive is None:
+        with _page_archive_lock:
+            if _page_archive is None:
+                _page_archive = PageArchive(DEFAULT_ARCHIVE_DIR)
+    return _page_archive or None
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML解析引擎
+功能：为爬虫的_parse_response提供统一的节点查询接口，可按来源在
+bs4(html.parser)、lxml 和 selectolax 之间切换；查询条件在首次使用时
+编译为对应引擎的选择器（lxml为XPath，selectolax为CSS）并缓存，
+各引擎返回的文本与 BeautifulSoup 的 get_text(strip=True) 保持一致；
+还可以只为页面的结果区域建树（受限解析），跳过脚本、页面状态、导航和页脚
+"""
+
+import threading
+from collections import namedtuple
+
+# 可选的解析引擎名称
+HTML_PARSER = 'html.parser'
+LXML = 'lxml'
+SELECTOLAX = 'selectolax'
+# 默认引擎；lxml未安装时创建引擎会回退到html.parser
+DEFAULT_ENGINE = LXML
+
+# 这些标签内的文本不属于页面可见文本，BeautifulSoup的get_text同样会跳过
+INVISIBLE_TAGS = ('script', 'style', 'template')
+
+# 节点查询条件：
+#   tags           标签名元组，为空时匹配任意标签
+#   class_name     完整类名（与CSS的 .class 相同），可为元组，匹配其中任一类名
+#   class_contains 类名包含其中任一子串即可（与 class_=lambda x: x and '子串' in x 相同）
+#   attrs          必须存在的属性名元组
+Query = namedtuple('Query', ['tags', 'class_name', 'class_contains', 'attrs'], defaults=((), None, (), ()))
+
+
+def query(tags=(), class_name=None, class_contains=(), attrs=()):
+    """
+    构造节点查询条件，参数见Query
+
+    Raises:
+        ValueError: 同时指定了class_name和class_contains
+    """
+    if class_name and class_contains:
+        raise ValueError('class_name 和 class_contains 不能同时指定')
+    if isinstance(tags, str):
+        tags = (tags,)
+    if isinstance(class_name, list):
+        class_name = tuple(class_name)
+    return Query(tuple(tags), class_name, tuple(class_contains), tuple(attrs))
+
+
+# 页面的结果区域：
+#   start_markers  结果区域开头的标记，取最先出现的一个，所在的标签即为区域起点
+#   end_markers    结果区域之后的标记，取起点之后最先出现的一个，所在的标签之前即为区域终点
+#   containers     区域内的结果容器查询条件，支持时只为这些容器建树
+Region = namedtuple('Region', ['start_markers', 'end_markers', 'containers'])
+
+
+def region(start_markers, end_markers, containers):
+    """
+    构造结果区域，参数见Region
+    """
+    if isinstance(start_markers, str):
+        start_markers = (start_markers,)
+    if isinstance(end_markers, str):
+        end_markers = (end_markers,)
+    return Region(tuple(start_markers), tuple(end_markers), containers)
+
+
+def region_html(html_content, region):
+    """
+    截取结果区域的HTML片段，片段中未闭合的标签由解析器补全
+
+    Returns:
+        HTML片段，页面中没有起始标记时返回None
+    """
+    starts = [pos for pos in (html_content.find(marker) for marker in region.start_markers) if pos >= 0]
+    if not starts:
+        return None
+    start = max(html_content.rfind('<', 0, min(starts)), 0)
+    ends = [pos for pos in (html_content.find(marker, start) for marker in region.end_markers) if pos >= 0]
+    end = len(html_content)
+    if ends:
+        end = html_content.rfind('<', start, min(ends))
+        if end <= start:
+            end = min(ends)
+    return html_content[start:end]
+
+
+class _BaseEngine:
+    """
+    解析引擎基类：负责编译结果的缓存
+    """
+    name = None
+
+    def __init__(self):
+        self._compiled = {}
+        self._compile_lock = threading.Lock()
+
+    def compiled(self, q):
+        """
+        获取查询条件编译后的选择器
+        """
+        selector = self._compiled.get(q)
+        if selector is None:
+            with self._compile_lock:
+                selector = self._compiled.get(q)
+                if selector is None:
+                    selector = self._compiled[q] = self._compile(q)
+        return selector
+
+    def find(self, node, q):
+        """
+        查找第一个匹配的后代节点，没有时返回None
+        """
+        matches = self.find_all(node, q)
+        return matches[0] if matches else None
+
+    def iter_find(self, node, q):
+        """
+        按文档顺序逐个给出匹配的后代节点，调用方可以随时停止
+        """
+        return iter(self.find_all(node, q))
+
+    def parse_region(self, html_content, region):
+        """
+        受限解析：只解析结果区域的HTML片段
+
+        Returns:
+            文档对象，页面中没有结果区域时返回None
+        """
+        fragment = region_html(html_content, region)
+        return None if fragment is None else self.parse(fragment)
+
+    def node_key(self, node):
+        """
+        节点的身份标识，用于按节点去重（同一节点多次查询得到的包装对象标识相同）
+        """
+        return id(node)
+
+    def release(self, doc):
+        """
+        释放文档树占用的内存
+        """
+
+
+class Bs4Engine(_BaseEngine):
+    """
+    BeautifulSoup引擎，与原有解析方式完全一致
+    """
+    name = HTML_PARSER
+
+    def __init__(self, builder='html.parser'):
+        super().__init__()
+        from bs4 import Tag
+
+        self.builder = builder
+        self._tag_class = Tag
+
+    def parse(self, html_content):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html_content, self.builder)
+
+    def _compile(self, q):
+        """
+        编译为节点判断函数：直接遍历descendants判断比find_all的通用匹配快数倍，
+        匹配语义与find_all(name, class_=..., attrs={...: True})一致
+        """
+        tags = frozenset(q.tags) or None
+        class_names = None
+        if q.class_name:
+            class_names = frozenset(q.class_name if isinstance(q.class_name, tuple) else (q.class_name,))
+        substrings = q.class_contains
+        attrs = q.attrs
+
+        def matches(node):
+            if tags is not None and node.name not in tags:
+                return False
+            if class_names is not None or substrings:
+                classes = node.get('class')
+                if not classes:
+                    return False
+                if class_names is not None and class_names.isdisjoint(classes):
+                    return False
+                if substrings and not any(s in cls for cls in classes for s in substrings):
+                    return False
+            return all(node.get(attr) is not None for attr in attrs)
+        return matches
+
+    def find_all(self, node, q):
+        return list(self.iter_find(node, q))
+
+    def find(self, node, q):
+        return next(self.iter_find(node, q), None)
+
+    def iter_find(self, node, q):
+        matches = self.compiled(q)
+        return (child for child in self.descendants(node) if matches(child))
+
+    def parse_region(self, html_content, region):
+        """
+        在结果区域片段上再用SoupStrainer只为结果容器建树，容器之外的节点不会被创建
+        """
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        fragment = region_html(html_content, region)
+        if fragment is None:
+            return None
+        q = region.containers
+        class_names = None
+        if q.class_name:
+            class_names = frozenset(q.class_name if isinstance(q.class_name, tuple) else (q.class_name,))
+
+        def class_matches(value):
+            # 建树前class还是未拆分的原始字符串
+            if not value:
+                return False
+            if class_names is not None:
+                return not class_names.isdisjoint(value.split())
+            return any(s in value for s in q.class_contains)
+
+        attrs = {attr: True for attr in q.attrs}
+        if class_names is not None or q.class_contains:
+            attrs['class'] = class_matches
+        strainer = SoupStrainer(list(q.tags) or None, attrs=attrs)
+        return BeautifulSoup(fragment, self.builder, parse_only=strainer)
+
+    def descendants(self, node):
+        return (child for child in node.descendants if isinstance(child, self._tag_class))
+
+    def tag(self, node):
+        return node.name
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+    def attr(self, node, name):
+        value = node.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def parent(self, node):
+        return node.parent
+
+    def next_siblings(self, node):
+        return node.find_next_siblings()
+
+    def release(self, doc):
+        doc.decompose()
+
+
+class LxmlEngine(_BaseEngine):
+    """
+    lxml引擎：查询条件编译为XPath，由libxml2在C层完成匹配
+    """
+    name = LXML
+
+    def __init__(self):
+        super().__init__()
+        from lxml import etree
+
+        self._etree = etree
+        self._parser = etree.HTMLParser(encoding='utf-8', remove_comments=False)
+        # 与get_text一致：跳过script/style中的文本，注释本身不是文本节点
+        self._text_xpath = etree.XPath('descendant::text()[not(parent::script) and not(parent::style)]',
+                                       smart_strings=False)
+
+    def parse(self, html_content):
+        root = self._etree.fromstring(html_content.encode('utf-8'), self._parser)
+        if root is None:
+            root = self._etree.fromstring(b'<html></html>', self._parser)
+        elif '<template' in html_content:
+            # template的内容不属于页面文本，解析后直接移除，文本查询就不必再判断祖先节点
+            self._etree.strip_elements(root, 'template', with_tail=False)
+        return root
+
+    def _compile(self, q):
+        """
+        编译为 (XPath, 完整类名集合)：libxml2的字符串函数较慢，完整类名在XPath
+        预筛选出带class的节点后再按类名集合判断
+        """
+        if len(q.tags) == 1:
+            path = f'descendant::{q.tags[0]}'
+            predicates = []
+        else:
+            path = 'descendant::*'
+            predicates = [' or '.join(f'self::{tag}' for tag in q.tags)] if q.tags else []
+        class_names = None
+        if q.class_name:
+            class_names = frozenset(q.class_name if isinstance(q.class_name, tuple) else (q.class_name,))
+            predicates.append('@class')
+        elif q.class_contains:
+            predicates.append(' or '.join(f"contains(@class, '{s}')" for s in q.class_contains))
+        for attr in q.attrs:
+            predicates.append(f'@{attr}')
+        return self._etree.XPath(path + ''.join(f'[{p}]' for p in predicates)), class_names
+
+    def find_all(self, node, q):
+        xpath, class_names = self.compiled(q)
+        matches = xpath(node)
+        if class_names is None:
+            return matches
+        return [match for match in matches if not class_names.isdisjoint(match.get('class').split())]
+
+    def descendants(self, node):
+        # 跳过注释等非元素节点
+        return (child for child in node.iterdescendants() if isinstance(child.tag, str))
+
+    def tag(self, node):
+        return node.tag
+
+    def text(self, node):
+        if node.tag in INVISIBLE_TAGS:
+            return (node.text or '').strip()
+        return ''.join(s.strip() for s in self._text_xpath(node))
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def parent(self, node):
+        return node.getparent()
+
+    def node_key(self, node):
+        # lxml元素按身份比较和哈希，且节点存活期间多次获取得到的是同一个代理对象
+        return node
+
+    def next_siblings(self, node):
+        # 跳过注释等非元素节点
+        return [sibling for sibling in node.itersiblings() if isinstance(sibling.tag, str)]
+
+    def release(self, doc):
+        doc.clear()
+
+
+class SelectolaxEngine(_BaseEngine):
+    """
+    selectolax(lexbor)引擎：查询条件编译为CSS选择器组
+
+    解析后会移除script/style节点，因此它们不会作为兄弟节点出现
+    """
+    name = SELECTOLAX
+
+    def __init__(self):
+        super().__init__()
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser_class = LexborHTMLParser
+
+    def parse(self, html_content):
+        tree = self._parser_class(html_content)
+        # lexbor的text()会包含脚本内容，解析后一次性移除
+        tree.strip_tags(['script', 'style'])
+        return tree
+
+    def _compile(self, q):
+        attrs = ''.join(f'[{attr}]' for attr in q.attrs)
+        if q.class_name:
+            names = q.class_name if isinstance(q.class_name, tuple) else (q.class_name,)
+            classes = [f'.{name}' for name in names]
+        elif q.class_contains:
+            classes = [f'[class*="{s}"]' for s in q.class_contains]
+        else:
+            classes = ['']
+        return ', '.join(f'{tag}{cls}{attrs}' for tag in (q.tags or ('*',)) for cls in classes)
+
+    def find_all(self, node, q):
+        selector = self.compiled(q)
+        if not hasattr(node, 'mem_id'):
+            # 文档对象：从根节点开始查找
+            return node.css(selector)
+        # 节点的css()会包含节点自身，这里只保留后代
+        return [match for match in node.css(selector) if match.mem_id != node.mem_id]
+
+    def descendants(self, node):
+        nodes = node.traverse()
+        # traverse()的第一个节点是自身，并且会包含注释节点
+        next(nodes, None)
+        return (child for child in nodes if child.is_element_node)
+
+    def tag(self, node):
+        return node.tag
+
+    def text(self, node):
+        return node.text(strip=True)
+
+    def attr(self, node, name):
+        return node.attrs.get(name)
+
+    def parent(self, node):
+        return node.parent
+
+    def node_key(self, node):
+        return node.mem_id
+
+    def next_siblings(self, node):
+        siblings = []
+        sibling = node.next
+        while sibling is not None:
+            if sibling.is_element_node:
+                siblings.append(sibling)
+            sibling = sibling.next
+        return siblings
+
+
+# 引擎名称 -> 构造函数
+ENGINE_CLASSES = {
+    HTML_PARSER: Bs4Engine,
+    LXML: LxmlEngine,
+    SELECTOLAX: SelectolaxEngine
+}
+
+# 进程内共享的引擎实例（编译好的选择器随实例缓存）和按来源的引擎选择
+_engines = {}
+_engine_settings = {'default': DEFAULT_ENGINE, 'sources': {}}
+_engines_lock = threading.Lock()
+
+
+def _create_engine(name):
+    """
+    创建解析引擎；依赖库未安装时回退到html.parser
+    """
+    try:
+        return ENGINE_CLASSES[name]()
+    except ImportError as e:
+        print(f'解析引擎 {name} 不可用（{e}），回退到 {HTML_PARSER}')
+        return Bs4Engine()
+
+
+def configure(default=DEFAULT_ENGINE, sources=None):
+    """
+    配置解析引擎选择
+
+    Args:
+        default: 默认引擎名称
+        sources: 来源名称 -> 引擎名称，覆盖默认引擎
+
+    Raises:
+        ValueError: 引擎名称不受支持
+    """
+    sources = dict(sources or {})
+    for name in [default, *sources.values()]:
+        if name not in ENGINE_CLASSES:
+            raise ValueError(f'不支持的解析引擎: {name}，可选: {", ".join(ENGINE_CLASSES)}')
+    with _engines_lock:
+        _engine_settings['default'] = default
+        _engine_settings['sources'] = sources
+
+
+def get_engine(source=None):
+    """
+    获取来源配置的解析引擎
+    """
+    with _engines_lock:
+        name = _engine_settings['sources'].get(source, _engine_settings['default'])
+        if name not in _engines:
+            _engines[name] = _create_engine(name)
+        return _engines[name]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按主机划分的令牌桶限速器
+功能：替代爬虫中固定的随机延迟。同一进程内所有线程共享令牌桶，
+可选使用SQLite文件作为后端，让多个工作进程遵守同一份请求预算；
+只有在令牌耗尽时请求才需要等待
+"""
+
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+import urllib.parse
+
+# 默认每个主机平均每3秒一个请求，允许连续突发2个请求
+DEFAULT_RATE = 1 / 3
+DEFAULT_BURST = 2
+# 需要等待时额外叠加的随机抖动上限（秒），避免请求节奏过于规律
+DEFAULT_JITTER = 0.5
+
+
+class MemoryBucketBackend:
+    """
+    进程内令牌桶存储
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host, rate, burst, now):
+        """
+        预定一个令牌
+
+        Returns:
+            需要等待的秒数，令牌充足时为0
+        """
+        with self._lock:
+            tokens, updated_at = self._buckets.get(host, (burst, now))
+            tokens, wait = _take_token(tokens, updated_at, rate, burst, now)
+            self._buckets[host] = (tokens, now)
+            return wait
+
+
+class SQLiteBucketBackend:
+    """
+    基于SQLite文件的令牌桶存储，多个进程共享同一份预算
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_buckets ('
+                     'host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)')
+
+    def _connection(self):
+        """
+        每个线程使用独立的数据库连接
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, host, rate, burst, now):
+        """
+        在写事务中预定一个令牌
+
+        Returns:
+            需要等待的秒数，令牌充足时为0
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE host = ?', (host,)).fetchone()
+            tokens, updated_at = row if row else (burst, now)
+            tokens, wait = _take_token(tokens, updated_at, rate, burst, now)
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (host, tokens, updated_at) VALUES (?, ?, ?)',
+                         (host, tokens, now))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def _take_token(tokens, updated_at, rate, burst, now):
+    """
+    按经过的时间补充令牌并取走一个；令牌不足时记为欠额，返回需等待的时间
+
+    Returns:
+        (剩余令牌数, 需要等待的秒数)
+    """
+    tokens = min(burst, tokens + max(0, now - updated_at) * rate)
+    tokens -= 1
+    wait = 0 if tokens >= 0 else -tokens / rate
+    return tokens, wait
+
+
+class RateLimiter:
+    """
+    按主机限速的令牌桶调度器
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, jitter=DEFAULT_JITTER,
+                 host_limits=None, backend=None):
+        """
+        Args:
+            rate: 默认每秒补充的令牌数
+            burst: 默认令牌桶容量，即空闲后允许的连续请求数
+            jitter: 需要等待时叠加的随机抖动上限（秒）
+            host_limits: 可选字典，主机名 -> (rate, burst)，覆盖默认值
+            backend: 令牌存储后端，默认为进程内存储
+        """
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.host_limits = host_limits or {}
+        self.backend = backend or MemoryBucketBackend()
+
+    def reserve(self, url_or_host):
+        """
+        预定一个请求名额，不阻塞
+
+        Args:
+            url_or_host: 请求URL或主机名
+
+        Returns:
+            调用方在发出请求前需要等待的秒数
+        """
+        host = url_or_host
+        if '://' in url_or_host:
+            host = urllib.parse.urlparse(url_or_host).hostname
+        rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+        wait = self.backend.reserve(host, rate, burst, time.time())
+        if wait > 0 and self.jitter:
+            wait += random.uniform(0, self.jitter)
+        return wait
+
+    def acquire(self, url_or_host):
+        """
+        阻塞直到可以向该主机发出请求
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self.reserve(url_or_host)
+        if wait > 0:
+            print(f'请求预算已用完，等待 {wait:.1f} 秒')
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url_or_host):
+        """
+        acquire的异步版本，等待期间不占用线程
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self.reserve(url_or_host)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# 进程内共享的限速器
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def configure(rate=DEFAULT_RATE, burst=DEFAULT_BURST, jitter=DEFAULT_JITTER, host_limits=None, db_path=None):
+    """
+    配置进程内共享的限速器，已创建的限速器会被就地更新，持有其引用的爬虫无需重建
+
+    Args:
+        rate: 默认每秒补充的令牌数
+        burst: 默认令牌桶容量
+        jitter: 随机抖动上限（秒）
+        host_limits: 可选字典，主机名 -> (rate, burst)
+        db_path: 可选SQLite文件路径，设置后多个进程共享请求预算
+
+    Returns:
+        共享的RateLimiter实例
+    """
+    limiter = get_rate_limiter()
+    with _rate_limiter_lock:
+        limiter.rate = rate
+        limiter.burst = burst
+        limiter.jitter = jitter
+        limiter.host_limits = host_limits or {}
+        limiter.backend = SQLiteBucketBackend(db_path) if db_path else MemoryBucketBackend()
+    return limiter
+
+
+def get_rate_limiter():
+    """
+    获取进程内共享的限速器，未配置时使用默认参数创建
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索结果记录
+功能：爬虫、搜索接口和数据库写入共用的结果类型。SearchResult 使用 __slots__，
+每条结果只占固定的几个槽位，不再为每个阶段重建字典；ResultBatch 按列保存一批结果，
+供批量写入RawData使用；url_fingerprint 为去重用的规范化URL指纹
+"""
+
+import hashlib
+from dataclasses import dataclass, fields
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode, quote, unquote
+
+# 写入RawData的列
+RAW_DATA_COLUMNS = ('keyword', 'title', 'url', 'summary', 'content', 'source', 'url_fingerprint')
+
+# 不影响页面内容的跟踪参数，规范化URL时去掉
+TRACKING_PARAMS = frozenset((
+    'spm', 'spm_id_from', 'from_spmid', 'vd_source', 'share_source', 'share_medium', 'share_plat',
+    'share_session_id', 'share_tag', 'share_from', 'unique_k', 'bbid', 'ts', 'seid', 'eqid',
+    'fbclid', 'gclid', 'msclkid'
+))
+TRACKING_PARAM_PREFIXES = ('utm_', 'rsv_')
+# 规范化路径时保留不转义的字符
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+
+
+def canonical_url(url):
+    """
+    规范化URL，用于判断两个链接是否指向同一页面：
+
+    - 忽略协议（http/https）、主机名大小写、默认端口、片段和路径末尾的斜杠
+    - 去掉跟踪参数，其余查询参数按名称排序
+    - 百度跳转链接 /link?url= 的目标为明文URL时解析为目标URL；目标被编码为每次搜索都会
+      变化的令牌时无法判断指向的页面，视为不可用
+
+    Returns:
+        规范化后的 主机+路径+查询 字符串，不是http(s)链接或为不透明的百度跳转链接时返回None
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if port and port not in (80, 443):
+        host = f'{host}:{port}'
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    if parts.path == '/link' and (host == 'baidu.com' or host.endswith('.baidu.com')):
+        target = dict(params).get('url', '')
+        if target.startswith(('http://', 'https://')):
+            return canonical_url(target)
+        return None
+    params = sorted((name, value) for name, value in params
+                    if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PARAM_PREFIXES))
+
+    path = quote(unquote(parts.path), safe=PATH_SAFE_CHARS) or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    query = urlencode(params)
+    return f'{host}{path}?{query}' if query else f'{host}{path}'
+
+
+def is_opaque_redirect(url):
+    """
+    是否为目标被编码为令牌的百度跳转链接（/link?url=），同一页面每次搜索得到的链接都不同
+    """
+    if not url:
+        return False
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return False
+    host = (parts.hostname or '').lower()
+    return (parts.path == '/link' and (host == 'baidu.com' or host.endswith('.baidu.com'))
+            and not dict(parse_qsl(parts.query)).get('url', '').startswith(('http://', 'https://')))
+
+
+def url_fingerprint(url, source, title=None):
+    """
+    去重用的URL指纹：来源 + 规范化URL 的哈希；没有可用的URL时退回按标题和原始链接区分，
+    不透明的百度跳转链接每次搜索都不同，只按标题区分
+
+    Returns:
+        32位十六进制字符串
+    """
+    canonical = canonical_url(url)
+    if canonical is None:
+        canonical = f'{title or ""}\x1f{"" if is_opaque_redirect(url) else url or ""}'
+    return hashlib.blake2b(f'{source or ""}\x1f{canonical}'.encode('utf-8'), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True)
+class SearchResult:
+    """
+    一条搜索结果；未提供的字段为None，转换为字典时省略，与原有结果字典的键保持一致
+
+    普通结果至少包含title，页面无法按结构解析时的文本块为 type='text' 且只有content
+    """
+    title: Optional[str] = None
+    url: Optional[str] = None
+    summary: Optional[str] = None
+    source: Optional[str] = None
+    author: Optional[str] = None
+    stats: Optional[str] = None
+    play: Optional[int] = None
+    danmaku: Optional[int] = None
+    duration: Optional[str] = None
+    type: Optional[str] = None
+    content: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        由结果字典（如接口提交的JSON、缓存中的数据）创建结果，忽略未知的键
+
+        Args:
+            data: 结果字典，已经是SearchResult时原样返回
+
+        Returns:
+            SearchResult实例
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(**{name: data[name] for name in FIELD_NAMES if data.get(name) is not None})
+
+    @property
+    def is_text_block(self):
+        """
+        是否为无法按结构解析时提取的文本块
+        """
+        return self.type == 'text'
+
+    def to_dict(self):
+        """
+        转换为可直接JSON序列化的字典，省略值为None的字段
+        """
+        result = {}
+        for name in FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+    def to_raw_data_kwargs(self, keyword, source=None):
+        """
+        转换为创建RawData所需的字段
+
+        Args:
+            keyword: 搜索关键词
+            source: 来源名称，为None时使用结果自身的来源
+
+        Returns:
+            字段字典，缺失的文本字段为空字符串，content缺失时使用摘要
+        """
+        summary = self.summary or ''
+        title = self.title or ''
+        url = self.url or ''
+        source = source or self.source or '未知'
+        return {
+            'keyword': keyword,
+            'title': title,
+            'url': url,
+            'summary': summary,
+            'content': self.content or summary,
+            'source': source,
+            'url_fingerprint': url_fingerprint(url, source, title)
+        }
+
+
+FIELD_NAMES = tuple(field.name for field in fields(SearchResult))
+
+
+def to_dicts(results):
+    """
+    将结果列表转换为可JSON序列化的字典列表
+    """
+    return [result.to_dict() for result in results]
+
+
+def from_dicts(items):
+    """
+    将结果字典列表转换为SearchResult列表
+    """
+    return [SearchResult.from_dict(item) for item in items]
+
+
+class ResultBatch:
+    """
+    按列保存的一批待写入RawData的结果：每列一个列表，同一批次共用关键词；
+    标题或URL为空的结果以及批次内URL指纹重复的结果不会加入
+    """
+
+    __slots__ = ('keyword', 'titles', 'urls', 'summaries', 'contents', 'sources', 'fingerprints', '_keys')
+
+    def __init__(self, keyword, results=(), source=None):
+        """
+        Args:
+            keyword: 搜索关键词
+            results: 初始结果，SearchResult或结果字典
+            source: 这些结果的来源名称，为None时使用结果自身的来源
+        """
+        self.keyword = keyword
+        self.titles = []
+        self.urls = []
+        self.summaries = []
+        self.contents = []
+        self.sources = []
+        self.fingerprints = []
+        self._keys = set()
+        self.extend(results, source)
+
+    def append(self, result, source=None):
+        """
+        加入一条结果
+
+        Returns:
+            是否已加入
+        """
+        result = SearchResult.from_dict(result)
+        title = (result.title or '').strip()
+        url = result.url or ''
+        if not title or not url:
+            return False
+        source = source or result.source or '未知'
+        fingerprint = url_fingerprint(url, source, title)
+        if fingerprint in self._keys:
+            return False
+        self._keys.add(fingerprint)
+        summary = result.summary or ''
+        self.titles.append(title)
+        self.urls.append(url)
+        self.summaries.append(summary)
+        self.contents.append(result.content or summary)
+        self.sources.append(source)
+        self.fingerprints.append(fingerprint)
+        return True
+
+    def extend(self, results, source=None):
+        """
+        加入多条结果
+
+        Returns:
+            实际加入的数量
+        """
+        return sum(self.append(result, source) for result in results)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def rows(self, exclude=()):
+        """
+        生成批量插入RawData所用的行字典
+
+        Args:
+            exclude: 需要跳过的URL指纹集合，例如数据库中已存在的记录
+
+        Returns:
+            行字典列表
+        """
+        keyword = self.keyword
+        return [
+            dict(zip(RAW_DATA_COLUMNS, (keyword, title, url, summary, content, source, fingerprint)))
+            for title, url, summary, content, source, fingerprint
+            in zip(self.titles, self.urls, self.summaries, self.contents, self.sources, self.fingerprints)
+            if fingerprint not in exclude
+        ]
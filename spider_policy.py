@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫来源策略：有限次重试、指数退避和熔断器
+功能：对临时性错误按指数退避加随机抖动重试；检测到验证码或连续失败时熔断，
+熔断期间直接快速失败，冷却后以半开状态放行少量探测请求
+"""
+
+import time
+import random
+import asyncio
+import threading
+
+import requests
+
+# 熔断器状态
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CaptchaDetected(Exception):
+    """
+    响应为验证码/安全验证页面，来源正在封锁我们
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    来源处于熔断状态，请求未发出
+    """
+
+
+def is_transient_error(error):
+    """
+    判断错误是否为值得重试的临时性错误：连接错误、超时、429和5xx
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          asyncio.TimeoutError)):
+        return True
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        # aiohttp.ClientResponseError 使用 status 属性
+        status = getattr(error, 'status', None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+class CircuitBreaker:
+    """
+    单个来源的熔断器
+    """
+
+    def __init__(self, failure_threshold=3, recovery_timeout=300, half_open_max_calls=1):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断后多少秒进入半开状态
+            half_open_max_calls: 半开状态下同时允许的探测请求数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.half_open_calls = 0
+        self.last_error = None
+        self.stats = {'successes': 0, 'failures': 0, 'captchas': 0, 'rejected': 0, 'trips': 0}
+        self._lock = threading.Lock()
+
+    def _refresh_state(self):
+        """
+        冷却时间已过时从熔断转为半开，调用方需持有锁
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+
+    def is_open(self):
+        """
+        来源当前是否应被直接跳过（不占用半开探测名额）
+        """
+        with self._lock:
+            self._refresh_state()
+            return self.state == OPEN
+
+    def allow_request(self):
+        """
+        申请发出一次请求；半开状态下只放行有限的探测请求
+
+        Returns:
+            是否允许发出请求
+        """
+        with self._lock:
+            self._refresh_state()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.half_open_calls < self.half_open_max_calls:
+                self.half_open_calls += 1
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """
+        记录一次成功请求，半开状态下成功即恢复
+        """
+        with self._lock:
+            self.stats['successes'] += 1
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print('来源探测成功，熔断器恢复')
+            self.state = CLOSED
+            self.half_open_calls = 0
+
+    def record_failure(self, error=None, captcha=False):
+        """
+        记录一次失败请求；检测到验证码、半开探测失败或连续失败达到阈值时熔断
+        """
+        with self._lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error else None
+            if captcha:
+                self.stats['captchas'] += 1
+            if captcha or self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['trips'] += 1
+                    print(f'来源熔断，{self.recovery_timeout} 秒后尝试恢复（原因: {self.last_error}）')
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.half_open_calls = 0
+
+    def snapshot(self):
+        """
+        导出熔断器状态和计数
+        """
+        with self._lock:
+            self._refresh_state()
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in': retry_in,
+                'last_error': self.last_error,
+                **self.stats
+            }
+
+
+class SourcePolicy:
+    """
+    单个来源的请求策略：熔断检查 + 有限次指数退避重试
+    """
+
+    def __init__(self, name, max_retries=2, base_delay=1.0, max_delay=30.0, breaker=None):
+        """
+        Args:
+            name: 来源名称
+            max_retries: 临时性错误的最大重试次数
+            base_delay: 首次重试的基础等待时间（秒）
+            max_delay: 单次重试等待时间上限（秒）
+            breaker: 熔断器，默认新建
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff_delay(self, attempt):
+        """
+        第attempt次重试前的等待时间：指数退避加全抖动
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _before_attempt(self):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f'{self.name} 处于熔断状态，跳过请求')
+
+    def _after_error(self, error, attempt):
+        """
+        记录失败并判断是否继续重试
+
+        Returns:
+            需要等待的秒数；不应重试时返回None
+        """
+        captcha = isinstance(error, CaptchaDetected)
+        self.breaker.record_failure(error, captcha=captcha)
+        if captcha or not is_transient_error(error) or attempt >= self.max_retries:
+            return None
+        delay = self.backoff_delay(attempt)
+        print(f'{self.name} 请求出现临时性错误: {error}，{delay:.1f} 秒后第 {attempt + 1} 次重试')
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        按策略调用同步函数
+
+        Raises:
+            CircuitOpenError: 来源处于熔断状态
+            最后一次调用抛出的异常
+        """
+        attempt = 0
+        while True:
+            self._before_attempt()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """
+        call的异步版本，func为协程函数，退避等待使用asyncio.sleep
+        """
+        attempt = 0
+        while True:
+            self._before_attempt()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+
+# 来源名称 -> SourcePolicy，进程内共享
+_policies = {}
+_policies_lock = threading.Lock()
+_policy_settings = {}
+
+
+def configure(max_retries=2, base_delay=1.0, max_delay=30.0, failure_threshold=3, recovery_timeout=300):
+    """
+    配置所有来源的策略参数，已创建的策略会被就地更新（熔断状态保留）
+    """
+    with _policies_lock:
+        _policy_settings.update(max_retries=max_retries, base_delay=base_delay, max_delay=max_delay,
+                                failure_threshold=failure_threshold, recovery_timeout=recovery_timeout)
+        for policy in _policies.values():
+            _apply_settings(policy)
+
+
+def _apply_settings(policy):
+    """
+    将全局策略参数应用到单个策略，调用方需持有锁
+    """
+    settings = _policy_settings
+    policy.max_retries = settings.get('max_retries', policy.max_retries)
+    policy.base_delay = settings.get('base_delay', policy.base_delay)
+    policy.max_delay = settings.get('max_delay', policy.max_delay)
+    policy.breaker.failure_threshold = settings.get('failure_threshold', policy.breaker.failure_threshold)
+    policy.breaker.recovery_timeout = settings.get('recovery_timeout', policy.breaker.recovery_timeout)
+
+
+def get_policy(name):
+    """
+    获取（必要时创建）来源的策略
+    """
+    with _policies_lock:
+        if name not in _policies:
+            policy = SourcePolicy(name)
+            _apply_settings(policy)
+            _policies[name] = policy
+        return _policies[name]
+
+
+def snapshot_all():
+    """
+    导出所有来源的熔断器状态
+    """
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {policy.name: policy.breaker.snapshot() for policy in policies}
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫HTTP会话池
+功能：为每个爬虫维护一组预热过的requests会话，复用keep-alive连接和Cookie，
+只有在Cookie过期时才重新访问首页预热，并根据请求健康状况淘汰会话；
+同时提供流式读取响应正文的工具，边下载边检查验证码并可提前停止
+"""
+
+import io
+import time
+import codecs
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import get_rate_limiter
+
+# 流式读取时每块的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
+# 验证码标记只在正文开头这么多字符内检查，验证页面都很短
+CAPTCHA_SCAN_CHARS = 64 * 1024
+# 检查标记时保留上一块末尾的字符数，避免标记被切断在块边界上
+MARKER_OVERLAP = 64
+
+
+class PooledSession:
+    """
+    会话池中的单个会话及其状态
+    """
+
+    def __init__(self, session, home_url):
+        self.session = session
+        self.home_url = home_url
+        self.warmed_at = None      # 最近一次首页预热的时间
+        self.failures = 0          # 连续失败次数
+        self.invalid = False       # 被标记为不可再用（如触发验证码）
+
+    def invalidate(self):
+        """
+        标记会话失效，归还时直接淘汰（例如检测到验证码页面）
+        """
+        self.invalid = True
+
+    def is_expired(self, cookie_ttl):
+        """
+        判断会话Cookie是否已过期，需要重新预热
+        """
+        return self.warmed_at is None or time.monotonic() - self.warmed_at >= cookie_ttl
+
+    def warm_up(self, timeout=5):
+        """
+        访问首页获取Cookie，建立会话
+
+        Returns:
+            首页响应对象
+        """
+        # 首页请求同样受按主机限速约束
+        get_rate_limiter().acquire(self.home_url)
+        home_response = self.session.get(self.home_url, timeout=timeout)
+        print(f'首页请求状态码: {home_response.status_code}')
+        self.warmed_at = time.monotonic()
+        return home_response
+
+
+class SessionPool:
+    """
+    线程安全的HTTP会话池
+    """
+
+    def __init__(self, home_url, headers, cookies=None, user_agents=None,
+                 max_size=4, cookie_ttl=600, max_failures=3, connections_per_session=4,
+                 warmup_timeout=5):
+        """
+        Args:
+            home_url: 预热时访问的首页地址，同时作为Referer
+            headers: 基础请求头
+            cookies: 初始Cookie
+            user_agents: 可选的User-Agent列表，每个会话创建时随机选择一个
+            max_size: 会话池最大会话数
+            cookie_ttl: Cookie有效期（秒），过期后借出时重新预热
+            max_failures: 连续失败多少次后淘汰会话
+            connections_per_session: 每个会话的keep-alive连接池大小
+            warmup_timeout: 首页预热请求超时时间（秒）
+        """
+        self.home_url = home_url
+        self.headers = headers
+        self.cookies = cookies or {}
+        self.user_agents = user_agents or []
+        self.max_size = max_size
+        self.cookie_ttl = cookie_ttl
+        self.max_failures = max_failures
+        self.connections_per_session = connections_per_session
+        self.warmup_timeout = warmup_timeout
+
+        self._idle = deque()
+        self._created = 0
+        self._condition = threading.Condition()
+        self.stats = {'created': 0, 'reused': 0, 'warmups': 0, 'evicted': 0}
+
+    def _create_session(self):
+        """
+        创建一个新的requests会话，挂载keep-alive连接池
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.connections_per_session,
+                              pool_maxsize=self.connections_per_session)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        headers = self.headers.copy()
+        if self.user_agents:
+            # 随机选择不同的User-Agent，避免被识别为爬虫
+            headers['User-Agent'] = random.choice(self.user_agents)
+        session.headers.update(headers)
+        if self.cookies:
+            session.cookies.update(self.cookies)
+        self.stats['created'] += 1
+        return PooledSession(session, self.home_url)
+
+    def acquire(self):
+        """
+        借出一个会话，池中无空闲会话且已达上限时阻塞等待
+
+        Returns:
+            PooledSession实例，Cookie过期的会话会先完成预热
+        """
+        with self._condition:
+            while not self._idle and self._created >= self.max_size:
+                self._condition.wait()
+            if self._idle:
+                pooled = self._idle.popleft()
+                self.stats['reused'] += 1
+            else:
+                self._created += 1
+                pooled = None
+
+        if pooled is None:
+            try:
+                pooled = self._create_session()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+
+        if pooled.is_expired(self.cookie_ttl):
+            try:
+                pooled.warm_up(self.warmup_timeout)
+            except Exception:
+                self.release(pooled, healthy=False)
+                raise
+            self.stats['warmups'] += 1
+            # 预热后请求统一带上Referer
+            pooled.session.headers.update({'Referer': self.home_url})
+        return pooled
+
+    def release(self, pooled, healthy=True):
+        """
+        归还会话
+
+        Args:
+            pooled: acquire返回的PooledSession
+            healthy: 本次使用是否成功；连续失败达到上限或被标记失效的会话会被淘汰
+        """
+        if healthy:
+            pooled.failures = 0
+        else:
+            pooled.failures += 1
+
+        evict = pooled.invalid or pooled.failures >= self.max_failures
+        with self._condition:
+            if evict:
+                self._created -= 1
+                self.stats['evicted'] += 1
+            else:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+        if evict:
+            print(f'会话已淘汰（连续失败 {pooled.failures} 次，失效标记: {pooled.invalid}）')
+            pooled.session.close()
+
+    @contextmanager
+    def session(self):
+        """
+        以上下文管理器方式借用会话，代码块内抛出异常时按失败归还
+        """
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception:
+            self.release(pooled, healthy=False)
+            raise
+        else:
+            self.release(pooled, healthy=True)
+
+    def close(self):
+        """
+        关闭池中所有空闲会话
+        """
+        with self._condition:
+            while self._idle:
+                pooled = self._idle.popleft()
+                self._created -= 1
+                pooled.session.close()
+            self._condition.notify_all()
+
+
+class StreamedText:
+    """
+    流式读取的响应正文：每块字节只增量解码一次并写入缓冲区，读取过程中在正文开头
+    检查验证码标记，并由调用方判断已读取的内容是否已包含足够的结果，以便提前停止
+    下载。提前停止时得到的是截断的HTML，解析器会自动补全未闭合的标签
+    """
+
+    def __init__(self, encoding='utf-8', is_blocked=None, is_enough=None):
+        """
+        Args:
+            encoding: 正文编码
+            is_blocked: 判断文本片段是否包含验证码标记的函数
+            is_enough: 判断文本片段读完后结果是否已足够的函数，按顺序接收每个新片段
+                （带有上一片段末尾的重叠部分），可在内部累计状态
+        """
+        self.is_blocked = is_blocked
+        self.is_enough = is_enough
+        self.length = 0            # 已解码的字符数
+        self.bytes_read = 0        # 已读取的原始字节数
+        self.blocked = False       # 是否检测到验证码
+        self.truncated = False     # 是否因结果已足够而提前停止
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._buffer = io.StringIO()
+        self._tail = ''
+
+    def feed(self, chunk):
+        """
+        写入一块原始字节
+
+        Returns:
+            是否应停止读取
+        """
+        self.bytes_read += len(chunk)
+        piece = self._decoder.decode(chunk)
+        if not piece:
+            return False
+        window = self._tail + piece
+        self._tail = window[-MARKER_OVERLAP:]
+        self._buffer.write(piece)
+        scanned = self.length
+        self.length += len(piece)
+        if self.is_blocked and scanned < CAPTCHA_SCAN_CHARS and self.is_blocked(window):
+            self.blocked = True
+        elif self.is_enough and self.is_enough(window):
+            self.truncated = True
+        return self.blocked or self.truncated
+
+    def read(self, response, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        读取以stream=True发出的requests响应
+
+        Returns:
+            正文文本
+        """
+        for chunk in response.iter_content(chunk_size):
+            if self.feed(chunk):
+                # 未读完的连接无法放回连接池复用，直接关闭
+                response.close()
+                break
+        return self.getvalue()
+
+    async def read_async(self, response, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        read的aiohttp版本
+        """
+        async for chunk in response.content.iter_chunked(chunk_size):
+            if self.feed(chunk):
+                response.close()
+                break
+        return self.getvalue()
+
+    def getvalue(self):
+        """
+        获取已读取的正文文本
+        """
+        if not (self.blocked or self.truncated):
+            piece = self._decoder.decode(b'', final=True)
+            if piece:
+                self._buffer.write(piece)
+                self.length += len(piece)
+        return self._buffer.getvalue()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共配置：爬虫指向fixtures/中的本地替身服务器，不访问真实站点
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'fixtures')
+
+# 爬虫模块位于项目根目录，替身服务器位于fixtures目录
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, FIXTURES_DIR)
+
+import fixture_server
+import rate_limiter
+import page_archive
+import debug_capture
+
+
+@pytest.fixture(scope='session')
+def fixture_url():
+    """
+    启动替身服务器，返回其基础URL
+    """
+    server, base_url = fixture_server.start()
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    使用临时数据库的应用，在应用上下文中运行测试
+    """
+    from app import create_app, db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'data.db'}",
+        'PAGE_ARCHIVE_DIR': None,
+        'DEBUG_CAPTURE_DIR': None,
+        'SPIDER_RATE': 1000,
+        'SPIDER_BURST': 1000,
+        'SPIDER_RATE_JITTER': 0
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """
+    以默认管理员身份登录的测试客户端
+    """
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin888'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture(autouse=True)
+def offline_spiders():
+    """
+    替身服务器不需要限速；测试默认不归档页面，也不采集调试页面
+    """
+    rate_limiter.configure(rate=1000, burst=1000, jitter=0)
+    page_archive.configure(None)
+    debug_capture.configure(None)
+    yield
+    rate_limiter.configure()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BaiduSpider：单次遍历的结果提取（标题、链接、摘要、去重、结果上限）和验证码页面
+"""
+
+import pytest
+
+import parse_engine
+from baidu_spider import BaiduSpider, MAX_RESULTS
+from spider_policy import SourcePolicy, OPEN
+
+# fixtures/baidu_serp.html 的12个结果容器中前10条结果
+EXPECTED_RESULTS = [
+    ('INFJ人格特点全面解析 - 百度百科',
+     'http://www.baidu.com/link?url=pTyGJMuHbEL31IeL2HPcHyGcFRl1SPnXNYvMIHa-2o76umfXfKm-r5kJP1Vr'),
+    ('INFJ和INFP的区别是什么 - 哔哩哔哩',
+     'http://www.baidu.com/link?url=T_1FJors-6ILi8IHn5kxsC7tVO-HbkQfyy-KV5zjR3j1twdTKWTddB_XhkAS'),
+    ('INFJ适合什么职业 - 豆瓣',
+     'http://www.baidu.com/link?url=1voQG6yyzyN9zHYIa4UOrGNATMuDJawTgsu8PO_799nKSNrh9UCauSDmLhuV'),
+    ('INFJ为什么被称为最稀有的人格 - 简书',
+     'http://www.baidu.com/link?url=tcqcYezdZ-tDDj8hYs5suKcNd8Zra9A9sKPxZ9W3qLy7zKUVQDT7S8sTQCBN'),
+    ('INFJ_相关视频',
+     'http://www.baidu.com/link?url=videoCardTitleToken0123456789'),
+    ('INFJ的恋爱观：理想主义与深度连接 - CSDN博客',
+     'http://www.baidu.com/link?url=R3YbDgbleph1QHt61QTC4XATWS8PHp9NHfYjFM5DI4pZj59fhZ5R1Py4oJe2'),
+    ('MBTI十六型人格测试免费版 - 心理学空间',
+     'http://www.baidu.com/link?url=JbmPTuSgR7cMy_UcU3zr1ZtoLuCr64CxqlIOdNKhiFXiQ2hzT-pLjHX2JiCL'),
+    ('INFJ的认知功能Ni-Fe-Ti-Se详解 - 搜狐',
+     'http://www.baidu.com/link?url=hKcIhP6Br1iQFeOUhGXZnnal5WisCgEBCY8f5N3-ynbdrZRzsGQBJg3UHKwk'),
+    ('INFJ门把手效应是什么意思 - 网易',
+     'http://www.baidu.com/link?url=flF6XUi5AhuqpfEnbtXAqwK8jZfALhLSzFyCmmdKTxp-TkSF2RCdKDFRuNw5'),
+    ('INFJ名人有哪些 - 腾讯新闻',
+     'http://www.baidu.com/link?url=GCf_hA6ILI8gJhead6-wJ9kFZJSqgmRB9H_iMb_lk777PZnK8Cl6J5ixaaJL'),
+]
+
+# 同一结果出现在嵌套的容器中，以及标题相同的两个容器
+DUPLICATE_PAGE = '''
+<html><body>百度为您找到相关结果约2个<div id="content_left">
+<div class="result c-container"><div class="result-op c-container">
+<h3><a href="http://www.baidu.com/link?url=duplicateToken000001">重复出现的搜索结果标题</a></h3>
+<div class="c-abstract">第一个容器的摘要文本，长度足够作为摘要使用</div>
+</div></div>
+<div class="result c-container">
+<h3><a href="http://www.baidu.com/link?url=duplicateToken000002">重复出现的搜索结果标题</a></h3>
+<div class="c-abstract">第二个容器的摘要文本，标题与第一个容器相同</div>
+</div>
+<div class="result c-container">
+<h3><a href="http://www.baidu.com/link?url=uniqueToken000000003">另一条不同的搜索结果</a></h3>
+<div class="c-abstract">第三个容器的摘要文本，标题与前面的容器不同</div>
+</div>
+</div><div id="page"></div></body></html>
+'''
+
+
+@pytest.fixture(params=sorted(parse_engine.ENGINE_CLASSES))
+def spider(request, fixture_url):
+    """
+    分别使用各解析引擎、指向替身服务器的爬虫，每个爬虫使用独立的策略
+    """
+    parse_engine.configure(sources={'百度': request.param})
+    try:
+        spider = BaiduSpider(search_url=fixture_url + '/s')
+    finally:
+        parse_engine.configure()
+    if spider.parse_engine.name != request.param:
+        pytest.skip(f'解析引擎 {request.param} 不可用')
+    spider.policy = SourcePolicy('百度', max_retries=0)
+    return spider
+
+
+def test_serp_results(spider):
+    results = spider.search('INFJ')
+
+    assert [(result.title, result.url) for result in results] == EXPECTED_RESULTS
+    assert spider.last_error is None
+    assert results[0].summary.startswith('2024年1月3日INFJ人格特点全面解析。INFJ（提倡者型人格）')
+    assert all(result.summary for result in results if result.title != 'INFJ_相关视频')
+
+
+def test_serp_stops_at_result_cap(spider):
+    results = spider.search('INFJ')
+
+    assert len(results) == MAX_RESULTS
+    titles = {result.title for result in results}
+    assert 'INFJ如何应对社交疲劳 - 新浪' not in titles
+    assert 'INFJ的优势与盲点 - 知乎' not in titles
+
+
+def test_duplicate_titles_are_dropped(spider):
+    results = spider._parse_response(DUPLICATE_PAGE)
+
+    assert [(result.title, result.url) for result in results] == [
+        ('重复出现的搜索结果标题', 'http://www.baidu.com/link?url=duplicateToken000001'),
+        ('另一条不同的搜索结果', 'http://www.baidu.com/link?url=uniqueToken000000003'),
+    ]
+    assert results[0].summary == '第一个容器的摘要文本，长度足够作为摘要使用'
+
+
+def test_captcha_page_trips_breaker(spider):
+    assert spider.search('blocked') == []
+    assert spider.last_error == '百度安全验证页面'
+    assert spider.policy.breaker.state == OPEN
+    assert spider.policy.breaker.stats['captchas'] == 1
+
+
+def test_request_failure_is_reported(spider, fixture_url):
+    spider.search_url = fixture_url + '/missing'
+
+    assert spider.search('INFJ') == []
+    assert spider.last_error.startswith('请求出错: 404')
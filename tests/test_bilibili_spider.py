@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BilibiliSpider：JSON搜索接口的字段映射，以及接口失败或被拦截时回退到HTML页面抓取
+"""
+
+import json
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from bilibili_spider import BilibiliSpider, MAX_RESULTS
+from spider_policy import SourcePolicy, OPEN
+
+API_PATH = '/x/web-interface/search/type'
+
+
+@pytest.fixture
+def make_spider(fixture_url):
+    """
+    创建指向替身服务器的爬虫，每个爬虫使用独立的策略，熔断状态不会影响其他测试
+    """
+    def make(fetch_mode='api', api_path=API_PATH):
+        spider = BilibiliSpider(fetch_mode=fetch_mode, api_url=fixture_url + api_path,
+                                search_url=fixture_url + '/all')
+        spider.policy = SourcePolicy('Bilibili', max_retries=0)
+        return spider
+    return make
+
+
+def test_api_results_are_mapped(make_spider):
+    results = make_spider().search('INFJ')
+
+    with open(os.path.join(FIXTURES_DIR, 'bilibili_search_api.json'), encoding='utf-8') as f:
+        items = json.load(f)['data']['result']
+    assert len(results) == len(items) == 5
+
+    first = results[0]
+    assert first.title == '【全网最详细】INFJ深度解析：从八维底层逻辑看INFJ绿老头'
+    assert first.url == 'https://www.bilibili.com/video/BV1j5UjBZExD/'
+    assert first.author == '惟志在修行'
+    assert first.play == 26034
+    assert first.danmaku == 94
+    assert first.duration == '14:45'
+    assert first.stats == '播放 26034 弹幕 94 时长 14:45'
+    assert first.summary == '从荣格八维的底层逻辑出发，完整拆解INFJ的认知功能排序与成长路径。'
+
+    for result, item in zip(results, items):
+        assert '<em' not in result.title
+        assert result.url == f'https://www.bilibili.com/video/{item["bvid"]}/'
+        assert result.author == item['author']
+        assert result.play == item['play']
+        assert result.danmaku == item['video_review']
+        assert result.summary == (item['description'] or None)
+
+
+def test_blocked_api_falls_back_to_html(make_spider):
+    spider = make_spider()
+
+    results = spider.search('blocked')
+
+    assert len(results) == 10
+    assert spider.last_error is None
+    assert spider.policy.breaker.state != OPEN
+    assert spider.policy.breaker.stats['captchas'] == 0
+
+
+def test_html_fetch_mode(make_spider):
+    results = make_spider(fetch_mode='html').search('INFJ')
+
+    assert len(results) == 10
+    assert [result.url for result in results[:3]] == [
+        'https://www.bilibili.com/video/BV1j5UjBZExD/',
+        'https://www.bilibili.com/video/BV1YjsJecEMg/',
+        'https://www.bilibili.com/video/BV1FC2iBXEr1/',
+    ]
+    assert results[0].title == '【全网最详细】INFJ深度解析：从八维底层逻辑看INFJ绿老头'
+    assert all(result.play is None for result in results)
+
+
+def test_stream_reader_waits_for_result_cards(make_spider):
+    with open(os.path.join(FIXTURES_DIR, 'bilibili_search_page.html'), encoding='utf-8') as f:
+        page = f.read()
+    # 结果区域之前的推荐位同样带有BV号，不能据此提前停止下载
+    recommendations = ''.join(f'<a href="//www.bilibili.com/video/BV1rcmd{index:05d}/">推荐视频</a>'
+                              for index in range(MAX_RESULTS + 5))
+    page = page.replace('<body', f'<div class="recommend">{recommendations}</div><body', 1)
+    data = page.encode('utf-8')
+    spider = make_spider(fetch_mode='html')
+
+    reader = spider.stream_reader()
+    for start in range(0, len(data), 1000):
+        if reader.feed(data[start:start + 1000]):
+            break
+
+    assert reader.truncated
+    assert reader.bytes_read < len(data)
+    assert ([result.url for result in spider._parse_response(reader.getvalue())] ==
+            [result.url for result in spider._parse_response(page)][:MAX_RESULTS])
+
+
+def test_api_failure_falls_back_to_html(make_spider):
+    spider = make_spider(api_path='/missing')
+
+    results = spider.search('INFJ')
+
+    assert len(results) == 10
+    assert results[0].url == 'https://www.bilibili.com/video/BV1j5UjBZExD/'
+    assert spider.policy.breaker.state != OPEN
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/import_data 批量导入：分块边界、无效行的处理，以及通过请求体流式读取的CSV
+"""
+
+import json
+
+from app import ingest
+from app.models import RawData
+
+
+def ndjson(records):
+    return ''.join((record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)) + '\n'
+                   for record in records).encode('utf-8')
+
+
+def record(index, **fields):
+    return dict({'title': f'INFJ导入测试结果{index}', 'url': f'https://example.com/infj/{index}',
+                 'source': '百度', 'keyword': 'INFJ'}, **fields)
+
+
+def import_progress(client, body, **params):
+    """
+    以progress=1导入，返回 (每块的进度列表, 汇总)
+    """
+    response = client.post('/import_data', query_string=dict(params, progress=1), data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['event'] for event in events] == ['progress'] * (len(events) - 1) + ['done']
+    return events[:-1], events[-1]
+
+
+def test_chunk_boundaries(client):
+    # 第7行与第1行是同一URL，落在第三块中，应识别为已存在
+    body = ndjson([record(index) for index in range(6)] + [record(0, title='INFJ导入测试结果0（重复）')])
+
+    chunks, summary = import_progress(client, body, chunk_size=3)
+
+    assert [chunk['lines'] for chunk in chunks] == [[1, 3], [4, 6], [7, 7]]
+    assert [chunk['counts'][ingest.INSERTED] for chunk in chunks] == [3, 3, 0]
+    assert chunks[-1]['counts'][ingest.EXISTING] == 1
+    assert summary['status'] == 'success'
+    assert summary['lines'] == 7
+    assert summary['chunks'] == 3
+    assert summary['counts'][ingest.INSERTED] == 6
+    assert RawData.query.count() == 6
+
+
+def test_exact_multiple_of_chunk_size_has_no_empty_chunk(client):
+    chunks, summary = import_progress(client, ndjson([record(index) for index in range(6)]), chunk_size=3)
+
+    assert [chunk['lines'] for chunk in chunks] == [[1, 3], [4, 6]]
+    assert summary['chunks'] == 2
+
+
+def test_malformed_lines_are_reported_and_skipped(client):
+    body = ndjson([
+        record(0),
+        '{"title": "缺少右括号"',
+        '["不是对象"]',
+        '',
+        record(1, keyword=''),
+        record(2, title='', url=''),
+        record(3, title=123),
+        record(4),
+    ])
+
+    chunks, summary = import_progress(client, body, chunk_size=1)
+
+    # 无效行不占用块的行数
+    assert [chunk['lines'] for chunk in chunks] == [[1, 1], [8, 8]]
+    assert summary['lines'] == 8
+    assert summary['counts'][ingest.INSERTED] == 2
+    assert summary['counts'][ingest.INVALID] == 5
+    assert summary['error_count'] == 5
+    assert [error['line'] for error in summary['errors']] == [2, 3, 5, 6, 7]
+    assert summary['errors'][0]['message'].startswith('JSON格式错误')
+    assert RawData.query.count() == 2
+
+
+def test_csv_request_body(client):
+    body = ('\ufefftitle,url,summary,keyword\n'
+            'INFJ人格特点全面解析,https://example.com/infj/a,"认知功能, 优势与成长",INFJ\n'
+            'INFJ适合什么职业,https://example.com/infj/b,,INFJ\n'
+            '列数多于表头,https://example.com/infj/c,,INFJ,多余的列\n'
+            ',,只有摘要,INFJ\n').encode('utf-8')
+
+    response = client.post('/import_data', query_string={'chunk_size': 1}, data=body, content_type='text/csv')
+
+    summary = response.get_json()
+    assert summary['status'] == 'success'
+    assert summary['lines'] == 5
+    assert summary['counts'][ingest.INSERTED] == 2
+    assert summary['counts'][ingest.INVALID] == 2
+    assert [error['line'] for error in summary['errors']] == [4, 5]
+    rows = {row.title: row for row in RawData.query}
+    assert set(rows) == {'INFJ人格特点全面解析', 'INFJ适合什么职业'}
+    assert rows['INFJ人格特点全面解析'].summary == '认知功能, 优势与成长'
+    assert rows['INFJ适合什么职业'].keyword == 'INFJ'
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/export_data 流式导出：跨越多块的键集分页不重复、不遗漏，以及未安装pyarrow时的Parquet请求
+"""
+
+import io
+import csv
+import json
+
+import pytest
+
+from app import db, export, ingest
+from app.models import RawData
+
+
+@pytest.fixture
+def rows(app):
+    """
+    写入10条百度、B站交替的记录，并把每块读取的行数调小，使导出跨越多块
+
+    Returns:
+        按ID排序的记录ID列表
+    """
+    items = [{'title': f'INFJ导出测试结果{index}', 'url': f'https://example.com/infj/{index}',
+              'source': '百度' if index % 2 else 'Bilibili'} for index in range(10)]
+    with ingest.write_lock:
+        ingest.save_results('INFJ', items, near_duplicate_mode='keep')
+        db.session.commit()
+    app.config['EXPORT_BATCH_SIZE'] = 3
+    return [row.id for row in RawData.query.order_by(RawData.id)]
+
+
+def get_ndjson(client, **params):
+    response = client.get('/export_data', query_string=dict(params, format='ndjson'))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_ndjson_pages_neither_repeat_nor_drop_rows(client, rows):
+    records = get_ndjson(client)
+
+    assert [record['id'] for record in records] == rows
+    assert records[0]['title'] == 'INFJ导出测试结果0'
+    assert set(records[0]) == set(export.COLUMNS)
+
+
+def test_filtered_pages_neither_repeat_nor_drop_rows(client, rows):
+    records = get_ndjson(client, source='百度')
+
+    assert [record['id'] for record in records] == rows[1::2]
+    assert {record['source'] for record in records} == {'百度'}
+
+
+@pytest.mark.parametrize('batch_size', [1, 5, 10, 11])
+def test_csv_without_id_column(app, client, rows, batch_size):
+    # 未导出ID时键集分页使用额外读取的ID；块大小整除总行数时最后一次查询为空
+    app.config['EXPORT_BATCH_SIZE'] = batch_size
+
+    response = client.get('/export_data', query_string={'format': 'csv', 'columns': 'title,url'})
+
+    assert response.status_code == 200
+    lines = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert lines[0] == ['title', 'url']
+    assert [title for title, _ in lines[1:]] == [f'INFJ导出测试结果{index}' for index in range(10)]
+
+
+def test_parquet_without_pyarrow(client, rows, monkeypatch):
+    monkeypatch.setattr(export, 'parquet_available', lambda: False)
+
+    response = client.get('/export_data', query_string={'format': 'parquet'})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'message': '导出Parquet需要安装pyarrow'}
+
+
+def test_parquet_round_trip(client, rows):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    response = client.get('/export_data', query_string={'format': 'parquet', 'columns': 'id,title'})
+
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    assert table.column('id').to_pylist() == rows
+    assert table.num_rows == 10
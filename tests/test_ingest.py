@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ingest.save_results：批内去重、已存在记录的识别，以及重复保存同一批数据时不会重复写入
+"""
+
+from collections import Counter
+
+from app import db, ingest
+from app.models import RawData
+
+BATCH = [
+    {'title': 'INFJ人格特点全面解析', 'url': 'https://baike.baidu.com/item/INFJ', 'source': '百度'},
+    {'title': 'INFJ适合什么职业', 'url': 'https://www.douban.com/note/infj-career/', 'source': '百度'},
+    {'title': 'INFJ深度解析：从八维底层逻辑看INFJ', 'url': 'https://www.bilibili.com/video/BV1j5UjBZExD/',
+     'source': 'Bilibili'},
+    # 与第一条只差协议、跟踪参数和末尾斜杠，规范化后是同一页面
+    {'title': 'INFJ人格特点全面解析 - 百度百科', 'url': 'http://baike.baidu.com/item/INFJ/?utm_source=feed',
+     'source': '百度'},
+    '不是字典的数据',
+]
+
+
+def save(batch):
+    with ingest.write_lock:
+        outcomes, inserted = ingest.save_results('INFJ', batch, near_duplicate_mode='keep')
+        db.session.commit()
+    return Counter(outcome['outcome'] for outcome in outcomes), inserted
+
+
+def test_saving_same_batch_twice(app):
+    counts, inserted = save(BATCH)
+
+    assert inserted == 3
+    assert counts == {ingest.INSERTED: 3, ingest.DUPLICATE: 1, ingest.INVALID: 1}
+
+    counts, inserted = save(BATCH)
+
+    assert inserted == 0
+    assert counts == {ingest.EXISTING: 3, ingest.DUPLICATE: 1, ingest.INVALID: 1}
+    assert RawData.query.count() == 3
+
+
+def test_duplicate_outcome_points_at_first_occurrence(app):
+    outcomes, _ = ingest.save_results('INFJ', BATCH, near_duplicate_mode='keep')
+
+    assert outcomes[3] == {'index': 3, 'outcome': ingest.DUPLICATE, 'duplicate_of': 0}
+    assert outcomes[4]['outcome'] == ingest.INVALID
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词监控：按URL指纹判断新结果、遇到已见过的页面停止翻页，抓取失败时记录为失败
+"""
+
+from app import monitoring
+from app.models import RawData
+from search_result import SearchResult
+
+
+class StubSpider:
+    """
+    按页返回预设结果的爬虫；pages中的字符串表示该页抓取失败的错误说明
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+        self.last_error = None
+
+    def search(self, keyword, page=1):
+        self.requested.append(page)
+        self.last_error = None
+        result = self.pages[page - 1] if page <= len(self.pages) else []
+        if isinstance(result, str):
+            self.last_error = result
+            return []
+        return result
+
+
+def baidu_page(page, token):
+    """
+    一页百度结果，跳转链接的令牌随每次搜索变化
+    """
+    return [SearchResult(title=f'第{page}页的第{index}条搜索结果',
+                         url=f'http://www.baidu.com/link?url={token}{page}{index}')
+            for index in range(3)]
+
+
+def run(monitor, spider):
+    monitoring.run_monitor(monitor, lambda source: spider)
+    return monitoring.monitor_info(monitor)
+
+
+def test_known_results_stop_pagination(app):
+    monitor = monitoring.create_monitor('INFJ', ['百度'], max_pages=5)
+
+    first = StubSpider([baidu_page(1, 'a'), baidu_page(2, 'a')])
+    info = run(monitor, first)
+    assert first.requested == [1, 2, 3]
+    assert info['last_status'] == monitoring.DONE
+    assert info['last_inserted'] == 6
+    assert info['seen_urls'] == 6
+
+    # 第二次搜索的跳转链接全部不同，但指向相同的结果
+    second = StubSpider([baidu_page(1, 'b'), baidu_page(2, 'b')])
+    info = run(monitor, second)
+    assert second.requested == [1]
+    assert info['last_status'] == monitoring.DONE
+    assert info['last_inserted'] == 0
+    assert RawData.query.count() == 6
+
+
+def test_failed_fetch_marks_run_failed(app):
+    monitor = monitoring.create_monitor('INFJ', ['百度'], max_pages=5)
+
+    spider = StubSpider([baidu_page(1, 'a'), '请求出错: 503 Server Error'])
+    info = run(monitor, spider)
+
+    assert spider.requested == [1, 2]
+    assert info['last_status'] == monitoring.FAILED
+    assert info['last_error'] == '百度: 请求出错: 503 Server Error'
+    assert info['last_pages'] == 2
+    assert info['last_inserted'] == 3
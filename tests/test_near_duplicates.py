@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复检测：标题近似的记录指向最早的记录，不相关的记录不受影响
+"""
+
+from app import db, ingest, near_duplicates
+from app.models import RawData
+
+TITLE = 'INFJ人格特点全面解析：认知功能、优势与成长建议'
+NEAR_TITLE = 'INFJ人格特点全面解析：认知功能、优势与成长建议 - 百度百科'
+OTHER_TITLE = 'Python异步编程入门教程：asyncio事件循环详解'
+
+
+def item(title, path):
+    return {'title': title, 'url': f'https://example.com/{path}', 'source': '百度'}
+
+
+def save(items, mode=near_duplicates.MARK):
+    with ingest.write_lock:
+        outcomes, _ = ingest.save_results('INFJ', items, near_duplicate_mode=mode)
+        db.session.commit()
+    return outcomes
+
+
+def links():
+    """
+    标题 -> 所指向的近似重复记录的标题（未标记时为None）
+    """
+    rows = RawData.query.all()
+    titles = {row.id: row.title for row in rows}
+    return {row.title: titles.get(row.near_duplicate_of) for row in rows}
+
+
+def test_only_near_identical_titles_are_linked_within_batch(app):
+    outcomes = save([item(TITLE, 'a'), item(OTHER_TITLE, 'b'), item(NEAR_TITLE, 'c')])
+
+    assert [outcome['outcome'] for outcome in outcomes] == [ingest.INSERTED] * 3
+    assert outcomes[2]['near_duplicate_of_index'] == 0
+    assert outcomes[2]['similarity'] >= near_duplicates.DEFAULT_THRESHOLD
+    assert 'near_duplicate_of_index' not in outcomes[1]
+    assert links() == {TITLE: None, OTHER_TITLE: None, NEAR_TITLE: TITLE}
+
+
+def test_only_near_identical_titles_are_linked_across_batches(app):
+    save([item(TITLE, 'a')])
+    first = RawData.query.filter_by(title=TITLE).one()
+
+    outcomes = save([item(OTHER_TITLE, 'b'), item(NEAR_TITLE, 'c')])
+
+    assert 'near_duplicate_of' not in outcomes[0]
+    assert outcomes[1]['near_duplicate_of'] == first.id
+    assert links() == {TITLE: None, OTHER_TITLE: None, NEAR_TITLE: TITLE}
+
+
+def test_skip_mode_drops_only_the_near_duplicate(app):
+    save([item(TITLE, 'a')])
+
+    outcomes = save([item(OTHER_TITLE, 'b'), item(NEAR_TITLE, 'c')], mode=near_duplicates.SKIP)
+
+    assert [outcome['outcome'] for outcome in outcomes] == [ingest.INSERTED, ingest.NEAR_DUPLICATE]
+    assert sorted(row.title for row in RawData.query) == sorted([TITLE, OTHER_TITLE])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面归档：提前停止下载的页面记录截断标记和实际读取的字节数
+"""
+
+import os
+import sqlite3
+
+import page_archive
+from conftest import FIXTURES_DIR
+from baidu_spider import BaiduSpider
+from bilibili_spider import BilibiliSpider
+from spider_policy import SourcePolicy
+
+
+def test_truncated_pages_are_marked(fixture_url, tmp_path):
+    archive = page_archive.configure(str(tmp_path))
+    baidu = BaiduSpider(search_url=fixture_url + '/s')
+    baidu.policy = SourcePolicy('百度', max_retries=0)
+    bilibili = BilibiliSpider(fetch_mode='html', search_url=fixture_url + '/all')
+    bilibili.policy = SourcePolicy('Bilibili', max_retries=0)
+
+    assert len(baidu.search('INFJ')) == 10
+    assert len(bilibili.search('INFJ')) == 10
+
+    entries = {entry['source']: entry for entry in archive.iter_entries()}
+    for source, filename in (('百度', 'baidu_serp.html'), ('Bilibili', 'bilibili_search_page.html')):
+        entry = entries[source]
+        size = os.path.getsize(os.path.join(FIXTURES_DIR, filename))
+        assert entry['truncated'] == 1
+        assert 0 < entry['bytes_read'] < size
+        assert len(archive.load(entry).encode('utf-8')) <= entry['bytes_read']
+
+
+def test_complete_pages_are_not_marked(tmp_path):
+    archive = page_archive.configure(str(tmp_path))
+    archive.store('百度', 'http://example.com/s', 'INFJ', 1, 200, '<html></html>', bytes_read=13)
+
+    [entry] = archive.iter_entries()
+    assert entry['truncated'] == 0
+    assert entry['bytes_read'] == 13
+
+
+def test_legacy_index_gains_columns(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'index.db')
+    conn.execute('CREATE TABLE pages (id INTEGER PRIMARY KEY AUTOINCREMENT, sha256 TEXT NOT NULL, '
+                 'codec TEXT NOT NULL, source TEXT NOT NULL, url TEXT, keyword TEXT, page INTEGER, '
+                 'status INTEGER, fetched_at REAL NOT NULL)')
+    conn.execute("INSERT INTO pages (sha256, codec, source, fetched_at) VALUES ('0', 'gz', '百度', 0)")
+    conn.commit()
+    conn.close()
+
+    archive = page_archive.configure(str(tmp_path))
+
+    [entry] = archive.iter_entries()
+    assert entry['truncated'] == 0
+    assert entry['bytes_read'] is None